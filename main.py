@@ -2,35 +2,47 @@ import os
 import re
 import json
 import time
-import requests
 from urllib.parse import urlparse, parse_qs, urlencode
 import subprocess
 from datetime import datetime
+from stock_crawler.utils import FileNaming
 
-# 新增：读取配置文件
-with open('config.json', 'r', encoding='utf-8') as f:
-    config = json.load(f)
-
-# 从配置文件读取目录设置
-CACHE_DIR = config.get('cache_dir', 'cache')
-DOWNLOAD_DIR = config.get('download_dir', 'downloads')
-
-# 创建缓存目录
-if not os.path.exists(CACHE_DIR):
-    os.makedirs(CACHE_DIR)
-
-# 创建统一下载目录
-if not os.path.exists(DOWNLOAD_DIR):
-    os.makedirs(DOWNLOAD_DIR)
-
-# 获取配置信息
-CACHE_EXPIRE_DAYS = config.get('cache_expire_days', 7)
-STOCK_CODE = config.get('stock_code', 'unknown')
-
-# 创建股票代码缓存目录
+# 配置信息，由 load_config 在运行时读取，导入本模块时不读取文件、不创建目录
+config = {}
+CACHE_DIR = 'cache'
+DOWNLOAD_DIR = 'downloads'
+CACHE_EXPIRE_DAYS = 7
+STOCK_CODE = 'unknown'
 STOCK_CACHE_DIR = os.path.join(CACHE_DIR, STOCK_CODE)
-if not os.path.exists(STOCK_CACHE_DIR):
-    os.makedirs(STOCK_CACHE_DIR)
+
+def load_config(config_file='config.json'):
+    """读取配置文件并创建缓存和下载目录"""
+    global config, CACHE_DIR, DOWNLOAD_DIR, CACHE_EXPIRE_DAYS, STOCK_CODE, STOCK_CACHE_DIR
+    
+    # 新增：读取配置文件
+    with open(config_file, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    
+    # 从配置文件读取目录设置
+    CACHE_DIR = config.get('cache_dir', 'cache')
+    DOWNLOAD_DIR = config.get('download_dir', 'downloads')
+    
+    # 创建缓存目录
+    if not os.path.exists(CACHE_DIR):
+        os.makedirs(CACHE_DIR)
+    
+    # 创建统一下载目录
+    if not os.path.exists(DOWNLOAD_DIR):
+        os.makedirs(DOWNLOAD_DIR)
+    
+    # 获取配置信息
+    CACHE_EXPIRE_DAYS = config.get('cache_expire_days', 7)
+    STOCK_CODE = config.get('stock_code', 'unknown')
+    
+    # 创建股票代码缓存目录
+    STOCK_CACHE_DIR = os.path.join(CACHE_DIR, STOCK_CODE)
+    if not os.path.exists(STOCK_CACHE_DIR):
+        os.makedirs(STOCK_CACHE_DIR)
 
 def generate_timestamp():
     """生成时间戳"""
@@ -199,6 +211,8 @@ def get_jsonp_response(url):
     
     # 缓存不存在，发起网络请求
     print(f"发起网络请求: {os.path.basename(cache_file)}")
+    # requests 导入较慢，只在真正发起网络请求时导入
+    import requests
     try:
         response = requests.get(url, headers={
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36 Edg/137.0.0.0'
@@ -293,15 +307,7 @@ def process_announcement(item):
     short_name = security.get('short_name', '')
     attach_size = int(data.get('data', {}).get('attach_size', ''))
     notice_title = data.get('data', {}).get('notice_title', '')
-    # 去除特殊字符，只保留中文、数字、字母
-    notice_title = re.sub(r'[^\u4e00-\u9fa5a-zA-Z0-9]', '', notice_title)
     notice_date = data.get('data', {}).get('notice_date', '')
-    # 提取年月日数字，格式：2018-01-18 00:00:00 -> 20180118
-    date_match = re.search(r'(\d{4})-(\d{2})-(\d{2})', notice_date)
-    if date_match:
-        notice_date = date_match.group(1) + date_match.group(2) + date_match.group(3)
-    else:
-        notice_date = ''
 
     # 创建统一的下载文件夹结构
     column_name = item.get('columns')[0].get('column_name')
@@ -309,12 +315,8 @@ def process_announcement(item):
     if not os.path.exists(pdf_folder):
         os.makedirs(pdf_folder)
     
-    filename_prefix = ''
-    if stock_code and stock_code not in notice_title:
-        filename_prefix += stock_code
-    if short_name and short_name not in notice_title:
-        filename_prefix += short_name
-    raw_filename = f"{notice_date}_{filename_prefix}{notice_title}.pdf"
+    # 文件名规则与面向对象版本一致，见 FileNaming.pdf_filename
+    raw_filename = FileNaming.pdf_filename(stock_code, short_name, notice_title, notice_date, art_code)
     filename = os.path.join(pdf_folder, raw_filename)
     
     # 检查PDF文件是否已存在且完整
@@ -390,6 +392,8 @@ def list_cache_files():
         return []
 
 def main():
+    load_config()
+    
     # 程序启动时清理过期缓存
     print(f"缓存过期天数设置: {CACHE_EXPIRE_DAYS}天")
     print(f"PDF文件将保存到: {DOWNLOAD_DIR}/")
@@ -23,7 +23,10 @@ def main():
         cache_manager = CacheManager(
             cache_dir=config_manager.cache_dir,
             stock_code=config_manager.stock_code,
-            expire_days=config_manager.cache_expire_days
+            expire_days=config_manager.cache_expire_days,
+            max_size_bytes=config_manager.cache_max_bytes,
+            max_entries=config_manager.cache_max_entries,
+            eviction_policy=config_manager.cache_eviction_policy
         )
         
         # 初始化HTTP客户端
@@ -25,18 +25,26 @@ setup(
         "License :: OSI Approved :: MIT License",
         "Operating System :: OS Independent",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.6",
         "Programming Language :: Python :: 3.7",
         "Programming Language :: Python :: 3.8",
         "Programming Language :: Python :: 3.9",
         "Programming Language :: Python :: 3.10",
         "Programming Language :: Python :: 3.11",
     ],
-    python_requires=">=3.6",
+    python_requires=">=3.7",
     install_requires=[
         "requests>=2.25.0",
     ],
     extras_require={
+        "text": [
+            "pypdf>=3.0",
+        ],
+        "export": [
+            "pyarrow>=10.0",
+        ],
+        "s3": [
+            "boto3>=1.20",
+        ],
         "dev": [
             "pytest>=6.0",
             "pytest-cov>=2.0",
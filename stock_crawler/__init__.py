@@ -2,20 +2,37 @@
 股票爬虫核心模块
 """
 
-# 从各个子模块导入类
-from .core import ConfigManager, CacheManager
-from .downloaders import HttpClient, PdfDownloader
-from .processors import AnnouncementProcessor, StockCrawler
-from .utils import Utils
-from .factory import CrawlerFactory
+from ._lazy import lazy_module
 
-__all__ = [
-    'ConfigManager',
-    'CacheManager', 
-    'HttpClient',
-    'PdfDownloader',
-    'AnnouncementProcessor',
-    'StockCrawler',
-    'Utils',
-    'CrawlerFactory'
-] 
\ No newline at end of file
+# 类名到所在子模块的映射，首次访问时才导入对应子模块，避免 import 时加载全部依赖
+_LAZY_IMPORTS = {
+    'ConfigManager': '.core',
+    'CacheManager': '.core',
+    'CheckpointManager': '.core',
+    'WorkQueue': '.core',
+    'TextIndex': '.core',
+    'AnnouncementCatalog': '.core',
+    'FileIndex': '.core',
+    'Announcement': '.core',
+    'HttpClient': '.downloaders',
+    'PdfDownloader': '.downloaders',
+    'AnnouncementProcessor': '.processors',
+    'StockCrawler': '.processors',
+    'DownloadScheduler': '.processors',
+    'ShardCoordinator': '.processors',
+    'QueueWorker': '.processors',
+    'TextIndexer': '.processors',
+    'MetadataExporter': '.processors',
+    'StockWatcher': '.processors',
+    'ArchiveImporter': '.processors',
+    'CacheBundle': '.processors',
+    'CrawlPlanner': '.processors',
+    'Utils': '.utils',
+    'Tracer': '.utils',
+    'FileNaming': '.utils',
+    'LocalStorage': '.storage',
+    'S3Storage': '.storage',
+    'CrawlerFactory': '.factory'
+}
+
+__all__, __getattr__, __dir__ = lazy_module(__name__, _LAZY_IMPORTS)
@@ -0,0 +1,29 @@
+"""
+按需导入的辅助函数，供各个包的 __init__ 使用
+"""
+
+import importlib
+import sys
+
+def lazy_module(module_name, mapping):
+    """为包生成按需导入的模块属性，mapping 为 {类名: 相对子模块名}
+    
+    在包的 __init__ 中使用: __all__, __getattr__, __dir__ = lazy_module(__name__, _LAZY_IMPORTS)，
+    首次访问某个类时才导入对应子模块，导入后缓存到包的命名空间中，之后不再经过 __getattr__
+    """
+    namespace = sys.modules[module_name].__dict__
+    names = list(mapping)
+    
+    def __getattr__(name):
+        """按需导入子模块中的类"""
+        submodule = mapping.get(name)
+        if submodule is None:
+            raise AttributeError(f"module {module_name!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(submodule, module_name), name)
+        namespace[name] = value
+        return value
+    
+    def __dir__():
+        return sorted(set(namespace) | set(names))
+    
+    return names, __getattr__, __dir__
@@ -5,8 +5,342 @@
 """
 
 import argparse
+import json
+import os
 import sys
-from .factory import CrawlerFactory
+from .utils import Utils, Tracer
+
+# 公告目录的处理状态，与 AnnouncementCatalog.STATUSES 保持一致，
+# 在此列出以免解析参数时就导入数据库相关模块
+CATALOG_STATUSES = ('listed', 'pending', 'downloaded', 'failed', 'filtered', 'no_attachment')
+
+def print_cache_stats(stats):
+    """打印缓存占用汇总"""
+    print(f"缓存总计: {stats['total_count']} 个文件, {Utils.format_file_size(stats['total_size'])}")
+    if stats['max_size_bytes']:
+        print(f"容量上限: {Utils.format_file_size(stats['max_size_bytes'])}")
+    if stats['max_entries']:
+        print(f"条目上限: {stats['max_entries']}")
+    for title, groups in (("按股票代码", stats['by_stock']), ("按接口类型", stats['by_endpoint'])):
+        print(f"{title}:")
+        for name, group in sorted(groups.items()):
+            print(f"  {name}: {group['count']} 个文件, {Utils.format_file_size(group['size'])}")
+
+def list_cache(cache_manager, args):
+    """基于缓存索引流式列出缓存文件，支持过滤和JSON输出"""
+    entries = cache_manager.iter_cache_entries(
+        stock_codes=set(args.stock) if args.stock else None,
+        endpoints=set(args.endpoint) if args.endpoint else None,
+        min_age_days=args.min_age,
+        max_age_days=args.max_age
+    )
+    if args.json:
+        try:
+            for entry in entries:
+                sys.stdout.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            sys.stdout.flush()
+        except BrokenPipeError:
+            # 输出通过管道交给 head 等命令时，对方提前关闭不算错误；
+            # 把标准输出指向空设备，避免解释器退出时刷新缓冲区再次报错
+            devnull = os.open(os.devnull, os.O_WRONLY)
+            os.dup2(devnull, sys.stdout.fileno())
+        return
+    
+    print("列出缓存文件...")
+    count = 0
+    for entry in entries:
+        count += 1
+        print(f"股票代码: {entry['stock_code']}")
+        print(f"文件名: {entry['filename']}")
+        print(f"路径: {entry['full_path']}")
+        print(f"大小: {Utils.format_file_size(entry['size'])}")
+        print(f"缓存时间: {entry['cache_time'] or '未知'}")
+        print("-" * 50)
+    if count == 0:
+        print("没有找到缓存文件")
+    print_cache_stats(cache_manager.get_cache_stats())
+
+def run_shards(args, tracer=None):
+    """分片模式: 按股票代码哈希把 stock_codes 分到多个进程或主机上爬取"""
+    from .processors import ShardCoordinator
+    
+    coordinator = ShardCoordinator(
+        config_file=args.config,
+        shard_count=args.shards,
+        download_dir=args.download_dir,
+        cache_dir=args.cache_dir,
+        workers=args.workers,
+        resume=args.resume,
+        tracer=tracer
+    )
+    if args.merge_shards:
+        merged = coordinator.merge_results(coordinator.load_results())
+    else:
+        for shard_index, stock_codes in sorted(coordinator.plan().items()):
+            print(f"分片 {shard_index}: {len(stock_codes)} 只股票")
+        merged = coordinator.run(shard_indexes=args.shard_index)
+    
+    print(f"已合并分片: {merged['shards']}")
+    for key, value in sorted(merged['stats'].items()):
+        print(f"  {key}: {value}")
+    if args.manifest:
+        coordinator.write_manifest(merged['manifest'], args.manifest)
+        print(f"下载清单已写入: {args.manifest} ({len(merged['manifest'])} 条)")
+
+def run_queue(args, config_manager, tracer=None):
+    """队列模式: 多个节点共享一个SQLite任务队列分工爬取"""
+    from .core import WorkQueue
+    from .processors import QueueWorker
+    
+    work_queue = WorkQueue(
+        args.queue,
+        lease_seconds=config_manager.queue_lease_seconds,
+        max_attempts=config_manager.queue_max_attempts
+    )
+    if args.seed:
+        added = QueueWorker.seed(work_queue, config_manager.stock_codes)
+        print(f"已加入 {added} 只股票的列表页任务")
+    if args.queue_status:
+        for status, count in sorted(work_queue.counts().items()):
+            print(f"{status}: {count}")
+        return
+    if args.seed:
+        return
+    
+    worker = QueueWorker(
+        work_queue,
+        config_file=args.config,
+        download_dir=args.download_dir,
+        cache_dir=args.cache_dir,
+        worker_id=args.worker_id,
+        tracer=tracer
+    )
+    print(f"工作节点 {worker.worker_id} 开始处理队列: {args.queue}")
+    processed = worker.run()
+    print(f"工作节点 {worker.worker_id} 共处理 {processed} 个任务，队列状态: {work_queue.counts()}")
+
+def search_text(args, config_manager):
+    """在PDF全文索引中检索公告"""
+    from .core import TextIndex
+    
+    db_path = args.text_index or config_manager.text_index_db
+    if not db_path:
+        print("未配置全文索引数据库，请在配置文件中设置 text_index_db 或使用 --text-index 指定")
+        return
+    text_index = TextIndex(db_path)
+    if text_index.is_slow_query(args.search) and not args.json:
+        print(f"检索词少于{TextIndex.MIN_TRIGRAM_QUERY}个字，无法使用全文索引，将逐篇扫描正文，索引较大时较慢")
+    try:
+        results = text_index.search(
+            args.search,
+            stock_code=args.stock[0] if args.stock else None,
+            column_name=args.column,
+            date_from=args.date_from,
+            date_to=args.date_to,
+            limit=args.limit
+        )
+    finally:
+        text_index.close()
+    for result in results:
+        if args.json:
+            sys.stdout.write(json.dumps(result, ensure_ascii=False) + '\n')
+        else:
+            print(f"{result['notice_date']} {result['stock_code']} [{result['column_name']}] {result['title']}")
+            print(f"  {result['snippet']}")
+            print(f"  {result['filename']}")
+    if not args.json:
+        print(f"共找到 {len(results)} 条结果")
+
+def query_catalog(args, config_manager):
+    """查询本地公告目录，例如某只股票某类公告在日期范围内尚未下载的公告"""
+    from .core import AnnouncementCatalog
+    
+    db_path = args.catalog or config_manager.catalog_db
+    if not db_path:
+        print("未配置公告目录数据库，请在配置文件中设置 catalog_db 或使用 --catalog 指定")
+        return
+    catalog = AnnouncementCatalog(db_path)
+    filters = {
+        'stock_codes': args.stock,
+        'column_name': args.column,
+        'date_from': args.date_from,
+        'date_to': args.date_to,
+    }
+    try:
+        rows = catalog.query(statuses=args.status, limit=args.limit, **filters)
+        counts = catalog.counts(**filters) if not args.json else None
+    finally:
+        catalog.close()
+    for row in rows:
+        if args.json:
+            sys.stdout.write(json.dumps(row, ensure_ascii=False) + '\n')
+        else:
+            print(f"{row['notice_date']} {row['stock_code']} [{row['column_name']}] {row['status']:<13} {row['title']}")
+    if counts is not None:
+        summary = ', '.join(f"{status}: {count}" for status, count in sorted(counts.items()))
+        print(f"显示 {len(rows)} 条，满足条件的公告按状态统计: {summary or '无'}")
+
+def run_watch(args, tracer=None):
+    """监视模式: 常驻进程按计划轮询各股票的第一页公告，发现新公告立即下载"""
+    from .processors import StockWatcher
+    
+    watcher = StockWatcher(
+        config_file=args.config,
+        download_dir=args.download_dir,
+        cache_dir=args.cache_dir,
+        interval=args.interval,
+        stock_codes=args.stock,
+        tracer=tracer
+    )
+    watcher.run()
+
+def export_metadata(args, cache_manager):
+    """把缓存中的公告元数据导出为 JSON Lines、CSV 或 Parquet"""
+    from .processors import MetadataExporter
+    
+    exporter = MetadataExporter(cache_manager, args.export, args.export_format)
+    print(f"导出公告元数据到: {args.export} (格式: {exporter.output_format})")
+    count = exporter.export(stock_codes=set(args.stock) if args.stock else None, full=args.full_export)
+    print(f"本次导出 {count} 条公告，累计 {len(exporter.state['art_codes'])} 条")
+
+def import_archive(args, factory):
+    """把已有下载目录中的PDF硬链接或移动到下载目录，并登记到公告目录"""
+    from .core import AnnouncementCatalog
+    from .processors import ArchiveImporter
+    
+    if not factory.storage.is_local:
+        print("导入已有下载目录只支持本地存储 (storage_backend 为 local)")
+        return
+    db_path = args.catalog or factory.config_manager.catalog_db
+    if not db_path:
+        print("导入需要公告目录数据库，请在配置文件中设置 catalog_db 或使用 --catalog 指定")
+        return
+    catalog = AnnouncementCatalog(db_path)
+    importer = ArchiveImporter(factory.download_dir, catalog, factory.file_index)
+    print(f"导入 {args.import_dir} 到 {factory.download_dir}/ ({'移动' if args.move else '硬链接'})")
+    try:
+        stats = importer.import_dir(args.import_dir, move=args.move)
+    finally:
+        catalog.close()
+    print(f"导入完成: 硬链接 {stats['linked']}，移动 {stats['moved']}，已在下载目录 {stats['existing']}，"
+          f"同名冲突 {stats['conflict']}，不符合命名规则 {stats['skipped']}，失败 {stats['failed']}")
+
+def transfer_cache(args, cache_manager):
+    """把整个响应缓存导出为一个打包文件，或从打包文件导入缓存"""
+    from .processors import CacheBundle
+    
+    bundle = CacheBundle(cache_manager)
+    if args.export_cache:
+        count = bundle.export(args.export_cache, stock_codes=set(args.stock) if args.stock else None)
+        print(f"已导出 {count} 个缓存文件到: {args.export_cache}")
+        return
+    count = bundle.load(args.import_cache)
+    stats = bundle.stats
+    print(f"已导入 {count} 个缓存文件，本地已有更新版本 {stats['newer_local']}，"
+          f"校验未通过 {stats['invalid']}，写入失败 {stats['failed']}")
+
+def run_plan(args, tracer=None):
+    """生成抓取计划并估算请求数、流量和耗时，或执行已生成的计划"""
+    from .processors import CrawlPlanner
+    
+    planner = CrawlPlanner(
+        config_file=args.config,
+        download_dir=args.download_dir,
+        cache_dir=args.cache_dir,
+        stock_codes=args.stock,
+        offline=args.offline,
+        tracer=tracer
+    )
+    try:
+        if args.run_plan:
+            plan = CrawlPlanner.load(args.run_plan)
+            print(f"执行抓取计划: {args.run_plan} ({len(plan['items'])} 条公告)")
+            stats = planner.execute(plan)
+            for key, value in sorted(stats.items()):
+                print(f"  {key}: {value}")
+            return
+        plan = planner.plan()
+        planner.save(plan, args.plan)
+    finally:
+        planner.close()
+    CrawlPlanner.report(plan)
+    print(f"抓取计划已保存到: {args.plan}，使用 --run-plan {args.plan} 执行")
+
+def run_profiled(func, output):
+    """在 cProfile 下运行 func，保存统计结果并输出累计耗时最多的函数"""
+    import cProfile
+    import pstats
+    
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func)
+    finally:
+        profiler.dump_stats(output)
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(20)
+        print(f"性能分析结果已保存到: {output} (可用 python -m pstats 查看)")
+
+def dispatch(args, factory):
+    """按命令行参数执行对应的模式，没有指定特殊命令时正常运行爬虫"""
+    if args.clean_cache:
+        print("清理过期缓存...")
+        factory.cache_manager.clean_expired_cache()
+        print("缓存清理完成！")
+        return
+    
+    if args.list_cache:
+        list_cache(factory.cache_manager, args)
+        return
+    
+    if args.query:
+        query_catalog(args, factory.config_manager)
+        return
+    
+    if args.export_cache or args.import_cache:
+        transfer_cache(args, factory.cache_manager)
+        return
+    
+    if args.import_dir:
+        import_archive(args, factory)
+        return
+    
+    if args.export:
+        export_metadata(args, factory.cache_manager)
+        return
+    
+    if args.search:
+        search_text(args, factory.config_manager)
+        return
+    
+    if args.plan or args.run_plan:
+        run_plan(args, factory.tracer)
+        return
+    
+    if args.shards:
+        run_shards(args, factory.tracer)
+        return
+    
+    if args.watch:
+        run_watch(args, factory.tracer)
+        return
+    
+    if args.queue:
+        run_queue(args, factory.config_manager, factory.tracer)
+        return
+    
+    # 正常运行爬虫
+    crawler = factory.create_crawler()
+    print(f"开始爬取股票 {factory.config_manager.stock_code} 的公告...")
+    print(f"PDF文件将保存到: {factory.download_dir}/")
+    print(f"缓存文件将保存到: {factory.cache_dir}/")
+    crawler.run(resume=args.resume)
+    print("爬取完成！")
+    
+    if args.offline and args.missing_output:
+        missing_urls = factory.http_client.missing_urls
+        with open(args.missing_output, 'w', encoding='utf-8') as f:
+            for url in missing_urls:
+                f.write(url + '\n')
+        print(f"缓存缺失的 {len(missing_urls)} 个请求已写入: {args.missing_output}")
 
 def main():
     """命令行主函数"""
@@ -20,6 +354,21 @@ def main():
   %(prog)s -d custom_downloads # 使用自定义下载目录
   %(prog)s --cache-dir custom_cache # 使用自定义缓存目录
   %(prog)s --version          # 显示版本信息
+  %(prog)s --shards 8 --manifest manifest.jsonl # 8个进程分片爬取 stock_codes
+  %(prog)s --shards 8 --shard-index 0 --shard-index 1 # 本机只负责第0、1个分片
+  %(prog)s --queue /shared/queue.db --seed # 把 stock_codes 加入共享任务队列
+  %(prog)s --queue /shared/queue.db        # 作为工作节点处理队列中的任务
+  %(prog)s --watch --interval 120 # 常驻监视 stock_codes，每约2分钟轮询一次
+  %(prog)s --search 回购 --stock 601225 # 在PDF全文索引中检索
+  %(prog)s --query --stock 601225 --column 回购 --date-from 20230101 --status pending --status failed # 尚未下载的公告
+  %(prog)s --export announcements.parquet --export-format parquet # 增量导出公告元数据
+  %(prog)s --export-cache cache.jsonl.gz # 把响应缓存打包，在新节点上用 --import-cache 预热
+  %(prog)s --import-dir /backup/downloads # 硬链接导入已有的PDF，之后爬取时不再请求其详情
+  %(prog)s --resume           # 从上次中断的断点继续
+  %(prog)s --trace trace.json # 记录各环节耗时，可在 chrome://tracing 中打开，结束时输出最慢的调用
+  %(prog)s --profile crawl.prof # 在 cProfile 下运行并保存统计结果
+  %(prog)s --offline --missing-output missing.txt # 只用缓存重放，记录缺失的请求
+  %(prog)s --list-cache --stock 601225 --endpoint announcement_detail --max-age 1 --json
         """
     )
     
@@ -54,55 +403,269 @@ def main():
     parser.add_argument(
         '--list-cache',
         action='store_true',
-        help='列出缓存文件'
+        help='列出缓存文件，配合 --stock 时也列出该股票用到的共享详情缓存 (stock_code 为 _shared)'
+    )
+    
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='从上次中断的断点继续爬取'
+    )
+    
+    parser.add_argument(
+        '--shards',
+        type=int,
+        help='分片模式: 把配置中的 stock_codes 按稳定哈希分成N个分片，每个分片一个工作进程'
+    )
+    
+    parser.add_argument(
+        '--shard-index',
+        type=int,
+        action='append',
+        help='只运行指定序号的分片，可重复指定，用于多台主机共享文件系统时各自负责一部分 (配合 --shards 使用)'
+    )
+    
+    parser.add_argument(
+        '--workers',
+        type=int,
+        help='分片模式下的工作进程数 (默认: 分片数与CPU核数的较小值)'
+    )
+    
+    parser.add_argument(
+        '--merge-shards',
+        action='store_true',
+        help='不爬取，只合并各分片已写入的统计和下载清单 (配合 --shards 使用)'
+    )
+    
+    parser.add_argument(
+        '--manifest',
+        help='分片模式下把合并后的下载清单写入指定的JSON Lines文件'
+    )
+    
+    parser.add_argument(
+        '--queue',
+        help='队列模式: 使用指定的SQLite数据库文件作为多节点共享的任务队列'
+    )
+    
+    parser.add_argument(
+        '--seed',
+        action='store_true',
+        help='把配置中的 stock_codes 加入任务队列 (配合 --queue 使用)'
+    )
+    
+    parser.add_argument(
+        '--queue-status',
+        action='store_true',
+        help='显示任务队列中各状态的任务数量 (配合 --queue 使用)'
+    )
+    
+    parser.add_argument(
+        '--worker-id',
+        help='工作节点标识 (默认: 主机名-进程号)'
+    )
+    
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='监视模式: 常驻运行，按计划轮询每只股票的第一页公告，只在出现新公告时处理'
+    )
+    
+    parser.add_argument(
+        '--interval',
+        type=float,
+        help='监视模式下每只股票的轮询间隔秒数 (默认从配置文件 watch_interval 读取)'
+    )
+    
+    parser.add_argument(
+        '--offline',
+        action='store_true',
+        help='离线模式: 只使用缓存(包括过期缓存)，不发起网络请求、不等待、不下载PDF'
+    )
+    
+    parser.add_argument(
+        '--missing-output',
+        help='离线模式下把缓存缺失的请求URL写入指定文件，每行一个'
+    )
+    
+    parser.add_argument(
+        '--trace',
+        help='把每页列表、每条公告的详情、磁盘检查、PDF下载和等待的耗时写入 Chrome trace 格式的文件，结束时输出最慢的调用'
+    )
+    
+    parser.add_argument(
+        '--profile',
+        help='在 cProfile 下运行 (所有模式均可) 并把统计结果保存到指定文件'
+    )
+    
+    parser.add_argument(
+        '--plan',
+        help='只获取列表页生成抓取计划，估算详情请求数、PDF数量、流量和耗时，保存到指定文件'
+    )
+    
+    parser.add_argument(
+        '--run-plan',
+        help='执行 --plan 生成的抓取计划，不再获取列表页'
+    )
+    
+    parser.add_argument(
+        '--search',
+        help='在PDF全文索引中检索关键词，至少3个字时使用索引，更短的词逐篇扫描正文'
+    )
+    
+    parser.add_argument(
+        '--text-index',
+        help='PDF全文索引数据库路径 (默认从配置文件 text_index_db 读取)'
+    )
+    
+    parser.add_argument(
+        '--export',
+        help='把缓存中的公告元数据导出到指定文件 (.jsonl/.csv) 或目录 (parquet)，默认只追加新增公告'
+    )
+    
+    parser.add_argument(
+        '--export-format',
+        choices=['jsonl', 'csv', 'parquet'],
+        help='导出格式 (默认根据 --export 的扩展名推断)'
+    )
+    
+    parser.add_argument(
+        '--full-export',
+        action='store_true',
+        help='清除已有的导出结果和导出状态，重新全量导出 (配合 --export 使用)'
+    )
+    
+    parser.add_argument(
+        '--export-cache',
+        help='把响应缓存导出为一个 JSON Lines 打包文件 (.gz 结尾时压缩)，可用 --stock 过滤'
+    )
+    
+    parser.add_argument(
+        '--import-cache',
+        help='从打包文件导入响应缓存，保留原来的缓存时间，本地已有更新版本的缓存不覆盖'
+    )
+    
+    parser.add_argument(
+        '--import-dir',
+        help='把已有下载目录中的PDF硬链接到下载目录并登记到公告目录，不复制文件'
+    )
+    
+    parser.add_argument(
+        '--move',
+        action='store_true',
+        help='导入时移动文件而不是硬链接 (配合 --import-dir 使用)'
+    )
+    
+    parser.add_argument(
+        '--query',
+        action='store_true',
+        help='查询本地公告目录，可按 --stock、--column、--date-from、--date-to、--status 过滤'
+    )
+    
+    parser.add_argument(
+        '--catalog',
+        help='本地公告目录数据库路径 (默认从配置文件 catalog_db 读取，配合 --query、--import-dir 使用)'
+    )
+    
+    parser.add_argument(
+        '--status',
+        action='append',
+        choices=CATALOG_STATUSES,
+        help='只返回指定处理状态的公告，可重复指定 (配合 --query 使用)'
+    )
+    
+    parser.add_argument(
+        '--column',
+        help='只返回指定公告类型的结果 (配合 --search、--query 使用)'
+    )
+    
+    parser.add_argument(
+        '--date-from',
+        help='只返回公告日期不早于 YYYYMMDD 的结果 (配合 --search、--query 使用)'
+    )
+    
+    parser.add_argument(
+        '--date-to',
+        help='只返回公告日期不晚于 YYYYMMDD 的结果 (配合 --search、--query 使用)'
+    )
+    
+    parser.add_argument(
+        '--limit',
+        type=int,
+        default=20,
+        help='最多返回的结果数 (默认: 20)'
+    )
+    
+    parser.add_argument(
+        '--stock',
+        action='append',
+        help='只处理指定股票代码，可重复指定 (配合 --list-cache、--search、--query、--export、--export-cache、--watch、--plan 使用)'
+    )
+    
+    parser.add_argument(
+        '--endpoint',
+        action='append',
+        choices=['announcement_list', 'announcement_detail', 'other'],
+        help='只列出指定接口类型的缓存，可重复指定 (配合 --list-cache 使用)'
+    )
+    
+    parser.add_argument(
+        '--min-age',
+        type=float,
+        help='只列出缓存时间早于指定天数的缓存 (配合 --list-cache 使用)'
+    )
+    
+    parser.add_argument(
+        '--max-age',
+        type=float,
+        help='只列出缓存时间在指定天数以内的缓存 (配合 --list-cache 使用)'
+    )
+    
+    parser.add_argument(
+        '--json',
+        action='store_true',
+        help='以JSON Lines格式输出，便于脚本处理'
     )
     
     args = parser.parse_args()
     
+    # 解析参数之后再导入工厂，--version、--help 等不需要加载爬虫组件
+    from .factory import CrawlerFactory
+    
+    if not os.path.exists(args.config):
+        print(f"错误: 配置文件 '{args.config}' 不存在")
+        sys.exit(1)
+    
+    tracer = Tracer(args.trace) if args.trace else None
+    factory = None
     try:
         # 创建工厂实例，支持命令行参数覆盖配置文件
         factory = CrawlerFactory(
             config_file=args.config,
             download_dir=args.download_dir,
-            cache_dir=args.cache_dir
+            cache_dir=args.cache_dir,
+            offline=args.offline,
+            tracer=tracer
         )
+        if args.profile:
+            run_profiled(lambda: dispatch(args, factory), args.profile)
+        else:
+            dispatch(args, factory)
         
-        # 处理特殊命令
-        if args.clean_cache:
-            print("清理过期缓存...")
-            factory.cache_manager.clean_expired_cache()
-            print("缓存清理完成！")
-            return
-        
-        if args.list_cache:
-            print("列出缓存文件...")
-            cache_files = factory.cache_manager.list_cache_files()
-            if cache_files:
-                for cache_file in cache_files:
-                    print(f"股票代码: {cache_file['stock_code']}")
-                    print(f"文件名: {cache_file['filename']}")
-                    print(f"路径: {cache_file['full_path']}")
-                    if cache_file['metadata']:
-                        print(f"缓存时间: {cache_file['metadata'].get('cache_time', '未知')}")
-                    print("-" * 50)
-            else:
-                print("没有找到缓存文件")
-            return
-        
-        # 正常运行爬虫
-        crawler = factory.create_crawler()
-        print(f"开始爬取股票 {factory.config_manager.stock_code} 的公告...")
-        print(f"PDF文件将保存到: {factory.download_dir}/")
-        print(f"缓存文件将保存到: {factory.cache_dir}/")
-        crawler.run()
-        print("爬取完成！")
-        
-    except FileNotFoundError:
-        print(f"错误: 配置文件 '{args.config}' 不存在")
+    except FileNotFoundError as e:
+        # 配置文件已在上面检查，这里是 --run-plan、--import-dir 等参数指定的文件不存在
+        print(f"错误: 文件 '{e.filename or e}' 不存在")
         sys.exit(1)
     except Exception as e:
         print(f"程序运行出错: {e}")
         sys.exit(1)
+    finally:
+        # 所有模式都在这里释放资源、保存耗时追踪
+        if factory is not None:
+            factory.close()
+        if tracer is not None:
+            tracer.close()
+            tracer.report()
+            print(f"耗时追踪已保存到: {args.trace}")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -2,7 +2,18 @@
 核心模块 - 包含配置管理和缓存管理
 """
 
-from .config_manager import ConfigManager
-from .cache_manager import CacheManager
+from .._lazy import lazy_module
 
-__all__ = ['ConfigManager', 'CacheManager'] 
\ No newline at end of file
+# 类名到所在子模块的映射，首次访问时才导入对应子模块，避免 import 时加载全部依赖
+_LAZY_IMPORTS = {
+    'ConfigManager': '.config_manager',
+    'CacheManager': '.cache_manager',
+    'CheckpointManager': '.checkpoint_manager',
+    'WorkQueue': '.work_queue',
+    'TextIndex': '.text_index',
+    'AnnouncementCatalog': '.catalog',
+    'FileIndex': '.file_index',
+    'Announcement': '.announcement'
+}
+
+__all__, __getattr__, __dir__ = lazy_module(__name__, _LAZY_IMPORTS)
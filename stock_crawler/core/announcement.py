@@ -0,0 +1,69 @@
+from ..utils import FileNaming
+
+class Announcement:
+    """公告记录，从列表或详情接口的JSON中解析一次，在爬取、调度和下载各环节之间传递
+    
+    使用 __slots__ 固定字段，大量待处理公告排队时内存占用只有嵌套字典的一小部分
+    """
+    
+    __slots__ = ('art_code', 'stock_code', 'short_name', 'title', 'notice_date', 'column_name',
+                 'attach_url', 'attach_size', 'filename')
+    
+    def __init__(self, art_code, stock_code='', short_name='', title='', notice_date='', column_name='',
+                 attach_url=None, attach_size=0, filename=None):
+        self.art_code = art_code
+        self.stock_code = stock_code
+        self.short_name = short_name
+        self.title = title
+        # 接口返回的原始日期，如 2023-01-18 00:00:00
+        self.notice_date = notice_date
+        self.column_name = column_name
+        self.attach_url = attach_url
+        # 附件大小，单位KB，0表示未知
+        self.attach_size = attach_size
+        # PDF的保存路径，确定需要下载后才设置
+        self.filename = filename
+    
+    @classmethod
+    def from_list_item(cls, item):
+        """从列表接口的一条公告解析"""
+        codes = item.get('codes') or [{}]
+        columns = item.get('columns') or [{}]
+        return cls(
+            item.get('art_code'),
+            stock_code=codes[0].get('stock_code', ''),
+            short_name=codes[0].get('short_name', ''),
+            title=item.get('title', ''),
+            notice_date=item.get('notice_date') or '',
+            column_name=columns[0].get('column_name') or ''
+        )
+    
+    @classmethod
+    def from_dict(cls, data):
+        """从 to_dict 的结果还原，兼容列表接口的原始格式（如队列中旧版本写入的任务）"""
+        if 'codes' in data or 'columns' in data:
+            return cls.from_list_item(data)
+        return cls(**{key: data[key] for key in cls.__slots__ if key in data})
+    
+    def apply_detail(self, detail):
+        """用详情接口返回的 data 字段补全附件信息，标题、日期和股票信息以详情为准"""
+        security = (detail.get('security') or [{}])[0]
+        self.stock_code = security.get('stock', self.stock_code)
+        self.short_name = security.get('short_name', self.short_name)
+        self.title = detail.get('notice_title', self.title)
+        self.notice_date = detail.get('notice_date', self.notice_date)
+        self.attach_url = detail.get('attach_url')
+        raw_attach_size = detail.get('attach_size')
+        self.attach_size = 0 if raw_attach_size in (None, '', 'null') else int(raw_attach_size)
+    
+    @property
+    def notice_day(self):
+        """公告日期的 YYYYMMDD 形式，与文件名中的日期一致，无法识别时为空字符串"""
+        return FileNaming.compact_date(str(self.notice_date or ''))
+    
+    def to_dict(self):
+        """转为字典，用于写入任务队列、下载清单等JSON数据"""
+        return {key: getattr(self, key) for key in self.__slots__}
+    
+    def __repr__(self):
+        return f"Announcement({self.art_code!r}, {self.title!r})"
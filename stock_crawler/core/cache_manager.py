@@ -1,25 +1,311 @@
 import os
+import copy
 import json
+import time
 import hashlib
+from collections import OrderedDict
 from datetime import datetime
 from urllib.parse import urlparse, parse_qs, urlencode
+from ..utils import Utils
+
+class _IndexState:
+    """缓存索引的内存状态，同一缓存目录下各股票的 CacheManager 视图共用一份"""
+    
+    __slots__ = ('index', 'dirty', 'total_size', 'swept', 'journal', 'last_compact')
+    
+    def __init__(self):
+        # 缓存索引: 相对路径 -> 条目信息，按最近访问时间排序（最久未使用的在前）
+        self.index = None
+        # 是否有尚未写入索引文件的变更（访问时间或日志中的记录）
+        self.dirty = False
+        self.total_size = 0
+        # 索引变更日志的文件对象（追加模式，懒打开）
+        self.journal = None
+        self.last_compact = time.time()
+        # 本进程是否已做过过期清理
+        self.swept = False
 
 class CacheManager:
-    """缓存管理类，负责缓存文件的创建、读取、保存和清理"""
+    """缓存管理类，负责缓存文件的创建、读取、保存和清理
+    
+    列表缓存按股票代码分目录存放；公告详情只与 art_code 有关，存放在共享目录中，
+    联合公告在多只股票之间只缓存一份。爬取多只股票时通过 for_stock 取得各股票的视图，
+    所有视图共用一份缓存索引，过期清理也只做一次
+    """
     
-    def __init__(self, cache_dir=None, stock_code='unknown', expire_days=7):
+    INDEX_FILENAME = '.cache_index.json'
+    # 索引变更日志: 新增和删除的条目逐行追加，不重写整个索引；加载时在索引之后重放，压缩时清空
+    JOURNAL_FILENAME = '.cache_index.journal'
+    # 跨股票共享的缓存目录名（公告详情）
+    SHARED_NAMESPACE = '_shared'
+    # 距上次压缩超过该秒数时，flush_index 把索引整体写回并清空变更日志；访问时间只在压缩时保存
+    INDEX_COMPACT_SECONDS = 300
+    EVICTION_POLICIES = ('lru', 'size')
+    
+    def __init__(self, cache_dir=None, stock_code='unknown', expire_days=7,
+                 max_size_bytes=None, max_entries=None, eviction_policy='lru'):
         self.cache_dir = cache_dir or 'cache'
         self.stock_code = stock_code
         self.expire_days = expire_days
         self.stock_cache_dir = os.path.join(self.cache_dir, stock_code)
+        # 缓存容量上限，None或0表示不限制
+        self.max_size_bytes = max_size_bytes or None
+        self.max_entries = max_entries or None
+        if eviction_policy not in self.EVICTION_POLICIES:
+            print(f"未知的缓存淘汰策略 {eviction_policy}，使用 lru")
+            eviction_policy = 'lru'
+        self.eviction_policy = eviction_policy
+        self.shared_cache_dir = os.path.join(self.cache_dir, self.SHARED_NAMESPACE)
+        self.index_file = os.path.join(self.cache_dir, self.INDEX_FILENAME)
+        self.journal_file = os.path.join(self.cache_dir, self.JOURNAL_FILENAME)
+        self._state = _IndexState()
         self._init_cache_dirs()
     
     def _init_cache_dirs(self):
         """初始化缓存目录"""
+        for directory in (self.cache_dir, self.stock_cache_dir, self.shared_cache_dir):
+            if not os.path.exists(directory):
+                os.makedirs(directory)
+    
+    def for_stock(self, stock_code):
+        """返回指定股票的缓存视图，与当前实例共用缓存索引、容量上限和过期清理状态"""
+        if stock_code == self.stock_code:
+            return self
+        view = copy.copy(self)
+        view.stock_code = stock_code
+        view.stock_cache_dir = os.path.join(self.cache_dir, stock_code)
+        view._init_cache_dirs()
+        return view
+    
+    @staticmethod
+    def _endpoint_from_filename(filename):
+        """根据缓存文件名判断接口类型"""
+        if filename.startswith('announcement_list'):
+            return 'announcement_list'
+        if filename.startswith('announcement_detail'):
+            return 'announcement_detail'
+        return 'other'
+    
+    def _relative_key(self, cache_file):
+        """缓存文件相对于缓存根目录的路径，作为索引键"""
+        return os.path.relpath(cache_file, self.cache_dir).replace(os.sep, '/')
+    
+    def _load_index(self):
+        """加载缓存索引并重放变更日志，索引不存在或损坏时扫描一次缓存目录重建"""
+        index = None
+        if os.path.exists(self.index_file):
+            try:
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    entries = json.load(f).get('entries', {})
+                index = OrderedDict(
+                    sorted(entries.items(), key=lambda kv: kv[1].get('last_access', 0))
+                )
+            except Exception as e:
+                print(f"加载缓存索引失败，将重建索引: {e}")
+        if index is None:
+            index = self._rebuild_index()
+            self._state.dirty = True
+        if self._replay_journal(index):
+            self._state.dirty = True
+        self._state.index = index
+        self._state.total_size = sum(entry.get('size', 0) for entry in index.values())
+    
+    def _replay_journal(self, index):
+        """把变更日志中的记录应用到索引，返回是否有记录；中断时写了一半的行直接跳过"""
+        if not os.path.exists(self.journal_file):
+            return False
+        replayed = False
+        try:
+            with open(self.journal_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    key = record.get('key')
+                    if not key:
+                        continue
+                    index.pop(key, None)
+                    if record.get('entry') is not None:
+                        index[key] = record['entry']
+                    replayed = True
+        except Exception as e:
+            print(f"读取缓存索引日志失败: {e}")
+        return replayed
+    
+    def _journal(self, key, entry):
+        """向变更日志追加一条记录，entry 为 None 表示删除"""
+        self._state.dirty = True
+        try:
+            if self._state.journal is None:
+                self._state.journal = open(self.journal_file, 'a', encoding='utf-8')
+            self._state.journal.write(json.dumps({'key': key, 'entry': entry}, ensure_ascii=False) + '\n')
+            self._state.journal.flush()
+        except Exception as e:
+            print(f"写入缓存索引日志失败: {e}")
+    
+    def _rebuild_index(self):
+        """扫描缓存目录重建索引（只读取文件属性，不解析文件内容），缓存时间取文件的修改时间"""
+        entries = []
         if not os.path.exists(self.cache_dir):
-            os.makedirs(self.cache_dir)
-        if not os.path.exists(self.stock_cache_dir):
-            os.makedirs(self.stock_cache_dir)
+            return OrderedDict()
+        for root_entry in os.scandir(self.cache_dir):
+            if root_entry.is_dir():
+                stock_code = root_entry.name
+                if stock_code.startswith('.'):
+                    continue
+                candidates = [(stock_code, e) for e in os.scandir(root_entry.path)]
+            else:
+                candidates = [('root', root_entry)]
+            for stock_code, entry in candidates:
+                if not entry.is_file() or not entry.name.endswith('.json') or entry.name.startswith('.'):
+                    continue
+                stat = entry.stat()
+                entries.append((self._relative_key(entry.path), {
+                    'stock_code': stock_code,
+                    'endpoint': self._endpoint_from_filename(entry.name),
+                    'size': stat.st_size,
+                    'cache_time': datetime.fromtimestamp(stat.st_mtime).isoformat(),
+                    'last_access': stat.st_atime,
+                }))
+        entries.sort(key=lambda kv: kv[1]['last_access'])
+        return OrderedDict(entries)
+    
+    @property
+    def index(self):
+        """获取缓存索引（懒加载）"""
+        if self._state.index is None:
+            self._load_index()
+        return self._state.index
+    
+    def flush_index(self, force=False):
+        """压缩缓存索引: 整体写回索引文件（先写临时文件再替换）并清空变更日志
+        
+        新增和删除的条目已经写入变更日志，这里主要保存访问时间；force 为 False 时距上次压缩
+        不足 INDEX_COMPACT_SECONDS 秒则跳过，运行结束时以 force=True 调用
+        """
+        state = self._state
+        if state.index is None or not state.dirty:
+            return
+        if not force and time.time() - state.last_compact < self.INDEX_COMPACT_SECONDS:
+            return
+        try:
+            Utils.atomic_write_json(self.index_file, {'version': 1, 'entries': state.index})
+            if state.journal is not None:
+                state.journal.close()
+                state.journal = None
+            # 索引已包含日志中的全部记录，清空日志
+            open(self.journal_file, 'w').close()
+            state.dirty = False
+            state.last_compact = time.time()
+        except Exception as e:
+            print(f"保存缓存索引失败: {e}")
+    
+    def _touch_index(self, cache_file):
+        """记录缓存条目的访问时间，索引中缺失的条目顺便补录"""
+        key = self._relative_key(cache_file)
+        entry = self.index.get(key)
+        if entry is None:
+            stat = os.stat(cache_file)
+            self._add_to_index(cache_file, stat.st_size,
+                               datetime.fromtimestamp(stat.st_mtime).isoformat())
+            self._note_stock(self.index[key])
+            return
+        # 访问时间只更新内存，压缩索引时才写回
+        entry['last_access'] = time.time()
+        self._state.index.move_to_end(key)
+        self._note_stock(entry)
+        self._state.dirty = True
+    
+    def _note_stock(self, entry):
+        """在共享缓存条目上记录用到它的股票代码，按股票过滤缓存时共享的详情也归入各只股票"""
+        if entry.get('stock_code') != self.SHARED_NAMESPACE:
+            return
+        stocks = entry.setdefault('stocks', [])
+        if self.stock_code not in stocks:
+            stocks.append(self.stock_code)
+            self._state.dirty = True
+    
+    def _add_to_index(self, cache_file, size, cache_time):
+        """新增或更新缓存索引条目"""
+        key = self._relative_key(cache_file)
+        old_entry = self.index.pop(key, None)
+        if old_entry is not None:
+            self._state.total_size -= old_entry.get('size', 0)
+        stock_code = key.split('/', 1)[0] if '/' in key else 'root'
+        entry = {
+            'stock_code': stock_code,
+            'endpoint': self._endpoint_from_filename(os.path.basename(cache_file)),
+            'size': size,
+            'cache_time': cache_time,
+            'last_access': time.time(),
+        }
+        if old_entry is not None and 'stocks' in old_entry:
+            entry['stocks'] = old_entry['stocks']
+        self._state.index[key] = entry
+        self._state.total_size += size
+        self._journal(key, entry)
+    
+    def get_index_entry(self, cache_file):
+        """获取缓存文件在索引中的条目，不存在时返回None"""
+        return self.index.get(self._relative_key(cache_file))
+    
+    def register_cache_file(self, cache_file, size, cache_time=None):
+        """登记由外部写入的缓存文件（如从缓存打包导入），保留给定的缓存时间"""
+        self._add_to_index(cache_file, size, cache_time or datetime.now().isoformat())
+    
+    def _remove_from_index(self, cache_file):
+        """从缓存索引中移除条目"""
+        key = self._relative_key(cache_file)
+        entry = self.index.pop(key, None)
+        if entry is not None:
+            self._state.total_size -= entry.get('size', 0)
+            self._journal(key, None)
+    
+    def _is_over_limit(self, size, count):
+        """判断缓存是否超过容量上限"""
+        if self.max_size_bytes and size > self.max_size_bytes:
+            return True
+        if self.max_entries and count > self.max_entries:
+            return True
+        return False
+    
+    def _eviction_candidates(self):
+        """按淘汰策略给出候选条目顺序"""
+        if self.eviction_policy == 'size':
+            # 每个条目重新获取的代价都是一次请求，优先淘汰体积最大的条目，单次淘汰释放最多空间
+            return sorted(self._state.index, key=lambda k: self._state.index[k].get('size', 0), reverse=True)
+        # LRU: OrderedDict 头部即最久未使用的条目
+        return list(self._state.index)
+    
+    def enforce_limits(self, protect_file=None):
+        """超过容量上限时淘汰缓存，淘汰到上限的90%以减少频繁淘汰"""
+        index = self.index
+        if not self._is_over_limit(self._state.total_size, len(index)):
+            return 0
+        target_size = self.max_size_bytes * 0.9 if self.max_size_bytes else None
+        target_count = int(self.max_entries * 0.9) if self.max_entries else None
+        protect_key = self._relative_key(protect_file) if protect_file else None
+        evicted_count = 0
+        for key in self._eviction_candidates():
+            size_ok = target_size is None or self._state.total_size <= target_size
+            count_ok = target_count is None or len(index) <= target_count
+            if size_ok and count_ok:
+                break
+            if key == protect_key:
+                continue
+            cache_file = os.path.join(self.cache_dir, *key.split('/'))
+            try:
+                if os.path.exists(cache_file):
+                    os.remove(cache_file)
+            except Exception as e:
+                print(f"淘汰缓存文件失败 {key}: {e}")
+                continue
+            self._remove_from_index(cache_file)
+            evicted_count += 1
+        if evicted_count > 0:
+            print(f"缓存超过容量上限，已淘汰 {evicted_count} 个缓存文件")
+        return evicted_count
     
     def _clean_url_params(self, url):
         """清理URL中的时间戳参数"""
@@ -38,6 +324,11 @@ class CacheManager:
         
         return clean_url, query_params
     
+    def request_key(self, url):
+        """规范化的请求标识，去除时间戳参数并按参数名排序，相同的请求得到相同的标识"""
+        clean_url, query_params = self._clean_url_params(url)
+        return f"{clean_url.split('?', 1)[0]}?{urlencode(sorted(query_params.items()), doseq=True)}"
+    
     def generate_cache_filename(self, url):
         """根据URL生成缓存文件名"""
         clean_url, query_params = self._clean_url_params(url)
@@ -53,20 +344,27 @@ class CacheManager:
             request_type = 'announcement_detail'
             art_code = query_params.get('art_code', ['unknown'])[0]
             filename = f"{request_type}_{art_code}.json"
-            return os.path.join(self.stock_cache_dir, filename)
+            shared_file = os.path.join(self.shared_cache_dir, filename)
+            # 旧版本按股票目录缓存的详情在过期前继续使用
+            legacy_file = os.path.join(self.stock_cache_dir, filename)
+            index = self.index
+            if self._relative_key(shared_file) not in index and self._relative_key(legacy_file) in index:
+                return legacy_file
+            return shared_file
         else:
             request_type = 'other'
             filename = f"{request_type}_unknown.json"
             return os.path.join(self.cache_dir, filename)
     
     def is_cache_expired(self, cache_file):
-        """检查缓存是否过期"""
+        """检查缓存是否过期，缓存时间优先取自缓存索引，索引中没有时才访问文件系统"""
         try:
-            if not os.path.exists(cache_file):
-                return True
-            
-            file_time = os.path.getctime(cache_file)
-            file_datetime = datetime.fromtimestamp(file_time)
+            entry = self.index.get(self._relative_key(cache_file))
+            file_datetime = self._parse_cache_time(entry.get('cache_time')) if entry else None
+            if file_datetime is None:
+                if not os.path.exists(cache_file):
+                    return True
+                file_datetime = datetime.fromtimestamp(os.path.getmtime(cache_file))
             current_datetime = datetime.now()
             
             time_diff = current_datetime - file_datetime
@@ -80,20 +378,34 @@ class CacheManager:
             print(f"检查缓存过期状态失败: {e}")
             return True
     
-    def load_cache(self, cache_file):
-        """从缓存文件加载数据"""
+    def load_cache(self, cache_file, allow_expired=False):
+        """从缓存文件加载数据，allow_expired 为 True 时忽略过期且不删除缓存
+        
+        索引中已有的条目直接打开文件，不再逐个检查存在性和创建时间
+        """
         try:
-            if os.path.exists(cache_file):
-                if self.is_cache_expired(cache_file):
+            indexed = self._relative_key(cache_file) in self.index
+            if indexed or os.path.exists(cache_file):
+                if not allow_expired and self.is_cache_expired(cache_file):
                     try:
                         os.remove(cache_file)
                         print(f"已删除过期缓存: {cache_file}")
+                    except FileNotFoundError:
+                        pass
                     except Exception as e:
                         print(f"删除过期缓存失败: {e}")
+                        return None
+                    self._remove_from_index(cache_file)
                     return None
                 
-                with open(cache_file, 'r', encoding='utf-8') as f:
-                    cache_data = json.load(f)
+                try:
+                    with open(cache_file, 'r', encoding='utf-8') as f:
+                        cache_data = json.load(f)
+                except FileNotFoundError:
+                    # 索引中的文件已被外部删除
+                    self._remove_from_index(cache_file)
+                    return None
+                self._touch_index(cache_file)
                 
                 if isinstance(cache_data, dict) and 'data' in cache_data:
                     return cache_data['data']
@@ -106,9 +418,10 @@ class CacheManager:
     def save_cache(self, cache_file, data, original_url=None):
         """保存数据到缓存文件"""
         try:
+            cache_time = datetime.now().isoformat()
             cache_data = {
                 'metadata': {
-                    'cache_time': datetime.now().isoformat(),
+                    'cache_time': cache_time,
                     'original_url': original_url,
                     'cache_file': cache_file,
                     'cache_expire_days': self.expire_days
@@ -116,47 +429,40 @@ class CacheManager:
                 'data': data
             }
             
-            with open(cache_file, 'w', encoding='utf-8') as f:
-                json.dump(cache_data, f, ensure_ascii=False, indent=2)
+            Utils.atomic_write_json(cache_file, cache_data, indent=2)
             print(f"数据已缓存到: {cache_file}")
+            self._add_to_index(cache_file, os.path.getsize(cache_file), cache_time)
+            self._note_stock(self.index[self._relative_key(cache_file)])
+            self.enforce_limits(protect_file=cache_file)
         except Exception as e:
             print(f"保存缓存失败: {e}")
     
     def clean_expired_cache(self):
-        """清理过期的缓存文件"""
+        """按缓存索引清理所有股票的过期缓存文件，共用索引的各视图在一个进程内只清理一次"""
+        if self._state.swept:
+            return
         try:
             if not os.path.exists(self.cache_dir):
                 return
             
             cleaned_count = 0
-            
-            # 清理股票代码缓存目录
-            if os.path.exists(self.stock_cache_dir):
-                for filename in os.listdir(self.stock_cache_dir):
-                    if filename.endswith('.json'):
-                        cache_file = os.path.join(self.stock_cache_dir, filename)
-                        if self.is_cache_expired(cache_file):
-                            try:
-                                os.remove(cache_file)
-                                cleaned_count += 1
-                                print(f"已清理过期缓存: {self.stock_code}/{filename}")
-                            except Exception as e:
-                                print(f"清理缓存文件失败 {self.stock_code}/{filename}: {e}")
-            
-            # 清理根目录下的其他缓存文件
-            for filename in os.listdir(self.cache_dir):
-                if filename.endswith('.json'):
-                    cache_file = os.path.join(self.cache_dir, filename)
-                    if self.is_cache_expired(cache_file):
-                        try:
+            for key in list(self.index):
+                cache_file = os.path.join(self.cache_dir, *key.split('/'))
+                if self.is_cache_expired(cache_file):
+                    try:
+                        if os.path.exists(cache_file):
                             os.remove(cache_file)
-                            cleaned_count += 1
-                            print(f"已清理过期缓存: {filename}")
-                        except Exception as e:
-                            print(f"清理缓存文件失败 {filename}: {e}")
+                        self._remove_from_index(cache_file)
+                        cleaned_count += 1
+                        print(f"已清理过期缓存: {key}")
+                    except Exception as e:
+                        print(f"清理缓存文件失败 {key}: {e}")
             
             if cleaned_count > 0:
                 print(f"共清理了 {cleaned_count} 个过期缓存文件")
+            self._state.swept = True
+            self.enforce_limits()
+            self.flush_index()
         except Exception as e:
             print(f"清理过期缓存失败: {e}")
     
@@ -171,7 +477,7 @@ class CacheManager:
                     return cache_data['metadata']
                 else:
                     return {
-                        'cache_time': datetime.fromtimestamp(os.path.getctime(cache_file)).isoformat(),
+                        'cache_time': datetime.fromtimestamp(os.path.getmtime(cache_file)).isoformat(),
                         'cache_file': cache_file,
                         'format': 'legacy'
                     }
@@ -179,41 +485,82 @@ class CacheManager:
             print(f"获取缓存元数据失败: {e}")
         return None
     
+    @staticmethod
+    def _parse_cache_time(cache_time):
+        """解析索引中的 ISO 格式缓存时间"""
+        for fmt in ('%Y-%m-%dT%H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S'):
+            try:
+                return datetime.strptime(cache_time, fmt)
+            except (TypeError, ValueError):
+                continue
+        return None
+    
+    def iter_cache_entries(self, stock_codes=None, endpoints=None, min_age_days=None, max_age_days=None):
+        """从缓存索引逐条产出缓存信息，不读取缓存文件内容
+        
+        stock_codes/endpoints 为可选的过滤集合，共享的详情缓存按用到它的股票匹配 stock_codes，
+        min_age_days/max_age_days 按缓存时间过滤
+        """
+        now = datetime.now()
+        for key, entry in list(self.index.items()):
+            if (stock_codes and entry.get('stock_code') not in stock_codes
+                    and not any(code in stock_codes for code in entry.get('stocks', ()))):
+                continue
+            if endpoints and entry.get('endpoint') not in endpoints:
+                continue
+            if min_age_days is not None or max_age_days is not None:
+                cache_datetime = self._parse_cache_time(entry.get('cache_time'))
+                if cache_datetime is None:
+                    continue
+                age_days = (now - cache_datetime).total_seconds() / 86400
+                if min_age_days is not None and age_days < min_age_days:
+                    continue
+                if max_age_days is not None and age_days > max_age_days:
+                    continue
+            yield {
+                'stock_code': entry.get('stock_code', 'root'),
+                'endpoint': entry.get('endpoint', 'other'),
+                'filename': key.rsplit('/', 1)[-1],
+                'full_path': os.path.join(self.cache_dir, *key.split('/')),
+                'size': entry.get('size', 0),
+                'cache_time': entry.get('cache_time'),
+                'last_access': entry.get('last_access'),
+                # 共享的详情缓存记录用到它的股票
+                'stocks': entry.get('stocks', []),
+            }
+    
     def list_cache_files(self):
-        """列出所有缓存文件及其信息"""
+        """列出当前股票、根目录及当前股票用到的共享缓存文件及其信息（基于缓存索引）"""
         try:
             if not os.path.exists(self.cache_dir):
                 print("缓存目录不存在")
                 return []
             
             cache_files = []
-            
-            # 列出股票代码缓存目录中的文件
-            if os.path.exists(self.stock_cache_dir):
-                for filename in os.listdir(self.stock_cache_dir):
-                    if filename.endswith('.json'):
-                        cache_file = os.path.join(self.stock_cache_dir, filename)
-                        metadata = self.get_cache_metadata(cache_file)
-                        cache_files.append({
-                            'stock_code': self.stock_code,
-                            'filename': filename,
-                            'full_path': cache_file,
-                            'metadata': metadata
-                        })
-            
-            # 列出根目录下的其他缓存文件
-            for filename in os.listdir(self.cache_dir):
-                if filename.endswith('.json'):
-                    cache_file = os.path.join(self.cache_dir, filename)
-                    metadata = self.get_cache_metadata(cache_file)
-                    cache_files.append({
-                        'stock_code': 'root',
-                        'filename': filename,
-                        'full_path': cache_file,
-                        'metadata': metadata
-                    })
-            
+            for entry in self.iter_cache_entries(stock_codes={self.stock_code, 'root'}):
+                entry['metadata'] = {'cache_time': entry['cache_time']}
+                cache_files.append(entry)
             return cache_files
         except Exception as e:
             print(f"列出缓存文件失败: {e}")
-            return [] 
\ No newline at end of file
+            return []
+    
+    def get_cache_stats(self):
+        """从缓存索引汇总缓存大小，按股票代码和接口类型分组"""
+        by_stock = {}
+        by_endpoint = {}
+        for entry in self.index.values():
+            size = entry.get('size', 0)
+            for groups, name in ((by_stock, entry.get('stock_code', 'root')),
+                                 (by_endpoint, entry.get('endpoint', 'other'))):
+                group = groups.setdefault(name, {'count': 0, 'size': 0})
+                group['count'] += 1
+                group['size'] += size
+        return {
+            'total_count': len(self._state.index),
+            'total_size': self._state.total_size,
+            'max_size_bytes': self.max_size_bytes,
+            'max_entries': self.max_entries,
+            'by_stock': by_stock,
+            'by_endpoint': by_endpoint,
+        }
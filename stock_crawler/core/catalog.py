@@ -0,0 +1,202 @@
+import os
+import time
+import sqlite3
+import threading
+
+class AnnouncementCatalog:
+    """本地公告目录，基于SQLite记录每条公告的元数据和处理状态
+    
+    按股票、日期、公告类型和状态建立索引，百万级公告也能在毫秒级完成查询，
+    爬取时据此跳过已下载或没有附件的公告，不再请求详情
+    """
+    
+    STATUS_LISTED = 'listed'
+    STATUS_PENDING = 'pending'
+    STATUS_DOWNLOADED = 'downloaded'
+    STATUS_FAILED = 'failed'
+    STATUS_FILTERED = 'filtered'
+    STATUS_NO_ATTACHMENT = 'no_attachment'
+    STATUSES = (STATUS_LISTED, STATUS_PENDING, STATUS_DOWNLOADED, STATUS_FAILED,
+                STATUS_FILTERED, STATUS_NO_ATTACHMENT)
+    FIELDS = ('art_code', 'stock_code', 'short_name', 'title', 'notice_date', 'column_name',
+              'attach_url', 'attach_size', 'filename', 'status', 'updated_at')
+    
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self._changed = False
+        self._init_db()
+    
+    def _init_db(self):
+        """初始化公告表和索引，使用WAL模式以便查询时不阻塞爬虫写入"""
+        with self.lock:
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS announcements (
+                    art_code TEXT PRIMARY KEY,
+                    stock_code TEXT NOT NULL DEFAULT '',
+                    short_name TEXT NOT NULL DEFAULT '',
+                    title TEXT NOT NULL DEFAULT '',
+                    notice_date TEXT NOT NULL DEFAULT '',
+                    column_name TEXT NOT NULL DEFAULT '',
+                    attach_url TEXT,
+                    attach_size INTEGER,
+                    filename TEXT,
+                    status TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            ''')
+            for name, columns in (('stock_date', 'stock_code, notice_date'),
+                                  ('column_date', 'column_name, notice_date'),
+                                  ('status_date', 'status, notice_date'),
+                                  ('date', 'notice_date'),
+                                  ('filename', 'filename')):
+                self.conn.execute(f'CREATE INDEX IF NOT EXISTS idx_announcements_{name} ON announcements ({columns})')
+            # 从已有下载目录导入的PDF，爬取时按列表信息推算出的文件名与之匹配，无需请求详情
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS imported_files (
+                    filename TEXT PRIMARY KEY,
+                    short_name TEXT NOT NULL DEFAULT '',
+                    column_name TEXT NOT NULL DEFAULT '',
+                    notice_date TEXT NOT NULL DEFAULT '',
+                    title TEXT NOT NULL DEFAULT '',
+                    size INTEGER,
+                    imported_at REAL NOT NULL
+                )
+            ''')
+            self.conn.commit()
+    
+    @staticmethod
+    def normalize_date(value):
+        """统一日期格式为 YYYYMMDD，兼容 YYYY-MM-DD 和带时间的日期"""
+        if not value:
+            return ''
+        return str(value)[:10].replace('-', '')
+    
+    def record_listed(self, announcements):
+        """记录列表页中的公告（Announcement 列表），已存在的公告保持原有状态不变"""
+        now = time.time()
+        rows = [(a.art_code, a.stock_code, a.short_name, a.title, self.normalize_date(a.notice_date),
+                 a.column_name, self.STATUS_LISTED, now)
+                for a in announcements if a.art_code]
+        with self.lock:
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO announcements '
+                '(art_code, stock_code, short_name, title, notice_date, column_name, status, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                rows
+            )
+            self.conn.commit()
+            self._changed = True
+    
+    def update(self, art_code, status, **fields):
+        """更新公告状态和元数据，公告不存在时新建"""
+        values = {key: value for key, value in fields.items() if key in self.FIELDS and value is not None}
+        if 'notice_date' in values:
+            values['notice_date'] = self.normalize_date(values['notice_date'])
+        values['status'] = status
+        values['updated_at'] = time.time()
+        columns = ', '.join(values)
+        placeholders = ', '.join('?' for _ in values)
+        assignments = ', '.join(f'{column} = excluded.{column}' for column in values)
+        with self.lock:
+            self.conn.execute(
+                f'INSERT INTO announcements (art_code, {columns}) VALUES (?, {placeholders}) '
+                f'ON CONFLICT(art_code) DO UPDATE SET {assignments}',
+                [art_code] + list(values.values())
+            )
+            self.conn.commit()
+            self._changed = True
+    
+    def record_imported(self, files):
+        """记录导入的PDF，files 为包含 filename、short_name、column_name、notice_date、title、size 的字典列表"""
+        now = time.time()
+        rows = [(os.path.abspath(f['filename']), f.get('short_name', ''), f.get('column_name', ''),
+                 self.normalize_date(f.get('notice_date')), f.get('title', ''), f.get('size'), now)
+                for f in files]
+        with self.lock:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO imported_files '
+                '(filename, short_name, column_name, notice_date, title, size, imported_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                rows
+            )
+            self.conn.commit()
+            self._changed = True
+    
+    def is_imported(self, filename):
+        """文件是否是导入的PDF"""
+        with self.lock:
+            row = self.conn.execute('SELECT 1 FROM imported_files WHERE filename = ?',
+                                    (os.path.abspath(filename),)).fetchone()
+        return row is not None
+    
+    def filename_owner(self, filename, exclude=None):
+        """返回已占用该保存路径（待下载或已下载）的公告 art_code，exclude 为不计入的公告"""
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT art_code FROM announcements WHERE filename = ? AND art_code != ? AND status IN (?, ?) LIMIT 1',
+                (filename, exclude or '', self.STATUS_PENDING, self.STATUS_DOWNLOADED)
+            ).fetchone()
+        return row['art_code'] if row else None
+    
+    def average_attach_size(self):
+        """已知附件大小(KB)的平均值，没有记录时返回None"""
+        with self.lock:
+            row = self.conn.execute('SELECT AVG(attach_size) AS size FROM announcements WHERE attach_size > 0').fetchone()
+        return row['size']
+    
+    def get(self, art_code):
+        """获取一条公告，不存在时返回None"""
+        with self.lock:
+            row = self.conn.execute('SELECT * FROM announcements WHERE art_code = ?', (art_code,)).fetchone()
+        return dict(row) if row else None
+    
+    def _where(self, stock_codes=None, column_name=None, date_from=None, date_to=None, statuses=None):
+        """根据过滤条件构建 WHERE 子句和参数"""
+        conditions = []
+        params = []
+        for column, values in (('stock_code', stock_codes), ('status', statuses)):
+            if values:
+                values = list(values)
+                conditions.append(f"{column} IN ({', '.join('?' for _ in values)})")
+                params.extend(values)
+        for condition, value in (('column_name = ?', column_name),
+                                 ('notice_date >= ?', self.normalize_date(date_from)),
+                                 ('notice_date <= ?', self.normalize_date(date_to))):
+            if value:
+                conditions.append(condition)
+                params.append(value)
+        return (' WHERE ' + ' AND '.join(conditions)) if conditions else '', params
+    
+    def query(self, stock_codes=None, column_name=None, date_from=None, date_to=None, statuses=None, limit=None):
+        """按股票、公告类型、日期范围（YYYYMMDD）和状态查询公告，按公告日期倒序返回"""
+        where, params = self._where(stock_codes, column_name, date_from, date_to, statuses)
+        sql = f'SELECT * FROM announcements{where} ORDER BY notice_date DESC, art_code'
+        if limit:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        with self.lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+    
+    def counts(self, stock_codes=None, column_name=None, date_from=None, date_to=None):
+        """按状态统计满足条件的公告数量"""
+        where, params = self._where(stock_codes, column_name, date_from, date_to)
+        with self.lock:
+            rows = self.conn.execute(
+                f'SELECT status, COUNT(*) AS n FROM announcements{where} GROUP BY status', params
+            ).fetchall()
+        return {row['status']: row['n'] for row in rows}
+    
+    def close(self):
+        """关闭数据库连接，有写入时更新索引统计信息，让查询规划器选择区分度最高的索引"""
+        with self.lock:
+            if self._changed:
+                # 只抽样部分行，百万级数据也只需几毫秒
+                self.conn.execute('PRAGMA analysis_limit=1000')
+                self.conn.execute('ANALYZE')
+                self.conn.commit()
+            self.conn.close()
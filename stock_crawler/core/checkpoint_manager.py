@@ -0,0 +1,142 @@
+import os
+import json
+import threading
+from datetime import datetime
+from ..utils import Utils
+
+class CheckpointManager:
+    """断点管理类，负责记录单只股票的爬取进度，支持中断后从断点继续
+    
+    断点由快照文件 {股票代码}.json 和事件日志 {股票代码}.journal 组成: 开始下载和处理结束的事件逐行追加到日志，
+    不重写整个已完成集合；加载时在快照之上重放日志，并压缩为新的快照
+    """
+    
+    CHECKPOINT_DIRNAME = '.checkpoints'
+    
+    def __init__(self, cache_dir='cache', stock_code='unknown'):
+        self.stock_code = stock_code
+        self.checkpoint_dir = os.path.join(cache_dir, self.CHECKPOINT_DIRNAME)
+        self.checkpoint_file = os.path.join(self.checkpoint_dir, f"{stock_code}.json")
+        self.journal_file = os.path.join(self.checkpoint_dir, f"{stock_code}.journal")
+        self.lock = threading.Lock()
+        self._journal = None
+        self._reset_state()
+    
+    def _reset_state(self):
+        """重置为空的进度"""
+        self.page_index = 1
+        self.item_index = 0
+        self.completed = set()
+        self.in_flight = {}
+    
+    def load(self):
+        """加载断点快照并重放事件日志，之后压缩为新的快照；不存在或损坏时返回False"""
+        try:
+            if not os.path.exists(self.checkpoint_file) and not os.path.exists(self.journal_file):
+                return False
+            state = {}
+            if os.path.exists(self.checkpoint_file):
+                with open(self.checkpoint_file, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+            self.page_index = state.get('page_index', 1)
+            self.item_index = state.get('item_index', 0)
+            self.completed = set(state.get('completed', []))
+            self.in_flight = dict(state.get('in_flight', {}))
+            self._replay()
+        except Exception as e:
+            print(f"加载断点文件失败: {e}")
+            self._reset_state()
+            return False
+        self.save()
+        return True
+    
+    def _replay(self):
+        """按顺序应用事件日志中的记录，中断时写了一半的行直接跳过"""
+        if not os.path.exists(self.journal_file):
+            return
+        with open(self.journal_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                if 'start' in event:
+                    self.in_flight[event['start']] = event.get('filename')
+                elif 'finish' in event:
+                    self._apply_finish(event['finish'], event.get('success'), event.get('position'))
+    
+    def _apply_finish(self, art_code, success, position):
+        """在内存中记录公告处理结束，调用方需持有锁"""
+        self.in_flight.pop(art_code, None)
+        if success and art_code:
+            self.completed.add(art_code)
+        if position is not None:
+            self.page_index, self.item_index = position
+    
+    def _append(self, event):
+        """向事件日志追加一条记录，调用方需持有锁"""
+        try:
+            if self._journal is None:
+                if not os.path.exists(self.checkpoint_dir):
+                    os.makedirs(self.checkpoint_dir, exist_ok=True)
+                self._journal = open(self.journal_file, 'a', encoding='utf-8')
+            self._journal.write(json.dumps(event, ensure_ascii=False) + '\n')
+            self._journal.flush()
+        except Exception as e:
+            print(f"写入断点日志失败: {e}")
+    
+    def _close_journal(self):
+        """关闭事件日志文件，调用方需持有锁"""
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+    
+    def save(self):
+        """原子地保存完整的断点快照并清空事件日志，持锁写入保证多个下载线程不会互相覆盖"""
+        with self.lock:
+            state = {
+                'stock_code': self.stock_code,
+                'page_index': self.page_index,
+                'item_index': self.item_index,
+                'completed': sorted(self.completed),
+                'in_flight': dict(self.in_flight),
+                'updated_at': datetime.now().isoformat(),
+            }
+            try:
+                if not os.path.exists(self.checkpoint_dir):
+                    os.makedirs(self.checkpoint_dir, exist_ok=True)
+                Utils.atomic_write_json(self.checkpoint_file, state)
+                # 快照已包含日志中的全部事件
+                self._close_journal()
+                open(self.journal_file, 'w').close()
+            except Exception as e:
+                print(f"保存断点文件失败: {e}")
+    
+    def clear(self):
+        """爬取完成后删除断点快照和事件日志"""
+        with self.lock:
+            self._close_journal()
+            self._reset_state()
+            for path in (self.checkpoint_file, self.journal_file):
+                try:
+                    if os.path.exists(path):
+                        os.remove(path)
+                except Exception as e:
+                    print(f"删除断点文件失败: {e}")
+    
+    def is_completed(self, art_code):
+        """公告是否已处理完成"""
+        return art_code in self.completed
+    
+    def start_download(self, art_code, filename):
+        """记录开始下载的文件"""
+        with self.lock:
+            self.in_flight[art_code] = filename
+            self._append({'start': art_code, 'filename': filename})
+    
+    def finish_item(self, art_code, success=True, position=None):
+        """记录公告处理结束，成功时加入已完成集合，position 为 (页码, 下一条的页内序号)"""
+        with self.lock:
+            self._apply_finish(art_code, success, position)
+            self._append({'finish': art_code, 'success': bool(success),
+                          'position': list(position) if position is not None else None})
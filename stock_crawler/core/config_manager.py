@@ -26,6 +26,16 @@ class ConfigManager:
         """获取股票代码"""
         return self.get('stock_code', 'unknown')
     
+    @property
+    def stock_codes(self):
+        """获取要爬取的股票代码列表，未配置 stock_codes 时只包含 stock_code"""
+        value = self.get('stock_codes', None)
+        if isinstance(value, str):
+            return [value]
+        if isinstance(value, list) and value:
+            return value
+        return [self.stock_code]
+    
     @property
     def f_node(self):
         """获取公告大类"""
@@ -41,6 +51,171 @@ class ConfigManager:
         """获取缓存过期天数"""
         return self.get('cache_expire_days', 7)
     
+    @property
+    def cache_max_bytes(self):
+        """获取缓存容量上限（字节），未配置表示不限制"""
+        return self.get('cache_max_bytes', None)
+    
+    @property
+    def cache_max_entries(self):
+        """获取缓存条目数上限，未配置表示不限制"""
+        return self.get('cache_max_entries', None)
+    
+    @property
+    def cache_eviction_policy(self):
+        """获取缓存淘汰策略: lru(最久未使用优先) 或 size(体积最大优先)"""
+        return self.get('cache_eviction_policy', 'lru')
+    
+    @property
+    def download_order(self):
+        """获取下载排序策略: list(列表顺序)、newest(最新优先)、smallest(最小优先)、column(按公告类型优先级)"""
+        return self.get('download_order', 'list')
+    
+    @property
+    def column_priority(self):
+        """获取公告类型优先级列表，download_order 为 column 时生效"""
+        value = self.get('column_priority', None)
+        if isinstance(value, str):
+            return [value]
+        if isinstance(value, list):
+            return value
+        return []
+    
+    @property
+    def download_workers(self):
+        """获取同时下载PDF的线程数"""
+        return self.get('download_workers', 1)
+    
+    @property
+    def max_large_downloads(self):
+        """获取大文件同时下载数上限"""
+        return self.get('max_large_downloads', 1)
+    
+    @property
+    def download_queue_size(self):
+        """获取等待下载的任务数上限，达到时暂停获取详情，0表示不限制"""
+        return self.get('download_queue_size', 200)
+    
+    @property
+    def large_file_kb(self):
+        """获取大文件阈值（KB）"""
+        return self.get('large_file_kb', 10240)
+    
+    @property
+    def download_rate_limit_kb(self):
+        """获取单个PDF下载的限速（KB/s），未配置表示不限速"""
+        return self.get('download_rate_limit_kb', None)
+    
+    @property
+    def global_rate_limit_kb(self):
+        """获取所有PDF下载合计的限速（KB/s），未配置表示不限速"""
+        return self.get('global_rate_limit_kb', None)
+    
+    @property
+    def download_budget_mb(self):
+        """获取单次运行的PDF下载流量预算（MB），未配置表示不限制"""
+        return self.get('download_budget_mb', None)
+    
+    @property
+    def global_request_rate(self):
+        """获取分片模式下所有工作进程合计的每秒请求数，未配置时每个进程各自每秒1条"""
+        return self.get('global_request_rate', None)
+    
+    @property
+    def queue_lease_seconds(self):
+        """获取工作队列任务的租约时长（秒），超时未完成的任务会重新分配"""
+        return self.get('queue_lease_seconds', 300)
+    
+    @property
+    def queue_max_attempts(self):
+        """获取工作队列任务的最大尝试次数"""
+        return self.get('queue_max_attempts', 3)
+    
+    @property
+    def text_index_db(self):
+        """获取PDF全文索引数据库路径，未配置表示不建立全文索引"""
+        return self.get('text_index_db', None)
+    
+    @property
+    def text_index_workers(self):
+        """获取提取PDF正文的进程数"""
+        return self.get('text_index_workers', 2)
+    
+    @property
+    def retry_max_attempts(self):
+        """获取网络请求和PDF下载的最大尝试次数"""
+        return self.get('retry_max_attempts', 4)
+    
+    @property
+    def retry_base_delay(self):
+        """获取重试退避的基础等待秒数，每次失败后上限翻倍"""
+        return self.get('retry_base_delay', 1.0)
+    
+    @property
+    def retry_max_delay(self):
+        """获取重试退避的最长等待秒数"""
+        return self.get('retry_max_delay', 60)
+    
+    @property
+    def circuit_failure_rate(self):
+        """获取触发熔断的主机错误率，最近20次请求中失败比例达到该值时暂停请求该主机"""
+        return self.get('circuit_failure_rate', 0.5)
+    
+    @property
+    def circuit_cooldown(self):
+        """获取熔断后暂停请求的秒数"""
+        return self.get('circuit_cooldown', 30)
+    
+    @property
+    def watch_interval(self):
+        """获取监视模式下每只股票的轮询间隔（秒）"""
+        return self.get('watch_interval', 300)
+    
+    @property
+    def watch_jitter(self):
+        """获取监视模式轮询间隔的随机抖动比例，避免固定周期请求"""
+        return self.get('watch_jitter', 0.2)
+    
+    @property
+    def catalog_db(self):
+        """获取本地公告目录数据库路径，未配置表示不记录公告目录"""
+        return self.get('catalog_db', None)
+    
+    @property
+    def plan_default_attach_kb(self):
+        """获取抓取计划估算流量时的默认附件大小(KB)，缓存和公告目录中都没有已知大小时使用"""
+        return self.get('plan_default_attach_kb', 500)
+    
+    @property
+    def storage_backend(self):
+        """获取PDF存储后端: local 保存到下载目录，s3 直接上传到 S3 兼容的对象存储"""
+        return self.get('storage_backend', 'local')
+    
+    @property
+    def s3_bucket(self):
+        """获取对象存储的存储桶名称"""
+        return self.get('s3_bucket', None)
+    
+    @property
+    def s3_prefix(self):
+        """获取对象存储中PDF的键前缀，之后的路径与下载目录中的相对路径一致"""
+        return self.get('s3_prefix', '')
+    
+    @property
+    def s3_endpoint_url(self):
+        """获取对象存储的服务地址，使用 MinIO 等兼容服务时配置，未配置时使用 AWS S3"""
+        return self.get('s3_endpoint_url', None)
+    
+    @property
+    def s3_region(self):
+        """获取对象存储的区域，未配置时使用 boto3 的默认配置"""
+        return self.get('s3_region', None)
+    
+    @property
+    def s3_part_size_mb(self):
+        """获取分片上传的分片大小(MB)，最小为5"""
+        return self.get('s3_part_size_mb', 8)
+    
     @property
     def download_dir(self):
         """获取下载目录"""
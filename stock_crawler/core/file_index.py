@@ -0,0 +1,87 @@
+import os
+import threading
+
+class FileIndex:
+    """下载目录的内存索引，线程安全，减少网络文件系统上的元数据请求
+    
+    每个目录在首次访问时用一次 scandir 读入全部文件名，之后的存在性检查直接查内存；文件大小
+    只在需要时获取一次并记住，目录在一次运行中只创建一次。下载完成的文件由调用方通过 add 登记
+    """
+    
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.lock = threading.Lock()
+        # 目录绝对路径 -> {文件名: 大小或None(尚未获取)}，目录不存在时为None
+        self.dirs = {}
+    
+    def covers(self, path):
+        """路径是否位于索引的根目录之下"""
+        path = os.path.abspath(path)
+        return path == self.root or path.startswith(self.root + os.sep)
+    
+    def _listing(self, directory):
+        """获取目录的文件列表，首次访问时扫描，调用方需持有锁"""
+        if directory not in self.dirs:
+            try:
+                with os.scandir(directory) as entries:
+                    self.dirs[directory] = {entry.name: None for entry in entries if not entry.is_dir()}
+            except FileNotFoundError:
+                self.dirs[directory] = None
+        return self.dirs[directory]
+    
+    def exists(self, path):
+        """文件是否存在"""
+        directory, name = os.path.split(os.path.abspath(path))
+        with self.lock:
+            listing = self._listing(directory)
+            return listing is not None and name in listing
+    
+    def getsize(self, path):
+        """文件大小（字节），文件不存在时返回None"""
+        directory, name = os.path.split(os.path.abspath(path))
+        with self.lock:
+            listing = self._listing(directory)
+            if listing is None or name not in listing:
+                return None
+            if listing[name] is None:
+                try:
+                    listing[name] = os.path.getsize(os.path.join(directory, name))
+                except FileNotFoundError:
+                    # 扫描后被外部删除
+                    del listing[name]
+                    return None
+            return listing[name]
+    
+    def makedirs(self, directory):
+        """创建目录（含上级目录），同一目录在一次运行中只创建一次"""
+        directory = os.path.abspath(directory)
+        with self.lock:
+            # 已存在的目录顺便完成扫描，紧接着的文件检查不再访问文件系统
+            if self._listing(directory) is not None:
+                return
+            os.makedirs(directory, exist_ok=True)
+            self.dirs[directory] = {}
+    
+    def add(self, path, size=None):
+        """登记新写入的文件"""
+        directory, name = os.path.split(os.path.abspath(path))
+        with self.lock:
+            listing = self.dirs.get(directory)
+            if listing is None:
+                # 目录未扫描或之前不存在，下次访问时重新扫描
+                self.dirs.pop(directory, None)
+                return
+            listing[name] = size
+    
+    def discard(self, path):
+        """登记被删除的文件"""
+        directory, name = os.path.split(os.path.abspath(path))
+        with self.lock:
+            listing = self.dirs.get(directory)
+            if listing:
+                listing.pop(name, None)
+    
+    def clear(self):
+        """丢弃全部索引，长时间运行的进程定期调用以感知外部的文件变化"""
+        with self.lock:
+            self.dirs.clear()
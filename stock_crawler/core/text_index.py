@@ -0,0 +1,117 @@
+import sqlite3
+import threading
+
+class TextIndex:
+    """公告全文索引类，基于SQLite FTS5把PDF正文建成倒排索引，检索时不再读取PDF文件
+    
+    FTS5 表中的 art_code 等元数据列不建索引，另用普通表 document_ids 记录 art_code 到 rowid 的映射，
+    替换和判断是否已索引都按主键查找，不扫描全文表
+    """
+    
+    # trigram 分词器能用索引匹配的最短检索词长度
+    MIN_TRIGRAM_QUERY = 3
+    
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.tokenizer = self._init_db()
+        self._init_ids()
+    
+    def _init_db(self):
+        """初始化全文索引表，优先使用 trigram 分词器以支持中文子串检索"""
+        row = self.conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'documents'"
+        ).fetchone()
+        if row is not None:
+            return 'trigram' if 'trigram' in row['sql'] else 'unicode61'
+        for tokenizer in ('trigram', 'unicode61'):
+            try:
+                self.conn.execute(f'''
+                    CREATE VIRTUAL TABLE documents USING fts5(
+                        title, content,
+                        art_code UNINDEXED, stock_code UNINDEXED, notice_date UNINDEXED,
+                        column_name UNINDEXED, filename UNINDEXED,
+                        tokenize = '{tokenizer}'
+                    )
+                ''')
+                self.conn.commit()
+                return tokenizer
+            except sqlite3.OperationalError as e:
+                # 旧版本SQLite没有 trigram 分词器
+                print(f"全文索引分词器 {tokenizer} 不可用: {e}")
+        raise RuntimeError("当前SQLite不支持FTS5全文索引")
+    
+    def _init_ids(self):
+        """创建 art_code 到 rowid 的映射表，旧版本建立的索引在首次打开时补齐映射"""
+        exists = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'document_ids'"
+        ).fetchone()
+        if exists:
+            return
+        self.conn.execute('CREATE TABLE document_ids (art_code TEXT PRIMARY KEY, doc_rowid INTEGER NOT NULL)')
+        self.conn.execute('INSERT OR REPLACE INTO document_ids (art_code, doc_rowid) SELECT art_code, rowid FROM documents')
+        self.conn.commit()
+    
+    def add_document(self, record, content):
+        """写入或替换一篇公告的正文，record 包含 art_code、stock_code、notice_date、column_name、filename 等字段"""
+        art_code = record['art_code']
+        with self.lock:
+            row = self.conn.execute('SELECT doc_rowid FROM document_ids WHERE art_code = ?', (art_code,)).fetchone()
+            if row is not None:
+                self.conn.execute('DELETE FROM documents WHERE rowid = ?', (row['doc_rowid'],))
+            cursor = self.conn.execute(
+                'INSERT INTO documents (title, content, art_code, stock_code, notice_date, column_name, filename) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (record.get('title', ''), content, art_code, record.get('stock_code', ''),
+                 record.get('notice_date', ''), record.get('column_name', ''), record.get('filename', ''))
+            )
+            self.conn.execute('INSERT OR REPLACE INTO document_ids (art_code, doc_rowid) VALUES (?, ?)',
+                              (art_code, cursor.lastrowid))
+            self.conn.commit()
+    
+    def has_document(self, art_code):
+        """公告是否已建立索引"""
+        with self.lock:
+            row = self.conn.execute('SELECT 1 FROM document_ids WHERE art_code = ?', (art_code,)).fetchone()
+        return row is not None
+    
+    def is_slow_query(self, query):
+        """检索词是否过短，无法使用 trigram 索引而需要扫描全部正文"""
+        return self.tokenizer == 'trigram' and len(query) < self.MIN_TRIGRAM_QUERY
+    
+    def search(self, query, stock_code=None, column_name=None, date_from=None, date_to=None, limit=20):
+        """全文检索，返回按相关度排序的公告列表，日期格式为 YYYYMMDD
+        
+        少于3个字符的检索词（如两字中文词）无法使用 trigram 索引，按子串逐篇扫描正文，耗时随索引规模线性增长
+        """
+        columns = 'SELECT art_code, stock_code, notice_date, column_name, title, filename, '
+        if self.is_slow_query(query):
+            # trigram 分词器无法匹配少于3个字符的词（如常见的两字中文词），退化为子串扫描
+            pattern = '%' + query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            sql = (columns + "substr(content, max(instr(content, ?) - 16, 1), 40) AS snippet "
+                   "FROM documents WHERE (content LIKE ? ESCAPE '\\' OR title LIKE ? ESCAPE '\\')")
+            params = [query, pattern, pattern]
+            order = 'notice_date DESC'
+        else:
+            # 整体作为短语检索，避免用户输入中的特殊字符被解析成FTS5语法
+            sql = (columns + "snippet(documents, 1, '[', ']', '...', 16) AS snippet "
+                   'FROM documents WHERE documents MATCH ?')
+            params = ['"' + query.replace('"', '""') + '"']
+            order = 'rank'
+        for condition, value in (('stock_code = ?', stock_code), ('column_name = ?', column_name),
+                                 ('notice_date >= ?', date_from), ('notice_date <= ?', date_to)):
+            if value:
+                sql += f' AND {condition}'
+                params.append(value)
+        sql += f' ORDER BY {order} LIMIT ?'
+        params.append(limit)
+        with self.lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+    
+    def close(self):
+        """关闭数据库连接"""
+        with self.lock:
+            self.conn.close()
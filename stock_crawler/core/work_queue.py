@@ -0,0 +1,148 @@
+import json
+import time
+import sqlite3
+from contextlib import contextmanager
+
+class WorkQueue:
+    """基于SQLite的工作队列，供多个爬虫节点通过共享数据库文件分配任务
+    
+    每个任务以唯一键去重（同一 art_code 只会入队一次），节点领取任务时获得有时限的租约，
+    节点卡死或崩溃导致租约过期后，任务会被重新分配给其他节点
+    """
+    
+    STATUS_PENDING = 'pending'
+    STATUS_LEASED = 'leased'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    
+    def __init__(self, db_path, lease_seconds=300, max_attempts=3):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._init_db()
+    
+    def _connect(self):
+        """创建数据库连接，autocommit 模式下手动控制事务"""
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+    
+    @contextmanager
+    def _connection(self):
+        """用完即关闭的数据库连接"""
+        conn = self._connect()
+        try:
+            yield conn
+        finally:
+            conn.close()
+    
+    def _init_db(self):
+        """初始化任务表和索引"""
+        with self._connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS work_units (
+                    unit_key TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    lease_owner TEXT,
+                    lease_expires REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    last_error TEXT,
+                    updated_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_work_units_status ON work_units (status, lease_expires)')
+    
+    def enqueue(self, kind, unit_key, payload):
+        """加入任务，键已存在时忽略，返回是否新加入"""
+        with self._connection() as conn:
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO work_units (unit_key, kind, payload, status, updated_at) VALUES (?, ?, ?, ?, ?)',
+                (unit_key, kind, json.dumps(payload, ensure_ascii=False), self.STATUS_PENDING, time.time())
+            )
+            return cursor.rowcount == 1
+    
+    def lease(self, worker_id):
+        """领取一个待处理或租约已过期的任务，没有可领取的任务时返回None
+        
+        公告任务优先于列表页任务，先消化已发现的公告再继续翻页
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            # 租约过期且重试次数用尽的任务标记为失败
+            conn.execute(
+                'UPDATE work_units SET status = ?, last_error = ?, updated_at = ? '
+                'WHERE status = ? AND lease_expires < ? AND attempts >= ?',
+                (self.STATUS_FAILED, '租约过期次数过多', now, self.STATUS_LEASED, now, self.max_attempts)
+            )
+            row = conn.execute(
+                'SELECT unit_key, kind, payload, attempts FROM work_units '
+                'WHERE status = ? OR (status = ? AND lease_expires < ?) '
+                "ORDER BY CASE kind WHEN 'announcement' THEN 0 ELSE 1 END, updated_at LIMIT 1",
+                (self.STATUS_PENDING, self.STATUS_LEASED, now)
+            ).fetchone()
+            if row is None:
+                conn.execute('COMMIT')
+                return None
+            conn.execute(
+                'UPDATE work_units SET status = ?, lease_owner = ?, lease_expires = ?, attempts = attempts + 1, '
+                'updated_at = ? WHERE unit_key = ?',
+                (self.STATUS_LEASED, worker_id, now + self.lease_seconds, now, row['unit_key'])
+            )
+            conn.execute('COMMIT')
+            return {
+                'unit_key': row['unit_key'],
+                'kind': row['kind'],
+                'payload': json.loads(row['payload']),
+                'attempts': row['attempts'] + 1,
+            }
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+    
+    def renew(self, unit_key, worker_id):
+        """延长租约，处理耗时较长的任务时调用"""
+        with self._connection() as conn:
+            cursor = conn.execute(
+                'UPDATE work_units SET lease_expires = ?, updated_at = ? WHERE unit_key = ? AND lease_owner = ? AND status = ?',
+                (time.time() + self.lease_seconds, time.time(), unit_key, worker_id, self.STATUS_LEASED)
+            )
+            return cursor.rowcount == 1
+    
+    def complete(self, unit_key, worker_id):
+        """标记任务完成，租约已被其他节点接管时返回False"""
+        with self._connection() as conn:
+            cursor = conn.execute(
+                'UPDATE work_units SET status = ?, lease_expires = NULL, updated_at = ? '
+                'WHERE unit_key = ? AND lease_owner = ? AND status = ?',
+                (self.STATUS_DONE, time.time(), unit_key, worker_id, self.STATUS_LEASED)
+            )
+            return cursor.rowcount == 1
+    
+    def fail(self, unit_key, worker_id, error=''):
+        """任务处理失败，未超过重试次数时放回队列，否则标记为失败"""
+        with self._connection() as conn:
+            cursor = conn.execute(
+                'UPDATE work_units SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, '
+                'lease_owner = NULL, lease_expires = NULL, last_error = ?, updated_at = ? '
+                'WHERE unit_key = ? AND lease_owner = ? AND status = ?',
+                (self.max_attempts, self.STATUS_FAILED, self.STATUS_PENDING, str(error), time.time(),
+                 unit_key, worker_id, self.STATUS_LEASED)
+            )
+            return cursor.rowcount == 1
+    
+    def counts(self):
+        """按状态统计任务数量"""
+        with self._connection() as conn:
+            rows = conn.execute('SELECT status, COUNT(*) AS n FROM work_units GROUP BY status').fetchall()
+        return {row['status']: row['n'] for row in rows}
+    
+    def has_unfinished(self):
+        """是否还有待处理或处理中的任务"""
+        counts = self.counts()
+        return counts.get(self.STATUS_PENDING, 0) + counts.get(self.STATUS_LEASED, 0) > 0
@@ -2,7 +2,18 @@
 下载器模块 - 包含HTTP客户端和PDF下载器
 """
 
-from .http_client import HttpClient
-from .pdf_downloader import PdfDownloader
+from .._lazy import lazy_module
 
-__all__ = ['HttpClient', 'PdfDownloader'] 
\ No newline at end of file
+# 类名到所在子模块的映射，首次访问时才导入对应子模块，避免 import 时加载全部依赖
+_LAZY_IMPORTS = {
+    'HttpClient': '.http_client',
+    'PdfDownloader': '.pdf_downloader',
+    'RateLimiter': '.bandwidth',
+    'ByteBudget': '.bandwidth',
+    'RequestPacer': '.bandwidth',
+    'RetryPolicy': '.retry',
+    'CircuitBreaker': '.retry',
+    'SingleFlight': '.single_flight'
+}
+
+__all__, __getattr__, __dir__ = lazy_module(__name__, _LAZY_IMPORTS)
@@ -0,0 +1,115 @@
+import time
+import threading
+
+class RateLimiter:
+    """带宽限速类，基于令牌桶算法限制每秒传输的字节数，线程安全"""
+    
+    def __init__(self, bytes_per_second):
+        self.bytes_per_second = float(bytes_per_second)
+        # 桶容量为一秒的流量，允许短暂突发
+        self.capacity = self.bytes_per_second
+        self.tokens = self.capacity
+        self.last_time = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def consume(self, nbytes):
+        """消耗指定字节数的令牌，令牌不足时阻塞等待"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.last_time) * self.bytes_per_second)
+            self.last_time = now
+            # 允许令牌为负（欠账），后来的调用者会等待更久，从而保证总体速率
+            self.tokens -= nbytes
+            wait_seconds = -self.tokens / self.bytes_per_second if self.tokens < 0 else 0
+        if wait_seconds > 0:
+            time.sleep(wait_seconds)
+
+class _Reservation:
+    """一次下载预留的预算，下载过程中传输的字节先从预留中扣除，超出预留的部分才占用空闲预算"""
+    
+    def __init__(self, budget, nbytes):
+        self.budget = budget
+        self.remaining_bytes = nbytes
+    
+    def consume(self, nbytes):
+        """记录实际传输的字节数，超出预留且空闲预算不足时返回False"""
+        return self.budget._consume(nbytes, self)
+    
+    def release(self):
+        """下载结束后归还未用完的预留"""
+        self.budget._release(self)
+
+class ByteBudget:
+    """下载流量预算类，限制单次运行下载的总字节数，线程安全
+    
+    并发下载时每个下载先按预计大小 reserve 得到预留，传输的字节从自己的预留中扣除，
+    已用字节和其他下载的预留之和不会超过总预算
+    """
+    
+    def __init__(self, total_bytes):
+        self.total_bytes = int(total_bytes)
+        self.used_bytes = 0
+        self.reserved_bytes = 0
+        self.lock = threading.Lock()
+    
+    @property
+    def remaining_bytes(self):
+        """剩余可用字节数（已扣除预留）"""
+        with self.lock:
+            return max(0, self.total_bytes - self.used_bytes - self.reserved_bytes)
+    
+    def reserve(self, nbytes):
+        """下载前按预计大小预留预算，返回预留（下载时用它的 consume 记录流量，结束后 release），放不下时返回None"""
+        with self.lock:
+            if self.used_bytes + self.reserved_bytes + nbytes > self.total_bytes:
+                return None
+            self.reserved_bytes += nbytes
+            return _Reservation(self, nbytes)
+    
+    def consume(self, nbytes):
+        """记录没有预留的传输字节数，只占用空闲预算，超出时返回False"""
+        return self._consume(nbytes)
+    
+    def _consume(self, nbytes, reservation=None):
+        """先从预留中扣除，其余部分占用空闲预算（总预算减去已用和所有预留），空闲预算不足时返回False"""
+        with self.lock:
+            from_reservation = min(nbytes, reservation.remaining_bytes) if reservation else 0
+            overflow = nbytes - from_reservation
+            if overflow and self.used_bytes + self.reserved_bytes + overflow > self.total_bytes:
+                return False
+            if reservation:
+                reservation.remaining_bytes -= from_reservation
+                self.reserved_bytes -= from_reservation
+            self.used_bytes += nbytes
+            return True
+    
+    def _release(self, reservation):
+        """归还预留中未用完的部分"""
+        with self.lock:
+            self.reserved_bytes -= reservation.remaining_bytes
+            reservation.remaining_bytes = 0
+
+class RequestPacer:
+    """请求节流类，保证相邻两次请求之间至少间隔 interval 秒
+    
+    传入 multiprocessing 共享的 next_time 和 lock 时，多个进程共用同一个时间表，从而限制全局请求速率
+    """
+    
+    def __init__(self, interval, next_time=None, lock=None):
+        self.interval = interval
+        self.next_time = next_time
+        self.lock = lock or threading.Lock()
+        self._local_next_time = 0.0
+    
+    def wait(self):
+        """等待到下一个可用的请求时间点"""
+        with self.lock:
+            now = time.time()
+            scheduled = self.next_time.value if self.next_time is not None else self._local_next_time
+            slot = max(now, scheduled)
+            if self.next_time is not None:
+                self.next_time.value = slot + self.interval
+            else:
+                self._local_next_time = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
@@ -2,46 +2,140 @@ import os
 import re
 import json
 import time
-import requests
+from .retry import RetryPolicy
+from .single_flight import SingleFlight
 
 class HttpClient:
     """网络请求管理类，负责HTTP请求和JSONP响应处理"""
     
-    def __init__(self, cache_manager):
+    # 请求超时 (连接, 读取) 秒数
+    TIMEOUT = (10, 30)
+    # JSONP回调名，回调参数即为JSON数据
+    JSONP_PREFIX = re.compile(r'jQuery\d+_\d+\(\s*')
+    _json_decoder = json.JSONDecoder()
+    
+    def __init__(self, cache_manager, offline=False, session=None, retry_policy=None, circuit_breaker=None,
+                 single_flight=None):
         self.cache_manager = cache_manager
+        # 离线模式只读缓存，不发起网络请求，缓存缺失的请求记录到 missing_urls
+        self.offline = offline
+        self.missing_urls = []
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36 Edg/137.0.0.0'
         }
+        # 复用连接的 requests.Session，可由多个客户端共享，未提供时首次请求时创建
+        self.session = session
+        self.retry_policy = retry_policy or RetryPolicy()
+        # 按主机熔断和限制并发，可与 PdfDownloader 共享，None表示不启用
+        self.circuit_breaker = circuit_breaker
+        # 合并相同的并发请求，可由多个客户端共享以便跨股票去重
+        self.single_flight = single_flight or SingleFlight()
+    
+    def _get_session(self):
+        """获取保持连接的会话"""
+        if self.session is None:
+            # requests 导入较慢，只在真正发起网络请求时导入
+            import requests
+            self.session = requests.Session()
+        return self.session
     
     def generate_timestamp(self):
         """生成时间戳"""
         return str(int(time.time() * 1000))
     
-    def get_jsonp_response(self, url):
-        """获取JSONP响应并解析为JSON，支持缓存"""
+    def get_jsonp_response(self, url, refresh=False):
+        """获取JSONP响应并解析为JSON，支持缓存；refresh 为 True 时跳过缓存直接请求并更新缓存"""
         # 生成缓存文件名
         cache_file = self.cache_manager.generate_cache_filename(url)
         
-        # 检查缓存是否存在
-        cached_data = self.cache_manager.load_cache(cache_file)
-        if cached_data:
-            print(f"使用缓存数据: {os.path.basename(cache_file)}")
-            return cached_data
+        # 检查缓存是否存在，离线模式下过期缓存同样可用
+        if not refresh or self.offline:
+            cached_data = self.cache_manager.load_cache(cache_file, allow_expired=self.offline)
+            if cached_data:
+                print(f"使用缓存数据: {os.path.basename(cache_file)}")
+                return cached_data
+        
+        if self.offline:
+            print(f"离线模式，缓存缺失: {os.path.basename(cache_file)}")
+            self.missing_urls.append(url)
+            return None
         
-        # 缓存不存在，发起网络请求
+        # 缓存不存在，发起网络请求；相同的请求正在进行或刚刚完成时直接共享其结果
+        # 只有详情会在多只股票的列表中重复出现，列表页不保留在内存中；refresh 请求需要最新数据，只合并同时进行的请求
+        is_detail = os.path.basename(cache_file).startswith('announcement_detail')
+        data, shared = self.single_flight.do(
+            self.cache_manager.request_key(url),
+            lambda: self._request_with_retry(url, cache_file),
+            reuse_recent=is_detail and not refresh
+        )
+        if shared and data is not None:
+            print(f"共享相同请求的结果: {os.path.basename(cache_file)}")
+        return data
+    
+    def get_cached_response(self, url):
+        """只从缓存读取响应，不发起网络请求，缓存缺失时返回None；离线模式下过期缓存同样可用"""
+        cache_file = self.cache_manager.generate_cache_filename(url)
+        return self.cache_manager.load_cache(cache_file, allow_expired=self.offline) or None
+    
+    def _request_with_retry(self, url, cache_file):
+        """按重试策略请求并在成功后写入缓存，请求失败或接口返回失败时返回None"""
         print(f"发起网络请求: {os.path.basename(cache_file)}")
+        policy = self.retry_policy
+        for attempt in range(1, policy.max_attempts + 1):
+            data, category, retry_after = self._fetch(url)
+            if isinstance(data, dict) and data.get('success', 1) != 1:
+                # 接口返回失败时按失败处理: 不写缓存，也不作为最近结果被其他调用复用，之后重试时重新请求
+                print(f"接口返回失败: {os.path.basename(cache_file)}")
+                return None
+            if data is not None:
+                # 保存到缓存，传递原始URL
+                self.cache_manager.save_cache(cache_file, data, original_url=url)
+                return data
+            if not policy.is_retryable(category) or attempt == policy.max_attempts:
+                break
+            policy.sleep(attempt, category, retry_after)
+        print(f"请求失败，放弃: {os.path.basename(cache_file)}")
+        return None
+    
+    def _fetch(self, url):
+        """发起一次请求并解析JSONP，返回 (数据, 错误类型, Retry-After秒数)，成功时数据不为None"""
+        host = self.circuit_breaker.acquire(url) if self.circuit_breaker else None
+        data, category, retry_after = None, None, None
         try:
-            response = requests.get(url, headers=self.headers)
+            response = self._get_session().get(url, headers=self.headers, timeout=self.TIMEOUT)
             response.raise_for_status()
-            
-            # 使用正则表达式提取JSON部分
-            json_str = re.search(r'jQuery\d+_\d+\((.*)\)', response.text).group(1)
-            data = json.loads(json_str)
-            
-            # 保存到缓存，传递原始URL
-            self.cache_manager.save_cache(cache_file, data, original_url=url)
-            
-            return data
+            data = self.parse_jsonp(response.text)
         except Exception as e:
-            print(f"Error fetching or parsing JSONP response: {e}")
-            return None 
\ No newline at end of file
+            category = self.retry_policy.classify_exception(e)
+            response = getattr(e, 'response', None)
+            retry_after = self._retry_after(response)
+            print(f"Error fetching or parsing JSONP response ({category}): {e}")
+        finally:
+            if host is not None:
+                # 客户端错误说明请求本身有误，不计入主机的错误率
+                self.circuit_breaker.release(host, data is not None or category == RetryPolicy.CLIENT)
+        return data, category, retry_after
+    
+    @classmethod
+    def parse_jsonp(cls, text):
+        """解析 jQuery123_456({...}) 形式的JSONP响应
+        
+        只用正则找到回调名，再从括号后原地解码JSON，不复制响应正文
+        """
+        match = cls.JSONP_PREFIX.search(text)
+        if match is None:
+            raise ValueError("响应不是JSONP格式")
+        data, end = cls._json_decoder.raw_decode(text, match.end())
+        if text[end:].strip()[:1] != ')':
+            raise ValueError("JSONP响应不完整")
+        return data
+    
+    @staticmethod
+    def _retry_after(response):
+        """读取响应中以秒为单位的 Retry-After 头"""
+        if response is None:
+            return None
+        try:
+            return float(response.headers.get('Retry-After'))
+        except (TypeError, ValueError):
+            return None
@@ -1,24 +1,46 @@
 import os
-import re
-import time
 import subprocess
 
+from .bandwidth import RateLimiter
+from .retry import RetryPolicy
+from ..utils import FileNaming
+from ..storage import LocalStorage
+
 class PdfDownloader:
     """PDF下载管理类，负责PDF文件的下载和完整性检查"""
     
-    def __init__(self):
+    # 从curl输出流每次读取的字节数
+    CHUNK_SIZE = 16 * 1024
+    # 本地存储时下载中的文件先写到带此后缀的临时文件，校验完整后再原子替换为正式文件
+    PART_SUFFIX = LocalStorage.PART_SUFFIX
+    
+    def __init__(self, max_rate_per_download=None, global_rate_limiter=None, byte_budget=None,
+                 retry_policy=None, circuit_breaker=None, file_index=None, storage=None):
         self.headers = [
             '-H', 'User-Agent: Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
         ]
+        # 单个下载的限速（字节/秒），None表示不限速
+        self.max_rate_per_download = max_rate_per_download
+        # 所有下载共享的全局限速器和流量预算
+        self.global_rate_limiter = global_rate_limiter
+        self.byte_budget = byte_budget
+        self.retry_policy = retry_policy or RetryPolicy(max_attempts=3)
+        # 按主机熔断和限制并发，None表示不启用
+        self.circuit_breaker = circuit_breaker
+        # 下载目录的内存索引，已有文件的检查不再逐个访问文件系统，None表示直接访问
+        self.file_index = file_index
+        # PDF的存储后端，未提供时保存到本地下载目录
+        self.storage = storage or LocalStorage(file_index)
     
-    def check_pdf_integrity(self, filename, expected_size_kb):
-        """检查PDF文件完整性，比较实际文件大小与期望大小"""
+    def check_pdf_integrity(self, filename, expected_size_kb, file_size=None):
+        """检查PDF文件完整性，比较实际文件大小与期望大小；file_size 为已知的文件大小时不再访问文件系统"""
         try:
-            if not os.path.exists(filename):
+            if file_size is None and not os.path.exists(filename):
                 return False, "文件不存在"
             if expected_size_kb == 0:
                 return True, "未提供期望大小，默认完整"
-            file_size = os.path.getsize(filename)
+            if file_size is None:
+                file_size = os.path.getsize(filename)
             file_size_kb = round(file_size / 1000)
             
             # 两者相差超过10kb并且实际大小比期望大小小的时候就是文件大小不符
@@ -29,59 +51,109 @@ class PdfDownloader:
         except Exception as e:
             return False, f"检查文件完整性失败: {e}"
     
-    def download_pdf(self, url, filename, attach_size, max_retries=3):
-        """使用curl命令下载PDF文件，下载后用文件大小和attach_size对比判断是否完整"""
+    def _stream_download(self, url, writer, reservation=None):
+        """通过curl把文件内容输出到管道，在读取循环中限速和统计流量后交给存储后端的写入器
+        
+        传入预算预留时流量先从预留中扣除；返回 (是否成功, 错误信息, 是否超出流量预算, 错误类型)
+        """
+        byte_budget = reservation or self.byte_budget
         curl_cmd = [
             'curl',
             '-L',  # 跟随重定向
-            '-o', filename,
+            '-sS',
+            '--fail',  # HTTP状态码>=400时返回错误，不把错误页面当作PDF保存
+            '--connect-timeout', '15',
         ] + self.headers + [url]
+        per_download_limiter = RateLimiter(self.max_rate_per_download) if self.max_rate_per_download else None
         
+        process = subprocess.Popen(curl_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        over_budget = False
+        try:
+            while True:
+                chunk = process.stdout.read(self.CHUNK_SIZE)
+                if not chunk:
+                    break
+                if byte_budget and not byte_budget.consume(len(chunk)):
+                    over_budget = True
+                    break
+                if per_download_limiter:
+                    per_download_limiter.consume(len(chunk))
+                if self.global_rate_limiter:
+                    self.global_rate_limiter.consume(len(chunk))
+                writer.write(chunk)
+        finally:
+            if over_budget:
+                process.kill()
+            process.stdout.close()
+            stderr = process.stderr.read().decode('utf-8', errors='replace')
+            process.stderr.close()
+            returncode = process.wait()
+        
+        if over_budget:
+            return False, "超出下载流量预算", True, None
+        if returncode != 0:
+            return False, stderr.strip(), False, self.retry_policy.classify_curl(returncode, stderr)
+        return True, '', False, None
+    
+    def download_pdf(self, url, filename, attach_size, max_retries=None, reservation=None):
+        """使用curl命令下载PDF文件，下载后用文件大小和attach_size对比判断是否完整，返回是否成功
+        
+        下载内容通过存储后端的写入器写入（本地为临时文件，对象存储为分片上传），校验通过后才提交为正式文件，
+        中途崩溃不会留下不完整的PDF；失败时按重试策略分类错误并指数退避，max_retries 默认取重试策略的最大尝试次数
+        """
+        max_retries = max_retries or self.retry_policy.max_attempts
         for attempt in range(1, max_retries + 1):
+            host = self.circuit_breaker.acquire(url) if self.circuit_breaker else None
+            category = None
+            writer = None
+            committed = False
             try:
-                result = subprocess.run(curl_cmd, capture_output=True, text=True)
-                if result.returncode == 0:
-                    # 使用完整性检查函数
-                    is_complete, message = self.check_pdf_integrity(filename, attach_size)
+                writer = self.storage.open_writer(filename)
+                success, error, over_budget, category = self._stream_download(url, writer, reservation)
+                if over_budget:
+                    print(f"已达到下载流量预算上限，停止下载：{filename}")
+                    return False
+                if success:
+                    # 使用完整性检查函数，写入的字节数即文件大小
+                    is_complete, message = self.check_pdf_integrity(filename, attach_size, writer.size)
                     if is_complete:
+                        writer.commit()
+                        committed = True
                         print(f"Successfully downloaded: {filename} ({message})")
-                        break
-                    else:
-                        print(f"文件不完整: {message}，准备重试({attempt}/{max_retries})：{filename}")
-                        time.sleep(1)
-                        continue
+                        return True
+                    category = RetryPolicy.INTEGRITY
+                    print(f"文件不完整: {message}，准备重试({attempt}/{max_retries})：{filename}")
                 else:
-                    print(f"下载失败，错误信息：{result.stderr}.url:{url},filename:{filename}，准备重试({attempt}/{max_retries})")
+                    print(f"下载失败({category})，错误信息：{error}.url:{url},filename:{filename}，准备重试({attempt}/{max_retries})")
             except Exception as e:
+                category = RetryPolicy.UNKNOWN
                 print(f"Error downloading PDF with curl: {e}，准备重试({attempt}/{max_retries})")
-            time.sleep(1)
-        else:
-            print(f"多次重试后仍未成功下载完整PDF：{filename}")
+            finally:
+                if writer is not None and not committed:
+                    writer.abort()
+                if host is not None:
+                    # 文件不完整和客户端错误不代表主机过载，不计入主机的错误率
+                    self.circuit_breaker.release(host, category in (None, RetryPolicy.INTEGRITY, RetryPolicy.CLIENT))
+            if not self.retry_policy.is_retryable(category):
+                break
+            if attempt < max_retries:
+                self.retry_policy.sleep(attempt, category)
+        print(f"多次重试后仍未成功下载完整PDF：{filename}")
+        return False
     
-    def build_pdf_filename(self, stock_code, short_name, notice_title, notice_date):
-        """构建PDF文件名"""
-        # 去除特殊字符，只保留中文、数字、字母
-        notice_title = re.sub(r'[^\u4e00-\u9fa5a-zA-Z0-9]', '', notice_title)
-        
-        # 提取年月日数字，格式：2018-01-18 00:00:00 -> 20180118
-        date_match = re.search(r'(\d{4})-(\d{2})-(\d{2})', notice_date)
-        if date_match:
-            notice_date = date_match.group(1) + date_match.group(2) + date_match.group(3)
-        else:
-            notice_date = ''
-        
-        filename_prefix = ''
-        if stock_code and stock_code not in notice_title:
-            filename_prefix += stock_code
-        if short_name and short_name not in notice_title:
-            filename_prefix += short_name
-        
-        return f"{notice_date}_{filename_prefix}{notice_title}.pdf"
+    def remove_partial(self, filename):
+        """删除未完成下载留下的临时文件（对象存储为未完成的分片上传）"""
+        self.storage.remove_partial(filename)
+    
+    def build_pdf_filename(self, stock_code, short_name, notice_title, notice_date, art_code=None):
+        """构建PDF文件名，规则见 FileNaming.pdf_filename"""
+        return FileNaming.pdf_filename(stock_code, short_name, notice_title, notice_date, art_code)
     
     def should_download_pdf(self, filename, attach_size):
         """检查是否需要下载PDF文件"""
-        if os.path.exists(filename):
-            is_complete, message = self.check_pdf_integrity(filename, attach_size)
+        file_size = self.storage.getsize(filename)
+        if file_size is not None:
+            is_complete, message = self.check_pdf_integrity(filename, attach_size, file_size)
             if is_complete:
                 print(f"PDF文件已存在且完整，跳过下载: {os.path.basename(filename)} ({message})")
                 return False
@@ -0,0 +1,174 @@
+import re
+import time
+import random
+import threading
+from collections import deque
+from urllib.parse import urlparse
+
+class RetryPolicy:
+    """重试策略类，按错误类型决定是否重试，重试间隔按指数退避并加入随机抖动
+    
+    HttpClient 和 PdfDownloader 共用同一套错误分类，被限流(429)时退避时间加倍，
+    服务端给出 Retry-After 时至少等待该时长
+    """
+    
+    TIMEOUT = 'timeout'
+    CONNECTION = 'connection'
+    THROTTLED = 'throttled'
+    SERVER = 'server'
+    CLIENT = 'client'
+    PARSE = 'parse'
+    INTEGRITY = 'integrity'
+    UNKNOWN = 'unknown'
+    # 请求本身有误，重试也不会成功
+    NON_RETRYABLE = (CLIENT,)
+    
+    # curl 退出码到错误类型的映射
+    CURL_EXIT_CODES = {
+        6: CONNECTION,   # 无法解析主机
+        7: CONNECTION,   # 无法连接
+        18: CONNECTION,  # 传输中断，文件不完整
+        28: TIMEOUT,     # 超时
+        35: CONNECTION,  # SSL握手失败
+        52: CONNECTION,  # 服务器无响应
+        55: CONNECTION,  # 发送失败
+        56: CONNECTION,  # 接收失败
+    }
+    
+    def __init__(self, max_attempts=4, base_delay=1.0, max_delay=60.0):
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+    
+    @classmethod
+    def classify_status(cls, status_code):
+        """根据HTTP状态码判断错误类型"""
+        if status_code == 429:
+            return cls.THROTTLED
+        if status_code == 408:
+            return cls.TIMEOUT
+        if status_code >= 500:
+            return cls.SERVER
+        if status_code >= 400:
+            return cls.CLIENT
+        return cls.UNKNOWN
+    
+    @classmethod
+    def classify_exception(cls, error):
+        """根据 requests 抛出的异常判断错误类型"""
+        response = getattr(error, 'response', None)
+        if response is not None and getattr(response, 'status_code', None):
+            return cls.classify_status(response.status_code)
+        name = type(error).__name__
+        if 'Timeout' in name:
+            return cls.TIMEOUT
+        if 'Connection' in name or 'SSL' in name or 'ChunkedEncoding' in name:
+            return cls.CONNECTION
+        if isinstance(error, (ValueError, AttributeError)):
+            # JSON解析失败或正则未匹配到JSONP，通常是返回了限流或错误页面
+            return cls.PARSE
+        return cls.UNKNOWN
+    
+    @classmethod
+    def classify_curl(cls, returncode, stderr):
+        """根据 curl 的退出码和错误输出判断错误类型"""
+        if returncode == 22:
+            # --fail 模式下HTTP状态码>=400，错误输出形如 "The requested URL returned error: 429"
+            match = re.search(r'error: (\d{3})', stderr or '')
+            return cls.classify_status(int(match.group(1))) if match else cls.SERVER
+        return cls.CURL_EXIT_CODES.get(returncode, cls.UNKNOWN)
+    
+    def is_retryable(self, category):
+        """该类型的错误是否值得重试"""
+        return category not in self.NON_RETRYABLE
+    
+    def delay(self, attempt, category=None, retry_after=None):
+        """第 attempt 次失败后的等待秒数
+        
+        一般错误在 [0, 指数上限] 内均匀随机 (full jitter)；被限流时上限加倍并至少等待上限的一半
+        """
+        ceiling = self.base_delay * (2 ** (attempt - 1))
+        if category == self.THROTTLED:
+            ceiling *= 2
+        ceiling = min(self.max_delay, ceiling)
+        wait = random.uniform(ceiling / 2, ceiling) if category == self.THROTTLED else random.uniform(0, ceiling)
+        if retry_after:
+            wait = max(wait, min(float(retry_after), self.max_delay))
+        return wait
+    
+    def sleep(self, attempt, category=None, retry_after=None):
+        """等待退避时间"""
+        wait = self.delay(attempt, category, retry_after)
+        if wait > 0:
+            print(f"{category or '请求'}错误，{wait:.1f}秒后重试 (第{attempt}次失败)")
+            time.sleep(wait)
+
+class CircuitBreaker:
+    """按主机统计最近请求结果的熔断器，线程安全
+    
+    每个主机的并发上限按 AIMD 调整: 成功时缓慢增加，失败时减半；最近窗口内错误率超过阈值时
+    熔断，暂停向该主机发请求 cooldown 秒，之后以并发1试探，成功后逐步恢复
+    """
+    
+    def __init__(self, max_concurrency=4, window=20, failure_rate=0.5, min_samples=5, cooldown=30.0):
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.window = window
+        self.failure_rate = failure_rate
+        self.min_samples = min_samples
+        self.cooldown = cooldown
+        self.hosts = {}
+        self.condition = threading.Condition()
+    
+    @staticmethod
+    def host_of(url):
+        """URL所属的主机"""
+        return urlparse(url).netloc or url
+    
+    def _state(self, host):
+        """获取主机状态，调用方需持有锁"""
+        state = self.hosts.get(host)
+        if state is None:
+            state = self.hosts[host] = {
+                'limit': float(self.max_concurrency),
+                'in_flight': 0,
+                'results': deque(maxlen=self.window),
+                'open_until': 0.0,
+            }
+        return state
+    
+    def acquire(self, url):
+        """请求前调用，主机熔断或并发已满时阻塞等待，返回主机名供 release 使用"""
+        host = self.host_of(url)
+        with self.condition:
+            while True:
+                state = self._state(host)
+                wait = state['open_until'] - time.time()
+                if wait <= 0 and state['in_flight'] < max(1, int(state['limit'])):
+                    state['in_flight'] += 1
+                    return host
+                self.condition.wait(timeout=wait if wait > 0 else None)
+    
+    def release(self, host, success):
+        """请求结束后调用，记录结果并调整并发上限"""
+        with self.condition:
+            state = self._state(host)
+            state['in_flight'] = max(0, state['in_flight'] - 1)
+            state['results'].append(bool(success))
+            if success:
+                state['limit'] = min(float(self.max_concurrency), state['limit'] + 1.0 / max(1.0, state['limit']))
+            else:
+                state['limit'] = max(1.0, state['limit'] / 2)
+                results = state['results']
+                failures = results.count(False)
+                if len(results) >= self.min_samples and failures / len(results) >= self.failure_rate:
+                    state['open_until'] = time.time() + self.cooldown
+                    state['limit'] = 1.0
+                    # 重新开始统计，冷却后的试探请求不受之前失败的影响
+                    results.clear()
+                    print(f"主机 {host} 错误率过高 ({failures}次失败)，暂停请求 {self.cooldown:g} 秒")
+            self.condition.notify_all()
+    
+    def current_limit(self, url):
+        """主机当前的并发上限"""
+        with self.condition:
+            return max(1, int(self._state(self.host_of(url))['limit']))
@@ -0,0 +1,59 @@
+import threading
+from collections import OrderedDict
+
+class SingleFlight:
+    """请求合并类，同一个规范化请求在同一时间只发起一次，线程安全
+    
+    并发的相同请求等待第一个请求的结果，共享一次网络请求和一次缓存写入；最近成功的结果保留在
+    内存中，多只股票的列表里重复出现的公告（如联合公告）详情也不会再次请求
+    """
+    
+    def __init__(self, recent_size=256):
+        self.recent_size = recent_size
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.recent = OrderedDict()
+        # executed: 实际执行的请求数，coalesced: 等待并发中的相同请求的次数，reused: 直接复用最近结果的次数
+        self.stats = {'executed': 0, 'coalesced': 0, 'reused': 0}
+    
+    def do(self, key, fn, reuse_recent=True):
+        """执行 fn 获取 key 对应的结果，返回 (结果, 是否与其他调用共享)
+        
+        reuse_recent 为 False 时只合并同时进行的请求，既不复用也不保留结果；fn 返回None表示失败，
+        失败的结果不会保留，等待中的调用同样得到None
+        """
+        with self.lock:
+            if reuse_recent and key in self.recent:
+                self.recent.move_to_end(key)
+                self.stats['reused'] += 1
+                return self.recent[key], True
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = {'event': threading.Event(), 'result': None}
+                self.stats['executed'] += 1
+            else:
+                self.stats['coalesced'] += 1
+        
+        if not leader:
+            call['event'].wait()
+            return call['result'], True
+        
+        try:
+            call['result'] = fn()
+        finally:
+            with self.lock:
+                del self.calls[key]
+                if reuse_recent and call['result'] is not None and self.recent_size:
+                    self.recent[key] = call['result']
+                    self.recent.move_to_end(key)
+                    while len(self.recent) > self.recent_size:
+                        self.recent.popitem(last=False)
+            call['event'].set()
+        return call['result'], False
+    
+    @property
+    def duplicates_avoided(self):
+        """合并或复用而省下的请求数"""
+        with self.lock:
+            return self.stats['coalesced'] + self.stats['reused']
@@ -2,47 +2,158 @@
 工厂模块 - 用于创建和管理爬虫实例
 """
 
-from .core import ConfigManager, CacheManager
-from .downloaders import HttpClient, PdfDownloader
-from .processors import AnnouncementProcessor, StockCrawler
+from .core import ConfigManager, CacheManager, CheckpointManager, TextIndex, AnnouncementCatalog, FileIndex
+from .downloaders import HttpClient, PdfDownloader, RateLimiter, ByteBudget, RetryPolicy, CircuitBreaker
+from .processors import AnnouncementProcessor, StockCrawler, DownloadScheduler, TextIndexer
+from .storage import LocalStorage, S3Storage
 
 class CrawlerFactory:
     """爬虫工厂类，负责创建和管理爬虫实例"""
     
-    def __init__(self, config_file='config.json', download_dir=None, cache_dir=None):
+    def __init__(self, config_file='config.json', download_dir=None, cache_dir=None, offline=False,
+                 stock_code=None, request_pacer=None, http_session=None,
+                 single_flight=None, tracer=None, shared_cache=None, catalog=None, text_indexer=None,
+                 file_index=None, storage=None):
         self.config_file = config_file
+        self.offline = offline
         self.config_manager = ConfigManager(config_file)
         self.download_dir = download_dir or self.config_manager.download_dir
         self.cache_dir = cache_dir or self.config_manager.cache_dir
+        # 支持覆盖配置文件中的股票代码，便于一个进程依次爬取多只股票
+        self.stock_code = stock_code or self.config_manager.stock_code
+        self.request_pacer = request_pacer
+        # 多个工厂共享的 requests.Session，复用连接
+        self.http_session = http_session
+        # 多个工厂共享的请求合并器，跨股票去重相同的请求
+        self.single_flight = single_flight
+        # 耗时追踪，None表示不记录
+        self.tracer = tracer
+        # 多个工厂共享的缓存管理器，各工厂取其中本股票的视图，共用一份缓存索引
+        self.shared_cache = shared_cache
         self._cache_manager = None
+        self._retry_policy = None
+        self._circuit_breaker = None
+        # 多个工厂共享的下载目录索引、存储后端、全文索引流水线和公告目录，由创建它们的工厂负责关闭
+        self._file_index = file_index
+        self._storage = storage
         self._http_client = None
         self._pdf_downloader = None
         self._announcement_processor = None
+        self._download_scheduler = None
+        self._checkpoint_manager = None
+        self._text_indexer = text_indexer
+        self._catalog = catalog
         self._stock_crawler = None
+        self._shared = {name for name, value in (('text_indexer', text_indexer), ('catalog', catalog))
+                        if value is not None}
+    
+    def shared_components(self):
+        """返回可注入其他股票工厂的共用组件，按股票创建多个工厂时只打开一份连接和进程池"""
+        return {
+            'shared_cache': self.cache_manager,
+            'file_index': self.file_index,
+            'storage': self.storage,
+            'text_indexer': self.text_indexer,
+            'catalog': self.catalog,
+        }
     
     @property
     def cache_manager(self):
         """获取缓存管理器实例"""
+        if self._cache_manager is None and self.shared_cache is not None:
+            self._cache_manager = self.shared_cache.for_stock(self.stock_code)
         if self._cache_manager is None:
             self._cache_manager = CacheManager(
                 cache_dir=self.cache_dir,
-                stock_code=self.config_manager.stock_code,
-                expire_days=self.config_manager.cache_expire_days
+                stock_code=self.stock_code,
+                expire_days=self.config_manager.cache_expire_days,
+                max_size_bytes=self.config_manager.cache_max_bytes,
+                max_entries=self.config_manager.cache_max_entries,
+                eviction_policy=self.config_manager.cache_eviction_policy
             )
         return self._cache_manager
     
+    @property
+    def retry_policy(self):
+        """获取网络请求和PDF下载共用的重试策略"""
+        if self._retry_policy is None:
+            self._retry_policy = RetryPolicy(
+                max_attempts=self.config_manager.retry_max_attempts,
+                base_delay=self.config_manager.retry_base_delay,
+                max_delay=self.config_manager.retry_max_delay
+            )
+        return self._retry_policy
+    
+    @property
+    def circuit_breaker(self):
+        """获取网络请求和PDF下载共用的按主机熔断器"""
+        if self._circuit_breaker is None:
+            self._circuit_breaker = CircuitBreaker(
+                max_concurrency=max(1, self.config_manager.download_workers),
+                failure_rate=self.config_manager.circuit_failure_rate,
+                cooldown=self.config_manager.circuit_cooldown
+            )
+        return self._circuit_breaker
+    
+    @property
+    def file_index(self):
+        """获取下载目录的内存索引实例"""
+        if self._file_index is None:
+            self._file_index = FileIndex(self.download_dir)
+        return self._file_index
+    
+    @property
+    def storage(self):
+        """获取PDF存储后端实例，由 storage_backend 配置选择本地下载目录或对象存储"""
+        if self._storage is None:
+            backend = self.config_manager.storage_backend
+            if backend == 's3':
+                if not self.config_manager.s3_bucket:
+                    raise ValueError("storage_backend 为 s3 时需要配置 s3_bucket")
+                self._storage = S3Storage(
+                    self.download_dir,
+                    self.config_manager.s3_bucket,
+                    prefix=self.config_manager.s3_prefix,
+                    endpoint_url=self.config_manager.s3_endpoint_url,
+                    region=self.config_manager.s3_region,
+                    part_size_mb=self.config_manager.s3_part_size_mb
+                )
+            else:
+                if backend != 'local':
+                    print(f"未知的存储后端 {backend}，使用 local")
+                self._storage = LocalStorage(self.file_index)
+        return self._storage
+    
     @property
     def http_client(self):
         """获取HTTP客户端实例"""
         if self._http_client is None:
-            self._http_client = HttpClient(self.cache_manager)
+            self._http_client = HttpClient(
+                self.cache_manager,
+                offline=self.offline,
+                session=self.http_session,
+                retry_policy=self.retry_policy,
+                circuit_breaker=self.circuit_breaker,
+                single_flight=self.single_flight
+            )
         return self._http_client
     
     @property
     def pdf_downloader(self):
         """获取PDF下载器实例"""
         if self._pdf_downloader is None:
-            self._pdf_downloader = PdfDownloader()
+            rate_limit_kb = self.config_manager.download_rate_limit_kb
+            global_rate_limit_kb = self.config_manager.global_rate_limit_kb
+            budget_mb = self.config_manager.download_budget_mb
+            self._pdf_downloader = PdfDownloader(
+                max_rate_per_download=rate_limit_kb * 1000 if rate_limit_kb else None,
+                global_rate_limiter=RateLimiter(global_rate_limit_kb * 1000) if global_rate_limit_kb else None,
+                byte_budget=ByteBudget(budget_mb * 1000 * 1000) if budget_mb else None,
+                retry_policy=self.retry_policy,
+                circuit_breaker=self.circuit_breaker,
+                file_index=self.file_index,
+                storage=self.storage
+            )
         return self._pdf_downloader
     
     @property
@@ -53,10 +164,58 @@ class CrawlerFactory:
                 self.http_client, 
                 self.pdf_downloader,
                 download_dir=self.download_dir,
-                config_manager=self.config_manager
+                config_manager=self.config_manager,
+                catalog=self.catalog,
+                tracer=self.tracer
             )
+            if self.text_indexer:
+                if self.storage.is_local:
+                    self._announcement_processor.post_download_hooks.append(self.text_indexer.submit)
+                else:
+                    print("PDF保存在对象存储中，全文索引只支持本地存储，已跳过")
         return self._announcement_processor
     
+    @property
+    def text_indexer(self):
+        """获取全文索引流水线实例，未配置 text_index_db 时返回None"""
+        if self._text_indexer is None and self.config_manager.text_index_db:
+            self._text_indexer = TextIndexer(
+                TextIndex(self.config_manager.text_index_db),
+                workers=self.config_manager.text_index_workers
+            )
+        return self._text_indexer
+    
+    @property
+    def catalog(self):
+        """获取本地公告目录实例，未配置 catalog_db 时返回None"""
+        if self._catalog is None and self.config_manager.catalog_db:
+            self._catalog = AnnouncementCatalog(self.config_manager.catalog_db)
+        return self._catalog
+    
+    @property
+    def download_scheduler(self):
+        """获取下载调度器实例"""
+        if self._download_scheduler is None:
+            self._download_scheduler = DownloadScheduler(
+                policy=self.config_manager.download_order,
+                column_priority=self.config_manager.column_priority,
+                workers=self.config_manager.download_workers,
+                max_large_downloads=self.config_manager.max_large_downloads,
+                large_file_kb=self.config_manager.large_file_kb,
+                max_pending=self.config_manager.download_queue_size
+            )
+        return self._download_scheduler
+    
+    @property
+    def checkpoint_manager(self):
+        """获取断点管理器实例"""
+        if self._checkpoint_manager is None:
+            self._checkpoint_manager = CheckpointManager(
+                cache_dir=self.cache_dir,
+                stock_code=self.stock_code
+            )
+        return self._checkpoint_manager
+    
     @property
     def stock_crawler(self):
         """获取股票爬虫实例"""
@@ -65,7 +224,13 @@ class CrawlerFactory:
                 config_manager=self.config_manager,
                 cache_manager=self.cache_manager,
                 http_client=self.http_client,
-                announcement_processor=self.announcement_processor
+                announcement_processor=self.announcement_processor,
+                download_scheduler=self.download_scheduler,
+                checkpoint_manager=self.checkpoint_manager,
+                stock_code=self.stock_code,
+                request_pacer=self.request_pacer,
+                catalog=self.catalog,
+                tracer=self.tracer
             )
         return self._stock_crawler
     
@@ -73,10 +238,32 @@ class CrawlerFactory:
         """创建完整的爬虫实例"""
         return self.stock_crawler
     
+    def close(self):
+        """运行结束时等待后台环节完成并释放资源"""
+        if self._cache_manager is not None:
+            # 保存本次运行中的索引变更，包括访问时间和 --list-cache 等命令重建的索引
+            self._cache_manager.flush_index(force=True)
+        if self._text_indexer is not None and 'text_indexer' not in self._shared:
+            self._text_indexer.close()
+            self._text_indexer.text_index.close()
+        self._text_indexer = None
+        if self._catalog is not None and 'catalog' not in self._shared:
+            self._catalog.close()
+        self._catalog = None
+    
     def reset(self):
         """重置所有实例，用于重新初始化"""
         self._cache_manager = None
+        self._retry_policy = None
+        self._circuit_breaker = None
+        self._file_index = None
+        self._storage = None
         self._http_client = None
         self._pdf_downloader = None
         self._announcement_processor = None
-        self._stock_crawler = None 
\ No newline at end of file
+        self._download_scheduler = None
+        self._checkpoint_manager = None
+        self._text_indexer = None
+        self._catalog = None
+        self._stock_crawler = None
+        self._shared = set() 
\ No newline at end of file
@@ -2,7 +2,21 @@
 处理器模块 - 包含公告处理器和爬虫主类
 """
 
-from .announcement_processor import AnnouncementProcessor
-from .stock_crawler import StockCrawler
+from .._lazy import lazy_module
 
-__all__ = ['AnnouncementProcessor', 'StockCrawler'] 
\ No newline at end of file
+# 类名到所在子模块的映射，首次访问时才导入对应子模块，避免 import 时加载全部依赖
+_LAZY_IMPORTS = {
+    'AnnouncementProcessor': '.announcement_processor',
+    'StockCrawler': '.stock_crawler',
+    'DownloadScheduler': '.download_scheduler',
+    'ShardCoordinator': '.shard_coordinator',
+    'QueueWorker': '.queue_worker',
+    'TextIndexer': '.text_indexer',
+    'MetadataExporter': '.metadata_exporter',
+    'StockWatcher': '.stock_watcher',
+    'ArchiveImporter': '.archive_importer',
+    'CacheBundle': '.cache_bundle',
+    'CrawlPlanner': '.crawl_planner'
+}
+
+__all__, __getattr__, __dir__ = lazy_module(__name__, _LAZY_IMPORTS)
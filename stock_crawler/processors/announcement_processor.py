@@ -1,77 +1,234 @@
 import os
 import time
+import threading
+from ..utils import Tracer, FileNaming
 
 class AnnouncementProcessor:
     """公告处理类，负责处理单个公告的下载逻辑"""
     
-    def __init__(self, http_client, pdf_downloader, download_dir='downloads', config_manager=None):
+    # 没有公告目录时，已有文件与附件大小相差不超过该值（KB）才认为是同一条公告的文件
+    OWN_FILE_TOLERANCE_KB = 10
+    
+    def __init__(self, http_client, pdf_downloader, download_dir='downloads', config_manager=None, catalog=None,
+                 tracer=None):
         self.http_client = http_client
         self.pdf_downloader = pdf_downloader
         self.download_dir = download_dir
         self.config_manager = config_manager
+        # 本地公告目录，记录每条公告的处理状态，未配置时不记录
+        self.catalog = catalog
+        # PDF的存储后端（本地下载目录或对象存储），与下载器共用，已有文件按目录批量检查
+        self.storage = pdf_downloader.storage
+        # 耗时追踪，未启用时不记录
+        self.tracer = tracer or Tracer(enabled=False)
+        # PDF文件命名，不同公告得到相同路径时追加 art_code
+        self.file_naming = FileNaming(catalog, self.storage)
+        # 运行统计和已下载文件清单，下载可能在多个线程中进行，更新时加锁
+        self.stats = {
+            'processed': 0,
+            'detail_failed': 0,
+            'filtered': 0,
+            'skipped': 0,
+            'downloaded': 0,
+            'failed': 0,
+            'budget_skipped': 0,
+            'downloaded_kb': 0,
+        }
+        self.manifest = []
+        self._stats_lock = threading.Lock()
+        # 下载成功后的处理环节（如全文索引），每个回调接收一条下载清单记录
+        self.post_download_hooks = []
     
-    def process_announcement(self, item):
-        """处理单个公告"""
-        art_code = item.get('art_code')
-        if not art_code:
-            print(f"没有获取到art_code，无法进入下一步")
+    def _count(self, key, amount=1):
+        """累加运行统计"""
+        with self._stats_lock:
+            self.stats[key] += amount
+    
+    def _catalog_update(self, art_code, status, **fields):
+        """更新公告目录中的状态，目录写入失败不影响下载"""
+        if self.catalog is None:
             return
-        
+        try:
+            self.catalog.update(art_code, status, **fields)
+        except Exception as e:
+            print(f"更新公告目录失败 {art_code}: {e}")
+    
+    def _is_own_file(self, path, attach_size):
+        """没有公告目录时判断已有文件是否为这条公告下载的: 没有附件大小时视为是，否则比较文件大小"""
+        if not attach_size:
+            return True
+        file_size = self.storage.getsize(path)
+        if file_size is None:
+            return True
+        return abs(round(file_size / 1000) - attach_size) <= self.OWN_FILE_TOLERANCE_KB
+    
+    def local_filename(self, announcement):
+        """根据列表页中的公告信息推算PDF的保存路径，信息不全时返回None"""
+        if not announcement.short_name or not announcement.column_name or not announcement.title:
+            return None
+        raw_filename = self.file_naming.pdf_filename(
+            announcement.stock_code, announcement.short_name, announcement.title, announcement.notice_date,
+            announcement.art_code
+        )
+        return os.path.join(self.download_dir, announcement.short_name, announcement.column_name, raw_filename)
+    
+    def match_imported(self, announcement):
+        """列表中的公告对应导入的PDF时直接记为已下载，不再请求详情，返回是否匹配"""
+        if self.catalog is None:
+            return False
+        filename = self.local_filename(announcement)
+        if not filename or not self.catalog.is_imported(filename):
+            return False
+        if not self.storage.exists(filename):
+            return False
+        print(f"已导入的PDF，跳过: {os.path.basename(filename)}")
+        self._count('skipped')
+        self._catalog_update(announcement.art_code, 'downloaded',
+                             stock_code=announcement.stock_code,
+                             short_name=announcement.short_name,
+                             title=announcement.title,
+                             notice_date=announcement.notice_date,
+                             column_name=announcement.column_name,
+                             filename=filename)
+        return True
+    
+    def detail_url(self, art_code):
+        """构建公告详情接口的请求URL"""
         timestamp = self.http_client.generate_timestamp()
         cb_param = f"jQuery1123{timestamp[:10]}_{timestamp}"
+        return f"https://np-cnotice-stock.eastmoney.com/api/content/ann?cb={cb_param}&art_code={art_code}&client_source=web&page_index=1&_={timestamp}"
+    
+    def title_filter_reason(self, notice_title):
+        """按配置的关键词检查公告标题，需要跳过时返回原因，否则返回None"""
+        if not self.config_manager:
+            return None
+        # 排除关键词优先
+        exclude_keywords = self.config_manager.notice_title_exclude_keywords
+        if exclude_keywords and any(kw in notice_title for kw in exclude_keywords):
+            return "公告标题命中排除关键词"
+        # 包含关键词
+        keywords = self.config_manager.notice_title_keywords
+        if keywords and not any(kw in notice_title for kw in keywords):
+            return "公告标题未匹配关键词"
+        return None
+    
+    def process_announcement(self, announcement):
+        """处理单个公告，返回是否处理完成（无需下载或下载成功），获取详情失败或下载失败时返回False"""
+        ok, task = self.prepare_download(announcement)
+        if task:
+            return self.execute_download(task)
+        return ok
+    
+    def prepare_download(self, announcement):
+        """获取公告详情并完成过滤，返回 (是否成功, 下载任务)
+        
+        需要下载时下载任务为补全了附件信息和保存路径的该公告；不需要下载（没有附件、被过滤、文件已存在）时为None；
+        获取详情失败时返回 (False, None)，调用方应视为处理失败，以便之后重试
+        """
+        with self.tracer.span('announcement', art_code=announcement.art_code):
+            return self._prepare_download(announcement)
+    
+    def _prepare_download(self, announcement):
+        art_code = announcement.art_code
+        if not art_code:
+            print(f"没有获取到art_code，无法进入下一步")
+            return True, None
+        self._count('processed')
         
-        url = f"https://np-cnotice-stock.eastmoney.com/api/content/ann?cb={cb_param}&art_code={art_code}&client_source=web&page_index=1&_={timestamp}"
+        url = self.detail_url(art_code)
         
-        data = self.http_client.get_jsonp_response(url)
+        with self.tracer.span('detail', art_code=art_code):
+            data = self.http_client.get_jsonp_response(url)
         if not data or data.get('success') != 1:
             print(f"Failed to get content for art_code: {art_code}")
-            return
+            self._count('detail_failed')
+            return False, None
         
-        attach_url = data.get('data', {}).get('attach_url')
-        if not attach_url:
+        announcement.apply_detail(data.get('data') or {})
+        if not announcement.attach_url:
             print(f"No PDF attachment found for art_code: {art_code}")
-            return
-        
-        # 构建文件名
-        security = data.get('data', {}).get('security', {})[0]
-        stock_code = security.get('stock', '')
-        short_name = security.get('short_name', '')
-        raw_attach_size = data.get('data', {}).get('attach_size', 0)
-        if raw_attach_size in (None, '', 'null'):
-            attach_size = 0
-        else:
-            attach_size = int(raw_attach_size)
-        notice_title = data.get('data', {}).get('notice_title', '')
-        notice_date = data.get('data', {}).get('notice_date', '')
+            self._catalog_update(art_code, 'no_attachment')
+            return True, None
+        notice_title = announcement.title
         
         # 新增：根据关键词过滤公告标题
-        if self.config_manager:
-            # 排除关键词优先
-            exclude_keywords = self.config_manager.notice_title_exclude_keywords
-            if exclude_keywords:
-                if any(kw in notice_title for kw in exclude_keywords):
-                    print(f"公告标题命中排除关键词，跳过: {notice_title}")
-                    return
-            # 包含关键词
-            keywords = self.config_manager.notice_title_keywords
-            if keywords:
-                if not any(kw in notice_title for kw in keywords):
-                    print(f"公告标题未匹配关键词，跳过: {notice_title}")
-                    return
+        filter_reason = self.title_filter_reason(notice_title)
+        if filter_reason:
+            print(f"{filter_reason}，跳过: {notice_title}")
+            self._count('filtered')
+            self._catalog_update(art_code, 'filtered', title=notice_title, notice_date=announcement.notice_date)
+            return True, None
         
         # 创建统一的下载文件夹结构
-        column_name = item.get('columns')[0].get('column_name')
-        pdf_folder = os.path.join(self.download_dir, short_name, column_name)
-        if not os.path.exists(pdf_folder):
-            os.makedirs(pdf_folder)
+        pdf_folder = os.path.join(self.download_dir, announcement.short_name, announcement.column_name)
         
         # 构建PDF文件名
-        raw_filename = self.pdf_downloader.build_pdf_filename(
-            stock_code, short_name, notice_title, notice_date
+        raw_filename = self.file_naming.pdf_filename(
+            announcement.stock_code, announcement.short_name, notice_title, announcement.notice_date, art_code
+        )
+        announcement.filename = filename = self.file_naming.claim(
+            os.path.join(pdf_folder, raw_filename), art_code,
+            is_own_file=lambda path: self._is_own_file(path, announcement.attach_size)
         )
-        filename = os.path.join(pdf_folder, raw_filename)
         
         # 检查是否需要下载PDF
-        if self.pdf_downloader.should_download_pdf(filename, attach_size):
-            print(f"开始下载PDF: {os.path.basename(filename)}")
-            self.pdf_downloader.download_pdf(attach_url, filename, attach_size) 
\ No newline at end of file
+        catalog_fields = announcement.to_dict()
+        del catalog_fields['art_code']
+        with self.tracer.span('disk', art_code=art_code):
+            self.storage.makedirs(pdf_folder)
+            need_download = self.pdf_downloader.should_download_pdf(filename, announcement.attach_size)
+        if not need_download:
+            self._count('skipped')
+            self._catalog_update(art_code, 'downloaded', **catalog_fields)
+            return True, None
+        self._catalog_update(art_code, 'pending', **catalog_fields)
+        if self.http_client.offline:
+            print(f"离线模式，跳过下载PDF: {os.path.basename(filename)}")
+            return True, None
+        return True, announcement
+    
+    def execute_download(self, task):
+        """执行下载任务，配置了流量预算时按 attach_size 预留预算，放不下的文件跳过
+        
+        attach_size 是接口给出的KB数（按1000字节计，与完整性检查一致），只是预估：下载的字节先从这份预留中扣除，
+        实际比预估大时超出部分占用空闲预算，比预估小时剩余的预留在结束后归还
+        """
+        byte_budget = self.pdf_downloader.byte_budget
+        reservation = None
+        if byte_budget:
+            reservation = byte_budget.reserve(task.attach_size * 1000)
+            if reservation is None:
+                print(f"剩余下载流量预算不足，跳过: {os.path.basename(task.filename)} ({task.attach_size}KB)")
+                self._count('budget_skipped')
+                return False
+        try:
+            print(f"开始下载PDF: {os.path.basename(task.filename)}")
+            with self.tracer.span('pdf', art_code=task.art_code, size_kb=task.attach_size):
+                success = self.pdf_downloader.download_pdf(task.attach_url, task.filename, task.attach_size,
+                                                           reservation=reservation)
+            self._catalog_update(task.art_code, 'downloaded' if success else 'failed')
+            if success:
+                self._count('downloaded')
+                self._count('downloaded_kb', task.attach_size)
+                record = {
+                    'art_code': task.art_code,
+                    'stock_code': task.stock_code,
+                    'title': task.title,
+                    'filename': task.filename,
+                    'attach_size': task.attach_size,
+                    'notice_date': task.notice_day,
+                    'column_name': task.column_name,
+                }
+                with self._stats_lock:
+                    self.manifest.append(record)
+                for hook in self.post_download_hooks:
+                    try:
+                        hook(record)
+                    except Exception as e:
+                        print(f"下载后处理失败 {task.art_code}: {e}")
+            else:
+                self._count('failed')
+            return success
+        finally:
+            if reservation:
+                reservation.release() 
\ No newline at end of file
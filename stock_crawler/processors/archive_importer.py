@@ -0,0 +1,99 @@
+import os
+import re
+import errno
+
+class ArchiveImporter:
+    """已有下载目录的导入类，把 股票简称/公告类型/{日期}_{前缀}{标题}.pdf 形式的PDF登记到公告目录
+    
+    文件通过硬链接或移动放入下载目录，从不复制；之后爬取时列表中的公告按文件名与导入记录匹配，
+    不需要请求详情就能确认已下载
+    """
+    
+    # FileNaming.pdf_filename 生成的文件名: 8位日期（可能为空）、下划线、前缀和标题
+    FILENAME_PATTERN = re.compile(r'^(\d{8})?_(.+)\.pdf$', re.IGNORECASE)
+    # 每累计多少个文件写入一次公告目录
+    BATCH_SIZE = 1000
+    
+    def __init__(self, download_dir, catalog, file_index=None):
+        self.download_dir = download_dir
+        self.catalog = catalog
+        self.file_index = file_index
+        self.stats = {'linked': 0, 'moved': 0, 'existing': 0, 'conflict': 0, 'skipped': 0, 'failed': 0}
+    
+    @classmethod
+    def parse_filename(cls, filename):
+        """把PDF文件名解析为 (公告日期YYYYMMDD, 标题)，不符合命名规则时返回None"""
+        match = cls.FILENAME_PATTERN.match(filename)
+        if not match:
+            return None
+        return match.group(1) or '', match.group(2)
+    
+    def _place(self, source, target, move):
+        """把源文件硬链接或移动到目标位置，返回结果类型"""
+        if os.path.exists(target):
+            return 'existing' if os.path.samefile(source, target) else 'conflict'
+        if self.file_index is not None:
+            self.file_index.makedirs(os.path.dirname(target))
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+        if move:
+            os.rename(source, target)
+            result = 'moved'
+        else:
+            os.link(source, target)
+            result = 'linked'
+        if self.file_index is not None:
+            self.file_index.add(target)
+        return result
+    
+    def import_dir(self, source_dir, move=False):
+        """导入 source_dir 中的PDF，source_dir 就是下载目录时只登记不移动，返回统计信息"""
+        if not os.path.isdir(source_dir):
+            # os.walk 对不存在的目录不报错，这里明确报告
+            raise FileNotFoundError(errno.ENOENT, "导入目录不存在", source_dir)
+        in_place = os.path.abspath(source_dir) == os.path.abspath(self.download_dir)
+        batch = []
+        for root, _, filenames in os.walk(source_dir):
+            relative = os.path.relpath(root, source_dir)
+            parts = [] if relative == os.curdir else relative.split(os.sep)
+            for filename in filenames:
+                parsed = self.parse_filename(filename)
+                if len(parts) != 2 or parsed is None:
+                    # 目录层级或文件名不符合下载目录的结构
+                    if filename.lower().endswith('.pdf'):
+                        self.stats['skipped'] += 1
+                    continue
+                short_name, column_name = parts
+                source = os.path.join(root, filename)
+                target = os.path.join(self.download_dir, short_name, column_name, filename)
+                if in_place:
+                    result = 'existing'
+                else:
+                    try:
+                        result = self._place(source, target, move)
+                    except OSError as e:
+                        if e.errno == errno.EXDEV:
+                            print(f"源目录与下载目录不在同一文件系统，无法硬链接或移动: {source}")
+                        else:
+                            print(f"导入失败 {source}: {e}")
+                        self.stats['failed'] += 1
+                        continue
+                self.stats[result] += 1
+                if result == 'conflict':
+                    print(f"下载目录中已有同名的不同文件，跳过: {target}")
+                    continue
+                notice_date, title = parsed
+                batch.append({
+                    'filename': target,
+                    'short_name': short_name,
+                    'column_name': column_name,
+                    'notice_date': notice_date,
+                    'title': title,
+                    'size': os.path.getsize(target),
+                })
+                if len(batch) >= self.BATCH_SIZE:
+                    self.catalog.record_imported(batch)
+                    batch = []
+        if batch:
+            self.catalog.record_imported(batch)
+        return self.stats
@@ -0,0 +1,147 @@
+import os
+import gzip
+import json
+from concurrent.futures import ThreadPoolExecutor
+from ..core import CacheManager
+from ..utils import Utils
+
+class CacheBundle:
+    """缓存打包类，把整个响应缓存导出为一个 JSON Lines 文件（.gz 结尾时压缩），在其他主机上导入
+    
+    每行是一个缓存文件，包含相对路径、缓存时间和原始内容；导入时按原始URL校验完整的相对路径（股票目录和文件名），
+    保留原来的缓存时间（同时写入文件的修改时间），过期判断与导出前一致。新节点一次顺序读取即可预热缓存，不需要逐个请求接口
+    """
+    
+    FORMAT = 'stock-crawler-cache'
+    VERSION = 1
+    
+    def __init__(self, cache_manager, workers=8):
+        self.cache_manager = cache_manager
+        self.workers = max(1, workers)
+        self.stats = {'exported': 0, 'imported': 0, 'newer_local': 0, 'invalid': 0, 'failed': 0}
+    
+    @staticmethod
+    def _open(path, mode):
+        """按扩展名打开普通或 gzip 压缩的文本文件"""
+        if path.endswith('.gz'):
+            return gzip.open(path, mode + 't', encoding='utf-8')
+        return open(path, mode, encoding='utf-8')
+    
+    def export(self, path, stock_codes=None):
+        """按缓存索引逐个读取缓存文件写入打包文件，返回导出的条目数"""
+        with self._open(path, 'w') as f:
+            f.write(json.dumps({'format': self.FORMAT, 'version': self.VERSION}) + '\n')
+            for entry in self.cache_manager.iter_cache_entries(stock_codes=stock_codes):
+                try:
+                    with open(entry['full_path'], 'r', encoding='utf-8') as cache_f:
+                        content = json.load(cache_f)
+                except (OSError, ValueError) as e:
+                    print(f"读取缓存失败，跳过 {entry['filename']}: {e}")
+                    self.stats['failed'] += 1
+                    continue
+                key = os.path.relpath(entry['full_path'], self.cache_manager.cache_dir).replace(os.sep, '/')
+                f.write(json.dumps({'key': key, 'cache_time': entry['cache_time'], 'content': content},
+                                   ensure_ascii=False) + '\n')
+                self.stats['exported'] += 1
+        return self.stats['exported']
+    
+    def _validate(self, record):
+        """校验打包中的一条记录，返回缓存文件的本地路径，不合法时返回None
+        
+        列表页缓存只与页码有关，必须校验所在的股票目录与原始URL中的 stock_list 一致，否则可能把一只股票的
+        列表写进另一只股票的缓存；公告详情只与 art_code 有关，一律导入共享目录（旧版本按股票目录的也一样）
+        """
+        key = record.get('key')
+        content = record.get('content')
+        if not isinstance(key, str) or content is None:
+            return None
+        parts = key.split('/')
+        # 只接受 {股票代码}/{文件名} 或根目录下的文件名，防止写到缓存目录之外
+        if len(parts) > 2 or any(part in ('', '.', '..') or part.startswith('.') for part in parts):
+            return None
+        filename = parts[-1]
+        if not filename.endswith('.json'):
+            return None
+        metadata = content.get('metadata') if isinstance(content, dict) else None
+        original_url = metadata.get('original_url') if isinstance(metadata, dict) else None
+        if original_url:
+            # 缓存文件名必须与原始URL生成的文件名一致
+            if os.path.basename(self.cache_manager.generate_cache_filename(original_url)) != filename:
+                return None
+        elif not filename.startswith('announcement_detail'):
+            # 没有原始URL时无法确认列表页属于哪只股票
+            return None
+        if filename.startswith('announcement_detail'):
+            return os.path.join(self.cache_manager.shared_cache_dir, filename)
+        if filename.startswith('announcement_list'):
+            _, query_params = self.cache_manager._clean_url_params(original_url)
+            stock_code = (query_params.get('stock_list') or [''])[0]
+            if len(parts) != 2 or parts[0] != stock_code:
+                return None
+        elif len(parts) != 1:
+            return None
+        return os.path.join(self.cache_manager.cache_dir, *parts)
+    
+    def _is_newer_local(self, cache_file, cache_time):
+        """本地已有同一缓存且不比打包中的旧"""
+        entry = self.cache_manager.get_index_entry(cache_file)
+        return bool(entry and cache_time and (entry.get('cache_time') or '') >= cache_time)
+    
+    @staticmethod
+    def _write(cache_file, content, cache_time=None):
+        """写入一个缓存文件并把修改时间设为原来的缓存时间（重建索引时以此为缓存时间），返回文件大小"""
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        Utils.atomic_write_json(cache_file, content, indent=2)
+        cache_datetime = CacheManager._parse_cache_time(cache_time)
+        if cache_datetime is not None:
+            timestamp = cache_datetime.timestamp()
+            os.utime(cache_file, (timestamp, timestamp))
+        return os.path.getsize(cache_file)
+    
+    def load(self, path):
+        """导入打包文件，顺序读取、多线程写入缓存文件，返回导入的条目数
+        
+        本地已有更新的缓存时保留本地版本；缓存索引只在主线程中更新
+        """
+        cache_manager = self.cache_manager
+        with self._open(path, 'r') as f, ThreadPoolExecutor(max_workers=self.workers) as executor:
+            header = json.loads(f.readline() or '{}')
+            if header.get('format') != self.FORMAT:
+                raise ValueError(f"不是缓存打包文件: {path}")
+            pending = []
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    self.stats['invalid'] += 1
+                    continue
+                cache_file = self._validate(record)
+                if cache_file is None:
+                    self.stats['invalid'] += 1
+                    continue
+                metadata = record['content'].get('metadata') if isinstance(record['content'], dict) else None
+                cache_time = record.get('cache_time') or (metadata or {}).get('cache_time')
+                if self._is_newer_local(cache_file, cache_time):
+                    self.stats['newer_local'] += 1
+                    continue
+                pending.append((cache_file, cache_time, executor.submit(self._write, cache_file, record['content'], cache_time)))
+                # 限制排队中的写入数量，打包再大内存占用也有上限
+                if len(pending) >= self.workers * 64:
+                    self._collect(pending)
+                    pending = []
+            self._collect(pending)
+        cache_manager.enforce_limits()
+        cache_manager.flush_index()
+        return self.stats['imported']
+    
+    def _collect(self, pending):
+        """等待一批写入完成，并以原来的缓存时间登记到缓存索引"""
+        for cache_file, cache_time, future in pending:
+            try:
+                size = future.result()
+            except Exception as e:
+                print(f"写入缓存失败 {cache_file}: {e}")
+                self.stats['failed'] += 1
+                continue
+            self.cache_manager.register_cache_file(cache_file, size, cache_time)
+            self.stats['imported'] += 1
@@ -0,0 +1,239 @@
+import errno
+import os
+import time
+from ..core import ConfigManager, Announcement
+from ..downloaders import RequestPacer, SingleFlight
+from ..utils import Utils
+
+class CrawlPlanner:
+    """抓取计划类，正式爬取前只获取（或从缓存读取）列表页，估算需要的请求数、流量和耗时
+    
+    列表页按 StockCrawler 的分页逻辑获取并写入缓存，公告经过公告目录、标题关键词和已有文件的过滤后
+    写入计划文件；详情已缓存的公告直接得到附件大小，其余按平均大小估算。执行计划时直接处理计划中的公告，
+    不再获取列表页
+    """
+    
+    FORMAT = 'stock-crawler-plan'
+    VERSION = 1
+    
+    def __init__(self, config_file='config.json', download_dir=None, cache_dir=None, stock_codes=None, offline=False,
+                 tracer=None):
+        self.config_file = config_file
+        self.config_manager = ConfigManager(config_file)
+        self.download_dir = download_dir
+        self.cache_dir = cache_dir
+        self.stock_codes = stock_codes or self.config_manager.stock_codes
+        self.offline = offline
+        # 所有股票共享的请求合并器，同时用于统计实际发出的网络请求数
+        self.single_flight = SingleFlight()
+        # 所有股票共享的请求节流器，执行计划时控制公告间隔，同时用于估算耗时；
+        # 配置了 global_request_rate 时按该速率，否则每秒1条
+        request_rate = self.config_manager.global_request_rate
+        self.request_pacer = RequestPacer(1.0 / request_rate if request_rate else 1.0)
+        # 耗时追踪，传给各股票的工厂，None表示不记录
+        self.tracer = tracer
+        # 创建所有股票共享组件（缓存索引、公告目录、全文索引、存储后端）的工厂，最后关闭
+        self.shared_factory = None
+        self.shared = {}
+        self.factories = {}
+    
+    def _factory(self, stock_code):
+        """按股票代码复用工厂实例，所有股票共享请求合并器、缓存索引、公告目录和存储后端"""
+        # 延迟导入，避免 processors 与 factory 之间的循环导入
+        from ..factory import CrawlerFactory
+        
+        if self.shared_factory is None:
+            self.shared_factory = CrawlerFactory(
+                config_file=self.config_file,
+                download_dir=self.download_dir,
+                cache_dir=self.cache_dir,
+                offline=self.offline,
+                stock_code=stock_code
+            )
+            self.shared = self.shared_factory.shared_components()
+        if stock_code not in self.factories:
+            self.factories[stock_code] = CrawlerFactory(
+                config_file=self.config_file,
+                download_dir=self.download_dir,
+                cache_dir=self.cache_dir,
+                offline=self.offline,
+                stock_code=stock_code,
+                request_pacer=self.request_pacer,
+                single_flight=self.single_flight,
+                tracer=self.tracer,
+                **self.shared
+            )
+        return self.factories[stock_code]
+    
+    def _plan_stock(self, stock_code, summary, items):
+        """逐页检查一只股票的公告，把需要处理的公告加入 items，返回已知附件大小(KB)的列表"""
+        factory = self._factory(stock_code)
+        crawler = factory.stock_crawler
+        processor = factory.announcement_processor
+        storage = factory.storage
+        known_sizes = []
+        for _, announcements in crawler.iter_pages():
+            summary['list_pages'] += 1
+            for announcement in announcements:
+                summary['listed'] += 1
+                if not announcement.art_code:
+                    continue
+                if crawler.is_done(announcement):
+                    summary['done'] += 1
+                    continue
+                if processor.title_filter_reason(announcement.title):
+                    summary['filtered'] += 1
+                    continue
+                local_filename = processor.local_filename(announcement)
+                if local_filename and storage.exists(local_filename):
+                    summary['existing'] += 1
+                    continue
+                detail = processor.http_client.get_cached_response(processor.detail_url(announcement.art_code))
+                detail_cached = bool(detail and detail.get('success') == 1)
+                if detail_cached:
+                    announcement.apply_detail(detail.get('data') or {})
+                    if not announcement.attach_url:
+                        summary['no_attachment'] += 1
+                        continue
+                    # 接口未给出大小（0或负数）的附件与未缓存详情的一样按平均值估算
+                    if announcement.attach_size > 0:
+                        known_sizes.append(announcement.attach_size)
+                else:
+                    summary['detail_requests'] += 1
+                items.append({'stock_code': stock_code, 'detail_cached': detail_cached,
+                              'announcement': announcement.to_dict()})
+        factory.cache_manager.flush_index()
+        return known_sizes
+    
+    def _average_attach_kb(self, known_sizes):
+        """估算未知附件大小用的平均值(KB)及其来源"""
+        if known_sizes:
+            return sum(known_sizes) / len(known_sizes), 'cached_details'
+        catalog = next(iter(self.factories.values())).catalog if self.factories else None
+        average = catalog.average_attach_size() if catalog is not None else None
+        if average:
+            return average, 'catalog'
+        return self.config_manager.plan_default_attach_kb, 'default'
+    
+    def _download_seconds(self, total_kb):
+        """按配置的限速估算下载耗时，未配置任何限速时返回None"""
+        config_manager = self.config_manager
+        parallel = config_manager.download_order != 'list' or config_manager.download_workers > 1
+        workers = max(1, config_manager.download_workers) if parallel else 1
+        rates = []
+        if config_manager.global_rate_limit_kb:
+            rates.append(config_manager.global_rate_limit_kb)
+        if config_manager.download_rate_limit_kb:
+            rates.append(config_manager.download_rate_limit_kb * workers)
+        return total_kb / min(rates) if rates else None
+    
+    def plan(self):
+        """为所有股票生成抓取计划，返回计划字典"""
+        summary = {key: 0 for key in ('list_pages', 'listed', 'done', 'filtered', 'existing',
+                                      'no_attachment', 'detail_requests')}
+        items = []
+        known_sizes = []
+        for stock_code in self.stock_codes:
+            print(f"[计划] 检查股票 {stock_code} 的公告列表...")
+            try:
+                known_sizes.extend(self._plan_stock(stock_code, summary, items))
+            except Exception as e:
+                print(f"[计划] 检查股票 {stock_code} 失败: {e}")
+        average_kb, size_basis = self._average_attach_kb(known_sizes)
+        unknown_count = len(items) - len(known_sizes)
+        total_kb = sum(known_sizes) + unknown_count * average_kb
+        request_seconds = 0 if self.offline else len(items) * self.request_pacer.interval
+        download_seconds = self._download_seconds(total_kb)
+        summary.update({
+            'list_requests': self.single_flight.stats['executed'],
+            'pdfs': len(items),
+            'known_size_count': len(known_sizes),
+            'known_kb': sum(known_sizes),
+            'average_kb': round(average_kb, 1),
+            'size_basis': size_basis,
+            'estimated_kb': round(total_kb),
+            'request_seconds': request_seconds,
+            'download_seconds': None if download_seconds is None else round(download_seconds),
+        })
+        return {
+            'format': self.FORMAT,
+            'version': self.VERSION,
+            'created_at': time.time(),
+            'stock_codes': list(self.stock_codes),
+            'summary': summary,
+            'items': items,
+        }
+    
+    @staticmethod
+    def _format_duration(seconds):
+        """格式化耗时显示"""
+        if seconds < 60:
+            return f"{seconds:.0f}秒"
+        if seconds < 3600:
+            return f"{seconds / 60:.1f}分钟"
+        return f"{seconds / 3600:.1f}小时"
+    
+    @classmethod
+    def report(cls, plan):
+        """输出计划的汇总信息"""
+        summary = plan['summary']
+        print(f"列表页: {summary['list_pages']} 页 (本次发起网络请求 {summary['list_requests']} 次，已写入缓存)")
+        print(f"公告: {summary['listed']} 条，公告目录中已完成 {summary['done']}，标题过滤 {summary['filtered']}，"
+              f"文件已存在 {summary['existing']}，没有附件 {summary['no_attachment']}")
+        print(f"待处理公告: {summary['pdfs']} 条，需要请求详情 {summary['detail_requests']} 次")
+        basis = {'cached_details': '已缓存详情的平均值', 'catalog': '公告目录中的平均值',
+                 'default': 'plan_default_attach_kb'}[summary['size_basis']]
+        print(f"预计下载: {Utils.format_file_size(summary['estimated_kb'] * 1000)} "
+              f"(已知 {summary['known_size_count']} 个共 {Utils.format_file_size(summary['known_kb'] * 1000)}，"
+              f"其余按 {summary['average_kb']}KB/个估算，来源: {basis})")
+        request_seconds = summary['request_seconds']
+        download_seconds = summary['download_seconds']
+        duration = f"预计耗时: 公告间隔 {cls._format_duration(request_seconds)}"
+        if download_seconds is None:
+            print(f"{duration}，未配置限速，下载耗时取决于带宽")
+        else:
+            print(f"{duration}，限速下载 {cls._format_duration(download_seconds)}，"
+                  f"合计约 {cls._format_duration(request_seconds + download_seconds)}")
+    
+    def save(self, plan, path):
+        """把计划写入JSON文件"""
+        Utils.atomic_write_json(path, plan)
+    
+    @classmethod
+    def load(cls, path):
+        """读取计划文件"""
+        if not os.path.exists(path):
+            raise FileNotFoundError(errno.ENOENT, "抓取计划文件不存在", path)
+        plan = Utils.load_json_file(path)
+        if not plan or plan.get('format') != cls.FORMAT:
+            raise ValueError(f"不是抓取计划文件: {path}")
+        return plan
+    
+    def execute(self, plan):
+        """执行计划: 按股票依次处理计划中的公告，不再获取列表页，返回各股票的处理统计之和"""
+        by_stock = {}
+        for entry in plan['items']:
+            by_stock.setdefault(entry['stock_code'], []).append(Announcement.from_dict(entry['announcement']))
+        stats = {}
+        for stock_code, announcements in by_stock.items():
+            factory = self._factory(stock_code)
+            print(f"[计划] 股票 {stock_code}: 处理 {len(announcements)} 条公告")
+            try:
+                factory.stock_crawler.run_planned(announcements)
+            except Exception as e:
+                print(f"[计划] 处理股票 {stock_code} 失败: {e}")
+            finally:
+                factory.close()
+            for key, value in factory.announcement_processor.stats.items():
+                stats[key] = stats.get(key, 0) + value
+        return stats
+    
+    def close(self):
+        """释放所有工厂实例"""
+        for factory in self.factories.values():
+            factory.close()
+        self.factories.clear()
+        if self.shared_factory is not None:
+            self.shared_factory.close()
+            self.shared_factory = None
+            self.shared = {}
@@ -0,0 +1,153 @@
+import heapq
+import itertools
+import threading
+
+class _ScheduleRun:
+    """一次调度运行: 工作线程在列表页和详情仍在获取时就开始下载，submit 在待下载任务达到上限时阻塞
+    
+    待下载任务按大小文件分别放在两个按排序键排列的堆中，取任务和加入任务都是 O(log n)
+    """
+    
+    def __init__(self, scheduler, execute):
+        self.scheduler = scheduler
+        self.execute = execute
+        self.condition = threading.Condition()
+        # 堆元素为 (排序键, 加入顺序, 任务)，加入顺序保证同优先级按列表顺序
+        self.small = []
+        self.large = []
+        self.sequence = itertools.count()
+        self.active_large = 0
+        self.closed = False
+        self.cancelled = False
+        self.submitted = 0
+        self.threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(scheduler.workers)]
+        for thread in self.threads:
+            thread.start()
+    
+    def submit(self, task):
+        """加入一个下载任务，待下载任务达到 max_pending 时等待工作线程取走"""
+        scheduler = self.scheduler
+        entry = (scheduler._sort_key(task), next(self.sequence), task)
+        with self.condition:
+            while (not self.cancelled and scheduler.max_pending
+                   and len(self.small) + len(self.large) >= scheduler.max_pending):
+                self.condition.wait()
+            if self.cancelled:
+                return
+            heapq.heappush(self.large if scheduler.is_large(task) else self.small, entry)
+            self.submitted += 1
+            self.condition.notify_all()
+    
+    def _next_task(self):
+        """取排序最靠前且有空闲名额的任务，没有任务且已关闭时返回None"""
+        with self.condition:
+            while True:
+                large_open = self.large and self.active_large < self.scheduler.max_large_downloads
+                if large_open and (not self.small or self.large[0] < self.small[0]):
+                    self.active_large += 1
+                    task = heapq.heappop(self.large)[2]
+                elif self.small:
+                    task = heapq.heappop(self.small)[2]
+                elif self.closed and not self.large:
+                    return None
+                else:
+                    # 没有任务，或剩下的都是大文件且名额已满
+                    self.condition.wait()
+                    continue
+                # 唤醒等待空位的 submit
+                self.condition.notify_all()
+                return task
+    
+    def _worker(self):
+        scheduler = self.scheduler
+        while True:
+            task = self._next_task()
+            if task is None:
+                return
+            try:
+                self.execute(task)
+            except Exception as e:
+                print(f"下载任务执行失败 {task.art_code}: {e}")
+            finally:
+                if scheduler.is_large(task):
+                    with self.condition:
+                        self.active_large -= 1
+                        self.condition.notify_all()
+    
+    def close(self, cancel=False):
+        """不再加入任务，等待工作线程下载完剩余任务后返回；cancel 为 True 时丢弃尚未开始的任务"""
+        with self.condition:
+            self.closed = True
+            if cancel:
+                self.cancelled = True
+                self.small.clear()
+                self.large.clear()
+            self.condition.notify_all()
+        for thread in self.threads:
+            thread.join()
+        return self.submitted
+
+class DownloadScheduler:
+    """下载调度类，负责按策略排序下载任务，并分别限制大文件和小文件的并发数"""
+    
+    POLICIES = ('list', 'newest', 'smallest', 'column')
+    
+    def __init__(self, policy='list', column_priority=None, workers=1,
+                 max_large_downloads=1, large_file_kb=10240, max_pending=200):
+        if policy not in self.POLICIES:
+            print(f"未知的下载排序策略 {policy}，按列表顺序下载")
+            policy = 'list'
+        self.policy = policy
+        self.column_priority = list(column_priority or [])
+        self.workers = max(1, int(workers))
+        self.max_large_downloads = max(1, int(max_large_downloads))
+        self.large_file_kb = large_file_kb
+        # 等待下载的任务数上限，达到时暂停获取详情；排序只在已加入的任务之间进行，0 表示不限制
+        self.max_pending = max(0, int(max_pending or 0))
+    
+    @property
+    def is_sequential(self):
+        """是否与原有逐条处理的方式等价（按列表顺序、单线程）"""
+        return self.policy == 'list' and self.workers == 1
+    
+    def is_large(self, task):
+        """判断是否为大文件任务（attach_size 单位为KB）"""
+        return task.attach_size >= self.large_file_kb
+    
+    def _sort_key(self, task):
+        """按调度策略生成排序键"""
+        if self.policy == 'newest':
+            # notice_day 为 YYYYMMDD 字符串，转为数字取负实现倒序
+            notice_day = task.notice_day
+            return -int(notice_day) if notice_day else 0
+        if self.policy == 'smallest':
+            return task.attach_size
+        if self.policy == 'column':
+            column_name = task.column_name
+            if column_name in self.column_priority:
+                return self.column_priority.index(column_name)
+            return len(self.column_priority)
+        return 0
+    
+    def order(self, tasks):
+        """按调度策略排序任务，排序稳定，同优先级保持列表顺序"""
+        if self.policy == 'list':
+            return list(tasks)
+        return sorted(tasks, key=self._sort_key)
+    
+    def start(self, execute):
+        """启动工作线程，返回的调度运行通过 submit 逐个加入任务，close 等待全部下载完成
+        
+        每个工作线程总是取排序最靠前且有空闲名额的任务，大文件同时下载数不超过 max_large_downloads，
+        避免大文件占满所有线程而阻塞小文件。
+        """
+        return _ScheduleRun(self, execute)
+    
+    def run(self, tasks, execute):
+        """按顺序并发执行一批已知的下载任务"""
+        schedule = self.start(execute)
+        try:
+            for task in tasks:
+                schedule.submit(task)
+        finally:
+            schedule.close()
@@ -0,0 +1,347 @@
+import os
+import csv
+import json
+import glob
+from datetime import datetime
+from ..utils import Utils
+
+class MetadataExporter:
+    """公告元数据导出类，把缓存中的列表和详情数据流式导出为 JSON Lines、CSV 或 Parquet
+    
+    按列表缓存文件逐个读取、分块写出，内存占用与缓存总量无关；导出状态记录在输出文件旁的
+    .state.json 中，每写出一块只向 .state.journal 追加这一块的变更，导出开始和结束时才合并为完整的状态，
+    再次导出时跳过未变化的列表缓存和已导出的公告，只追加新增记录。
+    导出时还没有详情缓存的公告记在状态的 pending_detail 中，之后详情已缓存时再追加一条 has_detail 为 true
+    的记录，同一 art_code 以最后一条为准
+    """
+    
+    FORMATS = ('jsonl', 'csv', 'parquet')
+    FIELDS = (
+        'art_code', 'stock_code', 'short_name', 'title', 'notice_date', 'display_time',
+        'column_code', 'column_name', 'attach_url', 'attach_size', 'has_detail'
+    )
+    # 每累计多少条记录写出一次
+    CHUNK_ROWS = 5000
+    # 写入中的 Parquet 分片文件后缀，关闭后才改名为 .parquet
+    TEMP_SUFFIX = '.tmp'
+    
+    def __init__(self, cache_manager, output_path, output_format=None):
+        self.cache_manager = cache_manager
+        self.output_path = output_path
+        self.output_format = output_format or self._format_from_path(output_path)
+        if self.output_format not in self.FORMATS:
+            raise ValueError(f"不支持的导出格式: {self.output_format}")
+        self.state_file = output_path.rstrip('/\\') + '.state.json'
+        self.journal_file = output_path.rstrip('/\\') + '.state.journal'
+        self.state = self._empty_state()
+    
+    @staticmethod
+    def _empty_state():
+        """空的导出状态: 已处理的列表文件、已完整导出的公告、导出时缺少详情的公告 (art_code -> 列表文件) 和输出文件大小"""
+        return {'files': {}, 'art_codes': [], 'pending_detail': {}, 'output_size': None}
+    
+    @staticmethod
+    def _format_from_path(output_path):
+        """根据输出路径的扩展名推断导出格式，Parquet 输出为目录时默认 parquet"""
+        ext = os.path.splitext(output_path.rstrip('/\\'))[1].lower().lstrip('.')
+        if ext in ('csv', 'parquet'):
+            return ext
+        if ext in ('jsonl', 'json', 'ndjson'):
+            return 'jsonl'
+        return 'parquet' if os.path.isdir(output_path) else 'jsonl'
+    
+    def _load_state(self):
+        """加载上次导出的状态，并应用状态日志中之后写出的各块的变更"""
+        state = Utils.load_json_file(self.state_file) if os.path.exists(self.state_file) else None
+        if state:
+            self.state = self._empty_state()
+            self.state.update((key, state[key]) for key in self.state if state.get(key) is not None)
+        self._replay_journal()
+    
+    def _replay_journal(self):
+        """按顺序应用状态日志中的变更，中断时写了一半的最后一行忽略（其输出会按上一块记录的大小截断）"""
+        if not os.path.exists(self.journal_file):
+            return
+        exported = set(self.state['art_codes'])
+        with open(self.journal_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    change = json.loads(line)
+                except ValueError:
+                    break
+                self.state['files'].update(change['files'])
+                self.state['pending_detail'].update(change['pending_detail'])
+                for art_code in change['art_codes']:
+                    exported.add(art_code)
+                    self.state['pending_detail'].pop(art_code, None)
+                self.state['output_size'] = change['output_size']
+        self.state['art_codes'] = sorted(exported)
+    
+    def _output_size(self):
+        """JSON Lines/CSV 输出文件当前的大小，Parquet 输出为 None"""
+        if self.output_format != 'parquet' and os.path.exists(self.output_path):
+            return os.path.getsize(self.output_path)
+        return None
+    
+    def _save_state(self, files, exported, pending):
+        """保存完整的导出状态并清空状态日志，同时记录 JSON Lines/CSV 输出文件当前的大小"""
+        self.state = {'files': files, 'art_codes': sorted(exported), 'pending_detail': pending,
+                      'output_size': self._output_size()}
+        Utils.atomic_write_json(self.state_file, self.state)
+        if os.path.exists(self.journal_file):
+            os.remove(self.journal_file)
+    
+    def _append_state(self, chunk, chunk_keys, chunk_files):
+        """向状态日志追加一块记录的变更（写出的公告、缺少详情的公告、处理完的列表文件和输出文件大小）"""
+        change = {'files': dict(chunk_files), 'art_codes': [], 'pending_detail': {},
+                  'output_size': self._output_size()}
+        for record, key in zip(chunk, chunk_keys):
+            if record['has_detail']:
+                change['art_codes'].append(record['art_code'])
+            else:
+                change['pending_detail'][record['art_code']] = key
+        with open(self.journal_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(change, ensure_ascii=False) + '\n')
+    
+    def _discard_unrecorded_output(self):
+        """丢弃上次中断时写出但未记入状态的内容: 文本输出截断到状态中记录的大小，删除未完成的 Parquet 分片"""
+        if self.output_format == 'parquet':
+            for temp_file in glob.glob(os.path.join(self.output_path, 'part-*.parquet' + self.TEMP_SUFFIX)):
+                os.remove(temp_file)
+            return
+        recorded_size = self.state['output_size']
+        if recorded_size is None or not os.path.exists(self.output_path):
+            # 旧版本的状态没有记录输出大小
+            return
+        if os.path.getsize(self.output_path) > recorded_size:
+            print(f"上次导出中断，丢弃未记录的 {os.path.getsize(self.output_path) - recorded_size} 字节")
+            with open(self.output_path, 'r+b') as f:
+                f.truncate(recorded_size)
+    
+    def _reset_output(self):
+        """全量导出前清除已有的输出和状态"""
+        if self.output_format == 'parquet':
+            for part_file in glob.glob(os.path.join(self.output_path, 'part-*.parquet*')):
+                os.remove(part_file)
+        elif os.path.exists(self.output_path):
+            os.remove(self.output_path)
+        for state_file in (self.state_file, self.journal_file):
+            if os.path.exists(state_file):
+                os.remove(state_file)
+    
+    @staticmethod
+    def _read_cache_data(cache_file):
+        """直接读取缓存文件中的接口数据，不经过 load_cache，避免导出时删除过期缓存或改变LRU顺序"""
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                cache_data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if isinstance(cache_data, dict) and 'data' in cache_data:
+            return cache_data['data']
+        return cache_data
+    
+    def _detail_file(self, art_code, stock_dir):
+        """公告详情的缓存文件，优先共享目录，旧版本按股票目录缓存的详情作为后备，没有缓存时返回None"""
+        filename = f"announcement_detail_{art_code}.json"
+        for detail_file in (os.path.join(self.cache_manager.shared_cache_dir, filename),
+                            os.path.join(stock_dir, filename)):
+            if os.path.exists(detail_file):
+                return detail_file
+        return None
+    
+    def _build_record(self, item, stock_dir):
+        """合并列表条目和（已缓存的）公告详情，生成一条导出记录"""
+        art_code = item.get('art_code')
+        codes = item.get('codes') or [{}]
+        columns = item.get('columns') or [{}]
+        record = {
+            'art_code': art_code,
+            'stock_code': codes[0].get('stock_code', ''),
+            'short_name': codes[0].get('short_name', ''),
+            'title': item.get('title', ''),
+            'notice_date': (item.get('notice_date') or '')[:10],
+            'display_time': item.get('display_time', ''),
+            'column_code': columns[0].get('column_code', ''),
+            'column_name': columns[0].get('column_name', ''),
+            'attach_url': '',
+            'attach_size': None,
+            'has_detail': False,
+        }
+        detail_file = self._detail_file(art_code, stock_dir)
+        detail = self._read_cache_data(detail_file) if detail_file else None
+        if detail and detail.get('success') == 1:
+            data = detail.get('data') or {}
+            record['attach_url'] = data.get('attach_url') or ''
+            raw_attach_size = data.get('attach_size')
+            if raw_attach_size not in (None, '', 'null'):
+                record['attach_size'] = int(raw_attach_size)
+            record['title'] = data.get('notice_title') or record['title']
+            record['has_detail'] = True
+        return record
+    
+    def _refresh_keys(self, pending):
+        """缺少详情的公告中详情已经缓存的，返回其所在列表文件的键，这些列表文件需要重新读取"""
+        keys = set()
+        for art_code, key in pending.items():
+            if key in keys:
+                continue
+            stock_dir = os.path.join(self.cache_manager.cache_dir, *key.split('/')[:-1])
+            if self._detail_file(art_code, stock_dir):
+                keys.add(key)
+        return keys
+    
+    def iter_list_files(self, stock_codes=None, exported=None, files=None, pending=None):
+        """按列表缓存文件产出 (文件键, 缓存时间, 记录列表)
+        
+        跳过 exported 中的公告和 files 中缓存时间未变化的列表文件；pending 中的公告只在详情已缓存时再次产出
+        """
+        exported = exported if exported is not None else set()
+        files = files if files is not None else {}
+        pending = pending if pending is not None else {}
+        refresh_keys = self._refresh_keys(pending)
+        # 本次已产出的公告，联合公告出现在多只股票的列表中时只导出一次
+        seen = set()
+        entries = self.cache_manager.iter_cache_entries(
+            stock_codes=stock_codes, endpoints={'announcement_list'}
+        )
+        for entry in entries:
+            key = f"{entry['stock_code']}/{entry['filename']}"
+            if files.get(key) == entry['cache_time'] and key not in refresh_keys:
+                continue
+            data = self._read_cache_data(entry['full_path'])
+            if not data or data.get('success') != 1:
+                continue
+            stock_dir = os.path.dirname(entry['full_path'])
+            records = []
+            for item in (data.get('data') or {}).get('list') or []:
+                art_code = item.get('art_code')
+                if not art_code or art_code in exported or art_code in seen:
+                    continue
+                record = self._build_record(item, stock_dir)
+                if art_code in pending and not record['has_detail']:
+                    continue
+                seen.add(art_code)
+                records.append(record)
+            yield key, entry['cache_time'], records
+    
+    def iter_records(self, stock_codes=None, exported=None, files=None, pending=None):
+        """逐条产出导出记录，过滤规则同 iter_list_files"""
+        for _, _, records in self.iter_list_files(stock_codes, exported, files, pending):
+            yield from records
+    
+    def _write_jsonl(self, records):
+        """追加写入 JSON Lines 文件"""
+        with open(self.output_path, 'a', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    
+    def _write_csv(self, records):
+        """追加写入 CSV 文件，文件为空时先写表头"""
+        write_header = not os.path.exists(self.output_path) or os.path.getsize(self.output_path) == 0
+        # utf-8-sig 便于 Excel 直接打开中文内容，追加时不再写入BOM
+        encoding = 'utf-8-sig' if write_header else 'utf-8'
+        with open(self.output_path, 'a', encoding=encoding, newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=self.FIELDS)
+            if write_header:
+                writer.writeheader()
+            writer.writerows(records)
+    
+    def _open_parquet_writer(self):
+        """创建本次导出的 Parquet 分片文件，需要安装可选依赖 pyarrow"""
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("导出 Parquet 需要安装 pyarrow (pip install stock-crawler[export])")
+        
+        schema = pa.schema([
+            (field, pa.int64() if field == 'attach_size' else pa.bool_() if field == 'has_detail' else pa.string())
+            for field in self.FIELDS
+        ])
+        part_file = os.path.join(self.output_path, f"part-{datetime.now().strftime('%Y%m%d%H%M%S%f')}.parquet")
+        return pa, pq.ParquetWriter(part_file + self.TEMP_SUFFIX, schema), schema, part_file
+    
+    def _finish_parquet(self, parquet):
+        """关闭 Parquet 分片文件并改为正式文件名"""
+        _, writer, _, part_file = parquet
+        writer.close()
+        os.replace(part_file + self.TEMP_SUFFIX, part_file)
+    
+    def export(self, stock_codes=None, full=False):
+        """导出缓存中的公告元数据，返回本次导出的记录数；full 为 True 时清除已有输出重新导出
+        
+        每写出一块记录就追加一次状态日志（Parquet 在分片文件完成改名后保存状态），中途崩溃时下次导出先丢弃
+        未记入状态的输出，再从状态继续，不会产生重复记录
+        """
+        if full:
+            self._reset_output()
+        else:
+            self._load_state()
+            self._discard_unrecorded_output()
+        output_dir = self.output_path if self.output_format == 'parquet' else os.path.dirname(self.output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        exported = set(self.state['art_codes'])
+        files = dict(self.state['files'])
+        pending = dict(self.state['pending_detail'])
+        if self.output_format != 'parquet':
+            # 写出前先合并状态日志并记录输出文件当前的大小，第一块写到一半时中断也能截断回来
+            self._save_state(files, exported, pending)
+        
+        parquet = None
+        count = 0
+        # chunk 中每条记录所在的列表文件，以及记录已全部放入 chunk 的列表文件，chunk 写出后才记入状态
+        chunk, chunk_keys, chunk_files = [], [], []
+        try:
+            for key, cache_time, records in self.iter_list_files(stock_codes, exported, files, pending):
+                chunk.extend(records)
+                chunk_keys.extend([key] * len(records))
+                chunk_files.append((key, cache_time))
+                if len(chunk) < self.CHUNK_ROWS:
+                    continue
+                parquet = self._write_chunk(chunk, parquet)
+                count += len(chunk)
+                self._commit_chunk(chunk, chunk_keys, chunk_files, files, exported, pending)
+                if parquet is None:
+                    self._append_state(chunk, chunk_keys, chunk_files)
+                chunk, chunk_keys, chunk_files = [], [], []
+            if chunk:
+                parquet = self._write_chunk(chunk, parquet)
+                count += len(chunk)
+            self._commit_chunk(chunk, chunk_keys, chunk_files, files, exported, pending)
+            if parquet:
+                self._finish_parquet(parquet)
+                parquet = None
+            self._save_state(files, exported, pending)
+        finally:
+            if parquet:
+                # 导出中断，未完成的分片保留 .tmp 后缀，下次导出时删除
+                parquet[1].close()
+        return count
+    
+    @staticmethod
+    def _commit_chunk(chunk, chunk_keys, chunk_files, files, exported, pending):
+        """把已写出的记录和列表文件记入状态，没有详情的公告记下所在的列表文件，之后详情缓存时据此重新读取"""
+        for record, key in zip(chunk, chunk_keys):
+            art_code = record['art_code']
+            if record['has_detail']:
+                exported.add(art_code)
+                pending.pop(art_code, None)
+            else:
+                pending[art_code] = key
+        for key, cache_time in chunk_files:
+            files[key] = cache_time
+    
+    def _write_chunk(self, chunk, parquet):
+        """写出一块记录，Parquet 每块写成一个行组"""
+        if self.output_format == 'jsonl':
+            self._write_jsonl(chunk)
+        elif self.output_format == 'csv':
+            self._write_csv(chunk)
+        else:
+            if parquet is None:
+                parquet = self._open_parquet_writer()
+            pa, writer, schema, _ = parquet
+            writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+        return parquet
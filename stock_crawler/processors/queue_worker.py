@@ -0,0 +1,144 @@
+import os
+import time
+import socket
+from ..core import Announcement
+from ..downloaders import RequestPacer, SingleFlight
+
+class QueueWorker:
+    """队列工作节点，从共享的 WorkQueue 领取列表页和公告任务并处理
+    
+    列表页任务的键为 page:{股票代码}:{页码}，公告任务的键为 announcement:{art_code}，
+    同一公告即使出现在多只股票或多个节点的列表中也只会处理一次
+    """
+    
+    KIND_PAGE = 'page'
+    KIND_ANNOUNCEMENT = 'announcement'
+    
+    def __init__(self, work_queue, config_file='config.json', download_dir=None, cache_dir=None,
+                 worker_id=None, poll_interval=5, tracer=None):
+        self.work_queue = work_queue
+        self.config_file = config_file
+        self.download_dir = download_dir
+        self.cache_dir = cache_dir
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.poll_interval = poll_interval
+        self.request_pacer = RequestPacer(1.0)
+        # 所有股票共享的请求合并器，联合公告的详情只请求一次
+        self.single_flight = SingleFlight()
+        # 耗时追踪，传给各股票的工厂，None表示不记录
+        self.tracer = tracer
+        # 创建所有股票共享组件（缓存索引、公告目录、全文索引、存储后端）的工厂，最后关闭
+        self.shared_factory = None
+        self.shared = {}
+        self.factories = {}
+    
+    @classmethod
+    def seed(cls, work_queue, stock_codes):
+        """为每只股票加入第一页列表任务，返回新加入的任务数"""
+        added = 0
+        for stock_code in stock_codes:
+            if work_queue.enqueue(cls.KIND_PAGE, f"page:{stock_code}:1", {'stock_code': stock_code, 'page_index': 1}):
+                added += 1
+        return added
+    
+    def _factory(self, stock_code):
+        """按股票代码复用工厂实例"""
+        # 延迟导入，避免 processors 与 factory 之间的循环导入
+        from ..factory import CrawlerFactory
+        
+        if self.shared_factory is None:
+            self.shared_factory = CrawlerFactory(
+                config_file=self.config_file,
+                download_dir=self.download_dir,
+                cache_dir=self.cache_dir,
+                stock_code=stock_code
+            )
+            self.shared = self.shared_factory.shared_components()
+        if stock_code not in self.factories:
+            self.factories[stock_code] = CrawlerFactory(
+                config_file=self.config_file,
+                download_dir=self.download_dir,
+                cache_dir=self.cache_dir,
+                stock_code=stock_code,
+                request_pacer=self.request_pacer,
+                single_flight=self.single_flight,
+                tracer=self.tracer,
+                **self.shared
+            )
+        return self.factories[stock_code]
+    
+    def _handle_page(self, payload):
+        """处理列表页任务: 把页内公告加入队列，第一页还负责加入其余页"""
+        stock_code = payload['stock_code']
+        page_index = payload['page_index']
+        crawler = self._factory(stock_code).stock_crawler
+        page = crawler.fetch_page(page_index)
+        if page is None:
+            return False
+        announcements, total_hits = page
+        if crawler.catalog is not None:
+            crawler.catalog.record_listed(announcements)
+        
+        added = 0
+        for announcement in announcements:
+            art_code = announcement.art_code
+            if crawler.is_done(announcement):
+                continue
+            if art_code and self.work_queue.enqueue(
+                    self.KIND_ANNOUNCEMENT, f"announcement:{art_code}",
+                    {'stock_code': stock_code, 'item': announcement.to_dict()}):
+                added += 1
+        if page_index == 1:
+            page_count = (total_hits + crawler.PAGE_SIZE - 1) // crawler.PAGE_SIZE
+            for next_page in range(2, page_count + 1):
+                self.work_queue.enqueue(self.KIND_PAGE, f"page:{stock_code}:{next_page}",
+                                        {'stock_code': stock_code, 'page_index': next_page})
+        print(f"[{self.worker_id}] 股票 {stock_code} 第{page_index}页新增 {added} 条公告任务")
+        return True
+    
+    def _handle_announcement(self, payload):
+        """处理公告任务: 获取详情并下载PDF，获取详情或下载失败时返回False，任务放回队列等待重试"""
+        factory = self._factory(payload['stock_code'])
+        announcement = Announcement.from_dict(payload['item'])
+        success = factory.announcement_processor.process_announcement(announcement)
+        if not factory.offline:
+            self.request_pacer.wait()
+        return success
+    
+    def run(self, max_units=None):
+        """循环领取并处理任务，队列中没有未完成的任务时退出，返回处理的任务数"""
+        processed = 0
+        while max_units is None or processed < max_units:
+            unit = self.work_queue.lease(self.worker_id)
+            if unit is None:
+                if not self.work_queue.has_unfinished():
+                    break
+                # 其他节点还有处理中的任务，等待其完成或租约过期
+                time.sleep(self.poll_interval)
+                continue
+            
+            try:
+                if unit['kind'] == self.KIND_PAGE:
+                    success = self._handle_page(unit['payload'])
+                else:
+                    success = self._handle_announcement(unit['payload'])
+                error = '' if success else '处理失败'
+            except Exception as e:
+                success = False
+                error = str(e)
+                print(f"[{self.worker_id}] 处理任务失败 {unit['unit_key']}: {e}")
+            
+            if success:
+                self.work_queue.complete(unit['unit_key'], self.worker_id)
+            else:
+                self.work_queue.fail(unit['unit_key'], self.worker_id, error)
+            processed += 1
+        
+        for factory in self.factories.values():
+            factory.close()
+        self.factories.clear()
+        if self.shared_factory is not None:
+            self.shared_factory.close()
+            self.shared_factory = None
+            self.shared = {}
+        return processed
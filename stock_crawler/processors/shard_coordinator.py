@@ -0,0 +1,190 @@
+import os
+import json
+import zlib
+import multiprocessing
+from ..core import ConfigManager
+from ..downloaders import RequestPacer, SingleFlight
+from ..utils import Utils, Tracer
+
+# 工作进程内共享的请求节流器，由进程池初始化函数设置
+_worker_pacer = None
+
+def shard_for(stock_code, shard_count):
+    """按股票代码的稳定哈希计算所属分片，结果不受 PYTHONHASHSEED 影响，不同主机上一致"""
+    return zlib.crc32(str(stock_code).encode('utf-8')) % shard_count
+
+def _init_worker(interval, next_time, lock):
+    """进程池初始化函数，创建与其他工作进程共享时间表的请求节流器"""
+    global _worker_pacer
+    _worker_pacer = RequestPacer(interval, next_time, lock)
+
+def _run_shard(options):
+    """在工作进程中依次爬取一个分片内的所有股票，返回该分片的统计和下载清单"""
+    # 延迟导入，避免 processors 与 factory 之间的循环导入
+    from ..factory import CrawlerFactory
+    
+    stats = {}
+    manifest = []
+    # 分片内的股票共享请求合并器，联合公告的详情只请求一次
+    single_flight = SingleFlight()
+    # 启用耗时追踪时每个分片写自己的追踪文件，由协调者合并
+    tracer = Tracer(options['trace_file']) if options.get('trace_file') else None
+    for stock_code in options['stock_codes']:
+        # 每只股票使用自己的缓存目录（缓存、缓存索引和断点），分片数变化后股票换到别的分片仍能续爬
+        factory = CrawlerFactory(
+            config_file=options['config_file'],
+            download_dir=options['download_dir'],
+            cache_dir=options['cache_dirs'][stock_code],
+            stock_code=stock_code,
+            request_pacer=_worker_pacer,
+            single_flight=single_flight,
+            tracer=tracer
+        )
+        print(f"[分片 {options['shard_index']}] 开始爬取股票 {stock_code} 的公告...")
+        try:
+            factory.create_crawler().run(resume=options['resume'])
+        except Exception as e:
+            print(f"[分片 {options['shard_index']}] 爬取股票 {stock_code} 失败: {e}")
+            stats['failed_stocks'] = stats.get('failed_stocks', 0) + 1
+        factory.close()
+        processor = factory.announcement_processor
+        for key, value in processor.stats.items():
+            stats[key] = stats.get(key, 0) + value
+        manifest.extend(processor.manifest)
+    if tracer is not None:
+        tracer.close()
+    
+    result = {
+        'shard_index': options['shard_index'],
+        'shard_count': options['shard_count'],
+        'stock_codes': options['stock_codes'],
+        'stats': stats,
+        'manifest': manifest,
+        'trace_file': options.get('trace_file'),
+    }
+    # 分片结果写入共享目录，供跨主机运行时由协调者合并
+    Utils.atomic_write_json(options['result_file'], result)
+    return result
+
+class ShardCoordinator:
+    """分片协调类，负责按稳定哈希把股票分配到多个工作进程或多台主机，并合并统计和下载清单"""
+    
+    RESULT_DIRNAME = '.shards'
+    STOCK_DIRNAME = 'stocks'
+    
+    def __init__(self, config_file='config.json', shard_count=1, download_dir=None, cache_dir=None,
+                 workers=None, resume=False, tracer=None):
+        self.config_file = config_file
+        self.config_manager = ConfigManager(config_file)
+        self.shard_count = max(1, int(shard_count))
+        self.download_dir = download_dir or self.config_manager.download_dir
+        self.cache_dir = cache_dir or self.config_manager.cache_dir
+        self.workers = workers or min(self.shard_count, os.cpu_count() or 1)
+        self.resume = resume
+        # 耗时追踪，启用时各分片的追踪文件在运行结束后并入
+        self.tracer = tracer
+        self.result_dir = os.path.join(self.cache_dir, self.RESULT_DIRNAME)
+    
+    def plan(self):
+        """把配置中的股票分配到各个分片，返回 {分片序号: [股票代码]}"""
+        shards = {i: [] for i in range(self.shard_count)}
+        for stock_code in self.config_manager.stock_codes:
+            shards[shard_for(stock_code, self.shard_count)].append(stock_code)
+        return shards
+    
+    def stock_cache_dir(self, stock_code):
+        """每只股票使用独立的缓存目录，避免多个进程同时写同一个缓存索引
+        
+        目录只由股票代码决定，与分片数无关，改变 --shards 后缓存和断点仍然有效
+        """
+        return os.path.join(self.cache_dir, self.STOCK_DIRNAME, str(stock_code))
+    
+    def result_file(self, shard_index):
+        """分片结果文件路径"""
+        return os.path.join(self.result_dir, f"shard-{shard_index}-of-{self.shard_count}.json")
+    
+    def shard_trace_file(self, shard_index):
+        """分片工作进程的追踪文件路径，未启用耗时追踪时为None"""
+        if self.tracer is None or not self.tracer.trace_file:
+            return None
+        root, ext = os.path.splitext(self.tracer.trace_file)
+        return f"{root}.shard-{shard_index}{ext or '.json'}"
+    
+    def run(self, shard_indexes=None):
+        """在本机用多进程运行指定分片（默认全部分片），返回合并后的结果
+        
+        多台主机共享文件系统时，每台主机用 shard_indexes 只运行自己负责的分片，
+        全局请求速率需按主机数拆分配置
+        """
+        shards = self.plan()
+        if shard_indexes is None:
+            shard_indexes = list(range(self.shard_count))
+        if not os.path.exists(self.result_dir):
+            os.makedirs(self.result_dir, exist_ok=True)
+        
+        options_list = [{
+            'config_file': self.config_file,
+            'download_dir': self.download_dir,
+            'cache_dirs': {stock_code: self.stock_cache_dir(stock_code) for stock_code in shards[i]},
+            'shard_index': i,
+            'shard_count': self.shard_count,
+            'stock_codes': shards[i],
+            'resume': self.resume,
+            'result_file': self.result_file(i),
+            'trace_file': self.shard_trace_file(i),
+        } for i in shard_indexes if shards.get(i)]
+        if not options_list:
+            print("没有分配到股票的分片，无需运行")
+            return self.merge_results([])
+        
+        # 所有工作进程共享同一个请求时间表，未配置全局速率时按每个进程每秒1条计算
+        global_rate = self.config_manager.global_request_rate or len(options_list)
+        context = multiprocessing.get_context('spawn')
+        next_time = context.Value('d', 0.0)
+        lock = context.Lock()
+        processes = min(self.workers, len(options_list))
+        print(f"共 {len(options_list)} 个分片，使用 {processes} 个工作进程，全局请求速率 {global_rate} 条/秒")
+        with context.Pool(processes=processes, initializer=_init_worker,
+                          initargs=(1.0 / global_rate, next_time, lock)) as pool:
+            results = list(pool.imap_unordered(_run_shard, options_list))
+        for result in results:
+            trace_file = result.get('trace_file')
+            if trace_file and os.path.exists(trace_file):
+                self.tracer.merge(trace_file)
+                os.remove(trace_file)
+        return self.merge_results(results)
+    
+    def load_results(self):
+        """读取共享目录中已完成的分片结果，用于合并多台主机的运行结果"""
+        results = []
+        for shard_index in range(self.shard_count):
+            result_file = self.result_file(shard_index)
+            if not os.path.exists(result_file):
+                print(f"分片 {shard_index} 尚未完成")
+                continue
+            result = Utils.load_json_file(result_file)
+            if result:
+                results.append(result)
+        return results
+    
+    @staticmethod
+    def merge_results(results):
+        """合并各分片的统计和下载清单"""
+        stats = {}
+        manifest = []
+        for result in results:
+            for key, value in result.get('stats', {}).items():
+                stats[key] = stats.get(key, 0) + value
+            manifest.extend(result.get('manifest', []))
+        return {
+            'shards': sorted(result.get('shard_index') for result in results),
+            'stats': stats,
+            'manifest': manifest,
+        }
+    
+    @staticmethod
+    def write_manifest(manifest, manifest_file):
+        """把合并后的下载清单写成JSON Lines文件"""
+        with open(manifest_file, 'w', encoding='utf-8') as f:
+            for record in manifest:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
@@ -1,66 +1,274 @@
 import time
+import threading
+from ..core import Announcement
+from ..utils import Tracer
 
 class StockCrawler:
     """爬虫主类，负责协调各个组件完成爬虫任务"""
     
-    def __init__(self, config_manager, cache_manager, http_client, announcement_processor):
+    BASE_URL = "https://np-anotice-stock.eastmoney.com/api/security/ann"
+    PAGE_SIZE = 50
+    
+    def __init__(self, config_manager, cache_manager, http_client, announcement_processor,
+                 download_scheduler=None, checkpoint_manager=None, stock_code=None, request_pacer=None,
+                 catalog=None, tracer=None):
         self.config_manager = config_manager
         self.cache_manager = cache_manager
         self.http_client = http_client
         self.announcement_processor = announcement_processor
+        self.download_scheduler = download_scheduler
+        self.checkpoint_manager = checkpoint_manager
+        self.stock_code = stock_code or config_manager.stock_code
+        # 请求节流器，未提供时每条公告之间固定等待1秒
+        self.request_pacer = request_pacer
+        # 本地公告目录，用于跳过已下载或没有附件的公告
+        self.catalog = catalog
+        # 耗时追踪，未启用时不记录
+        self.tracer = tracer or Tracer(enabled=False)
+        self._checkpoint = None
+        # 本次运行中处理失败（获取详情或下载失败）的公告 art_code，下载可能在多个线程中进行，更新时加锁
+        self.failed_art_codes = set()
+        self._failed_lock = threading.Lock()
     
-    def run(self):
-        """运行爬虫"""
-        # 程序启动时清理过期缓存
+    def run(self, resume=False):
+        """运行爬虫，resume 为 True 时从上次中断的断点继续"""
+        # 程序启动时清理过期缓存，离线模式下保留全部缓存
         print(f"缓存过期天数设置: {self.config_manager.cache_expire_days}天")
-        self.cache_manager.clean_expired_cache()
+        if self.http_client.offline:
+            print("离线模式: 只使用缓存数据，不发起网络请求")
+        else:
+            self.cache_manager.clean_expired_cache()
         
-        base_url = "https://np-anotice-stock.eastmoney.com/api/security/ann"
-        stock_code = self.config_manager.stock_code
-        page_size = 50
-        page_index = 1
-        total_hits = 0
-        f_node = self.config_manager.f_node
-        s_node = self.config_manager.s_node
+        # 离线重放不记录断点
+        self._checkpoint = None if self.http_client.offline else self.checkpoint_manager
+        start_position = self._prepare_checkpoint(resume)
+        self.failed_art_codes = set()
         
-        while True:
-            timestamp = self.http_client.generate_timestamp()
-            cb_param = f"jQuery1123{timestamp[:10]}_{timestamp}"
-            
-            params = {
-                'cb': cb_param,
-                'sr': '-1',
-                'page_size': page_size,
-                'page_index': page_index,
-                'ann_type': 'A',
-                'client_source': 'web',
-                'stock_list': stock_code,
-                'f_node': f_node,
-                's_node': s_node,
-                '_': timestamp
-            }
-            
-            url = f"{base_url}?{'&'.join([f'{k}={v}' for k, v in params.items()])}"
-            print(f"Fetching page {page_index}...")
-            
-            data = self.http_client.get_jsonp_response(url)
-            if not data or data.get('success') != 1:
-                print("Failed to get announcement list")
-                break
-                
-            total_hits = data.get('data', {}).get('total_hits', 0)
-            announcements = data.get('data', {}).get('list', [])
-            
-            if not announcements:
-                print("No more announcements")
-                break
-                
-            for item in announcements:
-                self.announcement_processor.process_announcement(item)
+        # 配置了调度策略时下载线程与列表页、详情的获取同时进行，任务按策略排序后下载
+        schedule = self._start_schedule()
+        finished = crawled = False
+        try:
+            finished = self._crawl_pages(schedule, start_position)
+            crawled = True
+        finally:
+            if schedule:
+                # 异常退出时丢弃尚未开始的下载，断点中这些公告未完成，--resume 时重新处理
+                count = schedule.close(cancel=not crawled)
+                print(f"共 {count} 个PDF加入下载调度")
+            self.cache_manager.flush_index()
+        if finished and self.failed_art_codes and self._checkpoint:
+            print(f"有 {len(self.failed_art_codes)} 条公告处理失败，保留断点，可使用 --resume 重试")
+        elif finished and self._checkpoint:
+            self._checkpoint.clear()
+        
+        if self.http_client.offline and self.http_client.missing_urls:
+            print(f"离线模式下共有 {len(self.http_client.missing_urls)} 个请求缓存缺失")
+        single_flight = self.http_client.single_flight
+        if single_flight.duplicates_avoided:
+            print(f"请求合并: 实际请求 {single_flight.stats['executed']} 次，合并并发请求 "
+                  f"{single_flight.stats['coalesced']} 次，复用最近结果 {single_flight.stats['reused']} 次")
+    
+    def run_planned(self, announcements):
+        """执行抓取计划: 不再获取列表页，直接处理计划中的公告（Announcement 列表）
+        
+        计划生成后才完成的公告按公告目录跳过；不记录断点，中断后重新执行同一计划即可
+        """
+        schedule = self._start_schedule()
+        finished = False
+        try:
+            for announcement in announcements:
+                if self.is_done(announcement):
+                    continue
+                _, task = self.announcement_processor.prepare_download(announcement)
+                if task and schedule:
+                    schedule.submit(task)
+                elif task:
+                    self._download(task)
+                if not self.http_client.offline:
+                    self._pace()
+            finished = True
+        finally:
+            if schedule:
+                schedule.close(cancel=not finished)
+            self.cache_manager.flush_index()
+    
+    def _start_schedule(self):
+        """配置了调度策略（非按列表顺序单线程下载）时启动下载线程，返回调度运行，否则返回None"""
+        if self.download_scheduler is None or self.download_scheduler.is_sequential:
+            return None
+        scheduler = self.download_scheduler
+        print(f"下载调度策略: {scheduler.policy}，{scheduler.workers} 个下载线程")
+        return scheduler.start(self._download)
+    
+    def _pace(self):
+        """两条公告之间等待，避免被封"""
+        with self.tracer.span('pace'):
+            if self.request_pacer:
+                self.request_pacer.wait()
+            else:
                 time.sleep(1) # 添加延迟避免被封 
+    
+    def _prepare_checkpoint(self, resume):
+        """加载或重置断点，返回开始处理的 (页码, 页内序号)"""
+        checkpoint = self._checkpoint
+        if checkpoint is None:
+            return 1, 0
+        if resume and checkpoint.load():
+            print(f"从断点继续: 第{checkpoint.page_index}页第{checkpoint.item_index + 1}条，"
+                  f"已完成 {len(checkpoint.completed)} 条公告")
+            # 清理上次中断时未下载完成的临时文件
+            for filename in checkpoint.in_flight.values():
+                self.announcement_processor.pdf_downloader.remove_partial(filename)
+            checkpoint.in_flight.clear()
+            checkpoint.save()
+            return checkpoint.page_index, checkpoint.item_index
+        checkpoint.clear()
+        return 1, 0
+    
+    def _download(self, task, position=None):
+        """执行下载任务并记录断点，下载失败时不推进断点位置"""
+        checkpoint = self._checkpoint
+        if checkpoint:
+            checkpoint.start_download(task.art_code, task.filename)
+        success = self.announcement_processor.execute_download(task)
+        if not success:
+            self._record_failure(task.art_code)
+        if checkpoint:
+            checkpoint.finish_item(task.art_code, success, position if success else None)
+        return success
+    
+    def _record_failure(self, art_code):
+        """记录一条处理失败的公告"""
+        with self._failed_lock:
+            self.failed_art_codes.add(art_code)
+    
+    def is_done(self, announcement):
+        """根据公告目录判断公告是否无需再处理: 没有附件，或已下载且文件仍在存储中
+        
+        目录中尚无下载记录的公告还会与导入的PDF按文件名匹配
+        """
+        art_code = announcement.art_code
+        if self.catalog is None or not art_code:
+            return False
+        entry = self.catalog.get(art_code)
+        if entry is not None:
+            if entry['status'] == self.catalog.STATUS_NO_ATTACHMENT:
+                return True
+            if (entry['status'] == self.catalog.STATUS_DOWNLOADED
+                    and bool(entry['filename'])
+                    and self.announcement_processor.storage.exists(entry['filename'])):
+                return True
+        return self.announcement_processor.match_imported(announcement)
+    
+    def build_list_url(self, page_index):
+        """构建公告列表接口的请求URL"""
+        timestamp = self.http_client.generate_timestamp()
+        cb_param = f"jQuery1123{timestamp[:10]}_{timestamp}"
+        
+        params = {
+            'cb': cb_param,
+            'sr': '-1',
+            'page_size': self.PAGE_SIZE,
+            'page_index': page_index,
+            'ann_type': 'A',
+            'client_source': 'web',
+            'stock_list': self.stock_code,
+            'f_node': self.config_manager.f_node,
+            's_node': self.config_manager.s_node,
+            '_': timestamp
+        }
+        
+        return f"{self.BASE_URL}?{'&'.join([f'{k}={v}' for k, v in params.items()])}"
+    
+    def fetch_page(self, page_index, refresh=False):
+        """获取一页公告列表，失败时返回None，成功时返回 (Announcement 列表, 公告总数)；refresh 为 True 时不使用缓存"""
+        url = self.build_list_url(page_index)
+        print(f"Fetching page {page_index}...")
+        
+        with self.tracer.span('list_page', stock_code=self.stock_code, page=page_index):
+            data = self.http_client.get_jsonp_response(url, refresh=refresh)
+        if not data or data.get('success') != 1:
+            print("Failed to get announcement list")
+            return None
+        
+        page_data = data.get('data') or {}
+        announcements = [Announcement.from_list_item(item) for item in page_data.get('list') or []]
+        return announcements, page_data.get('total_hits', 0)
+    
+    def iter_pages(self, start_page=1, failed_pages=None):
+        """从 start_page 开始逐页产出 (页码, 公告列表)，调用方处理完一页后才获取下一页
+        
+        内存中只保留当前页；重试后仍失败的页记录到 failed_pages 后跳过，第一页就失败时无法得知总页数，直接结束
+        """
+        page_index = start_page
+        total_hits = None
+        while True:
+            page = self.fetch_page(page_index)
+            if page is None:
+                if failed_pages is not None:
+                    failed_pages.append(page_index)
+                if total_hits is None:
+                    return
+                print(f"第{page_index}页获取失败，跳过")
+            else:
+                announcements, total_hits = page
+                if not announcements:
+                    print("No more announcements")
+                    return
+                yield page_index, announcements
             
             # 检查是否还有下一页
-            if page_index * page_size >= total_hits:
-                break
-                
-            page_index += 1
\ No newline at end of file
+            if page_index * self.PAGE_SIZE >= total_hits:
+                return
+            page_index += 1
+    
+    def _crawl_pages(self, schedule=None, start_position=(1, 0)):
+        """逐页获取公告列表并处理每条公告，传入 schedule 时把下载任务交给调度线程，不在当前线程下载
+        
+        返回是否完整遍历了所有页面
+        """
+        checkpoint = self._checkpoint
+        start_page, start_item = start_position
+        # 调度模式下任务由其他线程乱序下载，断点只记录已完成的公告，不记录列表位置
+        track_position = schedule is None
+        failed_pages = []
+        for page_index, announcements in self.iter_pages(start_page, failed_pages):
+            if failed_pages:
+                # 之前有页面失败，断点位置停留在失败页，--resume 时会重新获取
+                track_position = False
+            if self.catalog is not None:
+                self.catalog.record_listed(announcements)
+            
+            first_item = start_item if page_index == start_page else 0
+            for item_index in range(first_item, len(announcements)):
+                announcement = announcements[item_index]
+                art_code = announcement.art_code
+                if checkpoint and checkpoint.is_completed(art_code):
+                    continue
+                position = (page_index, item_index + 1) if track_position else None
+                if self.is_done(announcement):
+                    # 公告目录显示已处理过，不再请求详情
+                    if checkpoint:
+                        checkpoint.finish_item(art_code, True, position)
+                    continue
+                ok, task = self.announcement_processor.prepare_download(announcement)
+                if not ok:
+                    # 获取详情失败: 不计入已完成，断点位置停留在这条公告，--resume 时重新处理
+                    self._record_failure(art_code)
+                    track_position = False
+                    if checkpoint:
+                        checkpoint.finish_item(art_code, False)
+                elif schedule and task:
+                    schedule.submit(task)
+                elif task:
+                    if not self._download(task, position):
+                        track_position = False
+                elif checkpoint:
+                    checkpoint.finish_item(art_code, True, position)
+                if not self.http_client.offline:
+                    self._pace()
+        
+        if failed_pages:
+            print(f"以下页面获取失败: {failed_pages}")
+            return False
+        return True
\ No newline at end of file
@@ -0,0 +1,158 @@
+import os
+import time
+import heapq
+import random
+from ..core import ConfigManager
+from ..downloaders import RequestPacer, SingleFlight
+from ..utils import Utils
+
+class StockWatcher:
+    """监视模式，常驻进程按计划轮询每只股票的第一页公告列表，发现新公告时才进入处理
+    
+    各股票的工厂实例、缓存索引和网络连接在轮询之间保持不变；每只股票记录上次看到的第一页
+    art_code 作为高水位，轮询时第一页不使用缓存，只处理高水位之外的新公告
+    """
+    
+    STATE_FILENAME = '.watch_state.json'
+    
+    def __init__(self, config_file='config.json', download_dir=None, cache_dir=None,
+                 interval=None, jitter=None, stock_codes=None, tracer=None):
+        self.config_file = config_file
+        self.config_manager = ConfigManager(config_file)
+        self.download_dir = download_dir
+        self.cache_dir = cache_dir or self.config_manager.cache_dir
+        self.interval = interval or self.config_manager.watch_interval
+        self.jitter = self.config_manager.watch_jitter if jitter is None else jitter
+        self.stock_codes = stock_codes or self.config_manager.stock_codes
+        self.request_pacer = RequestPacer(1.0)
+        self.http_session = None
+        self.single_flight = SingleFlight()
+        # 耗时追踪，传给各股票的工厂，None表示不记录
+        self.tracer = tracer
+        # 创建所有股票共享组件（缓存索引、公告目录、全文索引、存储后端）的工厂，关闭时最后关闭
+        self.shared_factory = None
+        self.shared = {}
+        self.factories = {}
+        self.state_file = os.path.join(self.cache_dir, self.STATE_FILENAME)
+        self.high_water = self._load_state()
+    
+    def _load_state(self):
+        """加载各股票的高水位，返回 {股票代码: set(art_code)}"""
+        state = Utils.load_json_file(self.state_file) if os.path.exists(self.state_file) else None
+        return {stock_code: set(art_codes) for stock_code, art_codes in (state or {}).items()}
+    
+    def _save_state(self):
+        """保存各股票的高水位"""
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir, exist_ok=True)
+        Utils.atomic_write_json(self.state_file, {
+            stock_code: sorted(art_codes) for stock_code, art_codes in self.high_water.items()
+        })
+    
+    def _factory(self, stock_code):
+        """按股票代码复用工厂实例，所有股票共享一个请求节流器、请求合并器、缓存索引、公告目录、
+        全文索引进程池、存储后端和连接池"""
+        # 延迟导入，避免 processors 与 factory 之间的循环导入
+        from ..factory import CrawlerFactory
+        
+        if self.http_session is None:
+            import requests
+            self.http_session = requests.Session()
+        if self.shared_factory is None:
+            self.shared_factory = CrawlerFactory(
+                config_file=self.config_file,
+                download_dir=self.download_dir,
+                cache_dir=self.cache_dir,
+                stock_code=stock_code
+            )
+            self.shared = self.shared_factory.shared_components()
+        if stock_code not in self.factories:
+            self.factories[stock_code] = CrawlerFactory(
+                config_file=self.config_file,
+                download_dir=self.download_dir,
+                cache_dir=self.cache_dir,
+                stock_code=stock_code,
+                request_pacer=self.request_pacer,
+                http_session=self.http_session,
+                single_flight=self.single_flight,
+                tracer=self.tracer,
+                **self.shared
+            )
+        return self.factories[stock_code]
+    
+    def next_delay(self):
+        """下一次轮询的间隔，在 interval 基础上随机抖动 ±jitter 比例"""
+        return self.interval * (1 + random.uniform(-self.jitter, self.jitter))
+    
+    def poll(self, stock_code):
+        """轮询一只股票，返回本次处理的新公告数"""
+        factory = self._factory(stock_code)
+        crawler = factory.stock_crawler
+        # 两次轮询之间下载目录可能被外部修改，重新扫描
+        factory.storage.clear()
+        self.request_pacer.wait()
+        page = crawler.fetch_page(1, refresh=True)
+        if page is None:
+            return 0
+        announcements, _ = page
+        art_codes = {a.art_code for a in announcements if a.art_code}
+        known = self.high_water.get(stock_code)
+        new_items = [a for a in announcements if a.art_code and a.art_code not in (known or ())]
+        
+        if known is None or (new_items and len(new_items) == len(announcements)):
+            # 首次监视或整页都是新公告（第二页可能还有），完整爬取一次
+            print(f"[监视] 股票 {stock_code} 完整爬取...")
+            crawler.run()
+            # 处理失败的公告不计入高水位，下次轮询重试
+            art_codes -= crawler.failed_art_codes
+        else:
+            for announcement in new_items:
+                print(f"[监视] 股票 {stock_code} 发现新公告: {announcement.title or announcement.art_code}")
+                if not factory.announcement_processor.process_announcement(announcement):
+                    # 处理失败的公告不计入高水位，下次轮询重试
+                    art_codes.discard(announcement.art_code)
+                self.request_pacer.wait()
+            factory.cache_manager.flush_index()
+        
+        self.high_water[stock_code] = art_codes
+        self._save_state()
+        return len(new_items)
+    
+    def run(self, max_polls=None):
+        """按计划循环轮询所有股票，Ctrl+C 或达到 max_polls 时退出，返回轮询次数"""
+        # 启动时所有股票立即轮询一次，之后各自按抖动后的间隔排程
+        now = time.time()
+        schedule = [(now, stock_code) for stock_code in self.stock_codes]
+        heapq.heapify(schedule)
+        print(f"[监视] 共 {len(self.stock_codes)} 只股票，轮询间隔约 {self.interval} 秒 (抖动 ±{self.jitter:.0%})")
+        polls = 0
+        try:
+            while schedule and (max_polls is None or polls < max_polls):
+                due, stock_code = heapq.heappop(schedule)
+                wait = due - time.time()
+                if wait > 0:
+                    time.sleep(wait)
+                try:
+                    self.poll(stock_code)
+                except Exception as e:
+                    print(f"[监视] 轮询股票 {stock_code} 失败: {e}")
+                polls += 1
+                heapq.heappush(schedule, (time.time() + self.next_delay(), stock_code))
+        except KeyboardInterrupt:
+            print("[监视] 收到中断信号，退出监视模式")
+        finally:
+            self.close()
+        return polls
+    
+    def close(self):
+        """释放所有工厂实例和连接"""
+        for factory in self.factories.values():
+            factory.close()
+        self.factories.clear()
+        if self.shared_factory is not None:
+            self.shared_factory.close()
+            self.shared_factory = None
+            self.shared = {}
+        if self.http_session is not None:
+            self.http_session.close()
+            self.http_session = None
@@ -0,0 +1,70 @@
+def extract_pdf_text(filename):
+    """逐页提取PDF正文，需要安装可选依赖 pypdf"""
+    from pypdf import PdfReader
+    
+    reader = PdfReader(filename)
+    parts = []
+    for page in reader.pages:
+        text = page.extract_text() or ''
+        if text:
+            parts.append(text)
+    return '\n'.join(parts)
+
+class TextIndexer:
+    """全文索引流水线，PDF下载完成后立即交给进程池提取正文并写入全文索引，不阻塞下载"""
+    
+    def __init__(self, text_index, workers=2):
+        self.text_index = text_index
+        self.workers = workers
+        self.executor = None
+        self.enabled = self._check_dependency()
+        self.stats = {'indexed': 0, 'failed': 0}
+    
+    @staticmethod
+    def _check_dependency():
+        """检查PDF解析依赖是否已安装"""
+        try:
+            import pypdf  # noqa: F401
+            return True
+        except ImportError:
+            print("未安装 pypdf，PDF全文索引已停用 (pip install stock-crawler[text])")
+            return False
+    
+    def submit(self, record):
+        """提交一个已下载完成的PDF，record 为下载清单中的一条记录"""
+        if not self.enabled:
+            return
+        # 进程池相关模块导入较慢，只在确实需要提取正文时导入
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        
+        if multiprocessing.current_process().daemon:
+            # 分片工作进程是守护进程，不能再创建子进程，改为在当前进程内提取
+            try:
+                self.text_index.add_document(record, extract_pdf_text(record['filename']))
+                self.stats['indexed'] += 1
+            except Exception as e:
+                self.stats['failed'] += 1
+                print(f"提取PDF正文失败 {record['filename']}: {e}")
+            return
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        future = self.executor.submit(extract_pdf_text, record['filename'])
+        future.add_done_callback(lambda f: self._on_done(f, record))
+    
+    def _on_done(self, future, record):
+        """提取完成后写入全文索引（回调在进程池的管理线程中执行）"""
+        try:
+            self.text_index.add_document(record, future.result())
+            self.stats['indexed'] += 1
+        except Exception as e:
+            self.stats['failed'] += 1
+            print(f"提取PDF正文失败 {record['filename']}: {e}")
+    
+    def close(self):
+        """等待所有提取任务完成并关闭进程池"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+        if self.stats['indexed'] or self.stats['failed']:
+            print(f"全文索引: 成功 {self.stats['indexed']} 个，失败 {self.stats['failed']} 个")
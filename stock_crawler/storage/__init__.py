@@ -0,0 +1,13 @@
+"""
+存储模块 - 包含PDF文件的本地存储和对象存储
+"""
+
+from .._lazy import lazy_module
+
+# 类名到所在子模块的映射，首次访问时才导入对应子模块，避免 import 时加载全部依赖
+_LAZY_IMPORTS = {
+    'LocalStorage': '.local_storage',
+    'S3Storage': '.s3_storage'
+}
+
+__all__, __getattr__, __dir__ = lazy_module(__name__, _LAZY_IMPORTS)
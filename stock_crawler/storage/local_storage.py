@@ -0,0 +1,90 @@
+import os
+
+class _PartFileWriter:
+    """写入本地临时文件，提交时原子替换为正式文件"""
+    
+    def __init__(self, storage, filename):
+        self.storage = storage
+        self.filename = filename
+        self.part_file = filename + storage.PART_SUFFIX
+        self.size = 0
+        self._file = open(self.part_file, 'wb')
+    
+    def write(self, chunk):
+        """写入一段内容"""
+        self._file.write(chunk)
+        self.size += len(chunk)
+    
+    def commit(self):
+        """完成写入，替换为正式文件"""
+        self._file.close()
+        os.replace(self.part_file, self.filename)
+        self.storage.added(self.filename, self.size)
+    
+    def abort(self):
+        """放弃写入，删除临时文件"""
+        self._file.close()
+        self.storage.remove_partial(self.filename)
+
+class LocalStorage:
+    """本地文件系统存储，PDF按下载目录中的路径保存，与引入存储后端之前的行为一致
+    
+    存在性和大小的检查通过 FileIndex 按目录批量扫描（未提供时直接访问文件系统）；
+    写入先落到 .part 临时文件，校验完整后才原子替换为正式文件
+    """
+    
+    # 下载中的文件先写到带此后缀的临时文件
+    PART_SUFFIX = '.part'
+    is_local = True
+    
+    def __init__(self, file_index=None):
+        self.file_index = file_index
+    
+    def _indexed(self, path):
+        """路径是否由下载目录索引负责"""
+        return self.file_index is not None and self.file_index.covers(path)
+    
+    def exists(self, path):
+        """文件是否存在"""
+        if self._indexed(path):
+            return self.file_index.exists(path)
+        return os.path.exists(path)
+    
+    def getsize(self, path):
+        """文件大小（字节），文件不存在时返回None"""
+        if self._indexed(path):
+            return self.file_index.getsize(path)
+        try:
+            return os.path.getsize(path)
+        except FileNotFoundError:
+            return None
+    
+    def makedirs(self, directory):
+        """创建目录（含上级目录）"""
+        if self._indexed(directory):
+            self.file_index.makedirs(directory)
+        elif not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+    
+    def open_writer(self, path):
+        """打开写入器，依次调用 write、commit（或 abort）完成写入"""
+        return _PartFileWriter(self, path)
+    
+    def added(self, path, size):
+        """登记写入完成的文件"""
+        if self._indexed(path):
+            self.file_index.add(path, size)
+    
+    def remove_partial(self, path):
+        """删除未完成写入留下的临时文件"""
+        part_file = path + self.PART_SUFFIX
+        try:
+            if os.path.exists(part_file):
+                os.remove(part_file)
+        except Exception as e:
+            print(f"删除未完成的下载文件失败 {part_file}: {e}")
+    
+    def clear(self):
+        """丢弃已扫描的目录列表，长时间运行的进程定期调用以感知外部的文件变化"""
+        if self.file_index is not None:
+            self.file_index.clear()
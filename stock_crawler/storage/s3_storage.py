@@ -0,0 +1,167 @@
+import os
+import threading
+
+class _MultipartWriter:
+    """流式上传到对象存储: 内容累计到分片大小就上传一个分片，不在本地磁盘暂存
+    
+    整个文件不足一个分片时提交时用一次 PutObject 上传；放弃写入时中止分片上传，已上传的分片随之删除
+    """
+    
+    def __init__(self, storage, filename):
+        self.storage = storage
+        self.filename = filename
+        self.key = storage.key_for(filename)
+        self.size = 0
+        self._buffer = bytearray()
+        self._upload_id = None
+        self._parts = []
+    
+    def write(self, chunk):
+        """写入一段内容，缓冲区达到分片大小时上传"""
+        self._buffer += chunk
+        self.size += len(chunk)
+        if len(self._buffer) >= self.storage.part_size:
+            self._upload_part()
+    
+    def _upload_part(self):
+        """上传缓冲区中的内容作为下一个分片"""
+        storage = self.storage
+        if self._upload_id is None:
+            response = storage.client.create_multipart_upload(
+                Bucket=storage.bucket, Key=self.key, ContentType='application/pdf'
+            )
+            self._upload_id = response['UploadId']
+        part_number = len(self._parts) + 1
+        response = storage.client.upload_part(
+            Bucket=storage.bucket, Key=self.key, UploadId=self._upload_id,
+            PartNumber=part_number, Body=bytes(self._buffer)
+        )
+        self._parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
+        self._buffer = bytearray()
+    
+    def commit(self):
+        """完成上传"""
+        storage = self.storage
+        if self._upload_id is None:
+            storage.client.put_object(Bucket=storage.bucket, Key=self.key, Body=bytes(self._buffer),
+                                      ContentType='application/pdf')
+        else:
+            if self._buffer:
+                self._upload_part()
+            storage.client.complete_multipart_upload(
+                Bucket=storage.bucket, Key=self.key, UploadId=self._upload_id,
+                MultipartUpload={'Parts': self._parts}
+            )
+        self._buffer = bytearray()
+        storage.added(self.filename, self.size)
+    
+    def abort(self):
+        """放弃上传"""
+        self._buffer = bytearray()
+        if self._upload_id is None:
+            return
+        try:
+            self.storage.client.abort_multipart_upload(Bucket=self.storage.bucket, Key=self.key,
+                                                       UploadId=self._upload_id)
+        except Exception as e:
+            print(f"中止分片上传失败 {self.key}: {e}")
+
+class S3Storage:
+    """S3 兼容对象存储（AWS S3、MinIO 等），PDF直接流式上传，不在本地磁盘暂存，需要安装可选依赖 boto3
+    
+    对象键为 {prefix}{相对下载目录的路径}，与本地存储的目录结构一致。存在性和大小的检查按“目录”前缀
+    一次 ListObjectsV2 批量获取并缓存，不逐个文件发起 HEAD 请求
+    """
+    
+    is_local = False
+    
+    def __init__(self, root, bucket, prefix='', client=None, endpoint_url=None, region=None, part_size_mb=8):
+        self.root = os.path.abspath(root)
+        self.bucket = bucket
+        self.prefix = prefix.strip('/') + '/' if prefix.strip('/') else ''
+        # S3 要求除最后一个分片外每个分片不小于5MB
+        self.part_size = max(5, part_size_mb) * 1024 * 1024
+        self.endpoint_url = endpoint_url
+        self.region = region
+        self._client = client
+        self.lock = threading.Lock()
+        # 键前缀（以/结尾）-> {对象名: 大小}
+        self.dirs = {}
+    
+    @property
+    def client(self):
+        """获取 S3 客户端（懒加载），endpoint_url 可指向 MinIO 等兼容服务"""
+        if self._client is None:
+            try:
+                import boto3
+            except ImportError:
+                raise RuntimeError("使用对象存储需要安装 boto3 (pip install stock-crawler[s3])")
+            self._client = boto3.client('s3', endpoint_url=self.endpoint_url, region_name=self.region)
+        return self._client
+    
+    def key_for(self, path):
+        """下载目录中的路径对应的对象键"""
+        relative = os.path.relpath(os.path.abspath(path), self.root)
+        if relative == os.curdir:
+            return self.prefix
+        if relative.startswith(os.pardir):
+            raise ValueError(f"路径不在下载目录中: {path}")
+        return self.prefix + relative.replace(os.sep, '/')
+    
+    def _split(self, path):
+        """把路径拆分为 (键前缀, 对象名)"""
+        key = self.key_for(path)
+        directory, _, name = key.rpartition('/')
+        return (directory + '/' if directory else ''), name
+    
+    def _listing(self, key_prefix):
+        """获取前缀下的对象列表，首次访问时分页列出，调用方需持有锁"""
+        if key_prefix not in self.dirs:
+            listing = {}
+            paginator = self.client.get_paginator('list_objects_v2')
+            for page in paginator.paginate(Bucket=self.bucket, Prefix=key_prefix, Delimiter='/'):
+                for obj in page.get('Contents', ()):
+                    listing[obj['Key'][len(key_prefix):]] = obj['Size']
+            self.dirs[key_prefix] = listing
+        return self.dirs[key_prefix]
+    
+    def exists(self, path):
+        """对象是否存在"""
+        return self.getsize(path) is not None
+    
+    def getsize(self, path):
+        """对象大小（字节），不存在时返回None"""
+        key_prefix, name = self._split(path)
+        with self.lock:
+            return self._listing(key_prefix).get(name)
+    
+    def makedirs(self, directory):
+        """对象存储没有目录，无需创建"""
+    
+    def open_writer(self, path):
+        """打开写入器，依次调用 write、commit（或 abort）完成上传"""
+        return _MultipartWriter(self, path)
+    
+    def added(self, path, size):
+        """登记上传完成的对象"""
+        key_prefix, name = self._split(path)
+        with self.lock:
+            listing = self.dirs.get(key_prefix)
+            if listing is not None:
+                listing[name] = size
+    
+    def remove_partial(self, path):
+        """中止该对象未完成的分片上传（如上次运行中断时留下的）"""
+        key = self.key_for(path)
+        try:
+            response = self.client.list_multipart_uploads(Bucket=self.bucket, Prefix=key)
+            for upload in response.get('Uploads', ()):
+                if upload['Key'] == key:
+                    self.client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload['UploadId'])
+        except Exception as e:
+            print(f"中止未完成的分片上传失败 {key}: {e}")
+    
+    def clear(self):
+        """丢弃已获取的对象列表，长时间运行的进程定期调用以感知外部的变化"""
+        with self.lock:
+            self.dirs.clear()
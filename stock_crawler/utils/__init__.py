@@ -3,5 +3,7 @@
 """
 
 from .utils import Utils
+from .tracer import Tracer
+from .naming import FileNaming
 
-__all__ = ['Utils'] 
\ No newline at end of file
+__all__ = ['Utils', 'Tracer', 'FileNaming'] 
\ No newline at end of file
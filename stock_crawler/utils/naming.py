@@ -0,0 +1,108 @@
+import os
+import re
+import threading
+
+class FileNaming:
+    """PDF文件命名，集中处理标题清理、日期提取、长度限制和重名
+    
+    文件名格式为 {日期YYYYMMDD}_{前缀}{标题}.pdf，标题不含特殊字符；超出长度上限时截断标题并追加 art_code，
+    同一路径已属于另一条公告时同样追加 art_code，避免不同公告互相覆盖；没有公告目录时根据存储中的已有文件判断
+    """
+    
+    # 文件名的字节数上限: 多数文件系统为255，减去下载临时文件的 .part 后缀
+    MAX_FILENAME_BYTES = 250
+    # 标题中需要去除的字符（中文、字母、数字以外），连续的一段一次替换
+    TITLE_PATTERN = re.compile(r'[^\u4e00-\u9fa5a-zA-Z0-9]+')
+    # Windows 和常见文件系统不允许出现在文件名中的字符及控制字符，替换为下划线
+    UNSAFE_PATTERN = re.compile(r'[<>:"/\\|?*\x00-\x1f]')
+    DATE_PATTERN = re.compile(r'(\d{4})-(\d{2})-(\d{2})')
+    
+    def __init__(self, catalog=None, storage=None):
+        self.catalog = catalog
+        # 没有公告目录时，用存储后端检查路径上是否已有之前运行下载的文件
+        self.storage = storage
+        self.lock = threading.Lock()
+        # 本次运行中已占用的路径 -> art_code
+        self._owners = {}
+    
+    @classmethod
+    def clean_title(cls, title):
+        """去除标题中的特殊字符，只保留中文、数字、字母"""
+        return cls.TITLE_PATTERN.sub('', title)
+    
+    @classmethod
+    def safe_component(cls, name):
+        """生成安全的路径组成部分，替换不允许的字符并去除首尾空格和点"""
+        return cls.UNSAFE_PATTERN.sub('_', name).strip('. ')
+    
+    @classmethod
+    def compact_date(cls, notice_date):
+        """提取年月日数字，格式：2018-01-18 00:00:00 -> 20180118，无法识别时返回空字符串"""
+        head = notice_date[:10]
+        if len(head) == 10 and head[4] == '-' and head[7] == '-':
+            day = head[:4] + head[5:7] + head[8:]
+            if day.isdigit():
+                return day
+        match = cls.DATE_PATTERN.search(notice_date)
+        return ''.join(match.groups()) if match else ''
+    
+    @staticmethod
+    def _truncate(text, max_bytes):
+        """按 UTF-8 字节数截断文本，不截断半个字符"""
+        encoded = text.encode('utf-8')
+        if len(encoded) <= max_bytes:
+            return text
+        return encoded[:max(0, max_bytes)].decode('utf-8', 'ignore')
+    
+    @classmethod
+    def pdf_filename(cls, stock_code, short_name, notice_title, notice_date, art_code=None):
+        """构建PDF文件名，超出长度上限时截断标题，并在提供 art_code 时追加以区分截断后相同的标题"""
+        title = cls.clean_title(notice_title)
+        filename_prefix = ''
+        if stock_code and stock_code not in title:
+            filename_prefix += stock_code
+        if short_name and short_name not in title:
+            filename_prefix += short_name
+        head = f"{cls.compact_date(notice_date or '')}_{filename_prefix}"
+        filename = f"{head}{title}.pdf"
+        if len(filename.encode('utf-8')) <= cls.MAX_FILENAME_BYTES:
+            return filename
+        suffix = f"_{art_code}.pdf" if art_code else '.pdf'
+        budget = cls.MAX_FILENAME_BYTES - len(head.encode('utf-8')) - len(suffix.encode('utf-8'))
+        return head + cls._truncate(title, budget) + suffix
+    
+    @classmethod
+    def with_art_code(cls, filename, art_code):
+        """在文件名（不含扩展名）后追加 art_code，必要时截断以满足长度上限"""
+        folder, basename = os.path.split(filename)
+        stem, ext = os.path.splitext(basename)
+        suffix = f"_{art_code}{ext}"
+        stem = cls._truncate(stem, cls.MAX_FILENAME_BYTES - len(suffix.encode('utf-8')))
+        return os.path.join(folder, stem + suffix)
+    
+    def claim(self, filename, art_code, is_own_file=None):
+        """为公告占用保存路径，路径已属于另一条公告（本次运行或公告目录中）时追加 art_code，返回最终路径
+        
+        没有公告目录时无法得知已有文件属于哪条公告，路径上已有文件且 is_own_file(路径) 判断不是本公告的文件时
+        同样追加 art_code
+        """
+        if not art_code:
+            return filename
+        with self.lock:
+            owner = self._owners.get(filename)
+            if owner is None and self.catalog is not None:
+                owner = self.catalog.filename_owner(filename, exclude=art_code)
+            if owner is not None and owner != art_code:
+                print(f"文件名与公告 {owner} 重复，追加 art_code: {os.path.basename(filename)}")
+                filename = self.with_art_code(filename, art_code)
+            elif owner is None and self._taken_on_disk(filename, is_own_file):
+                print(f"文件名与已有文件重复，追加 art_code: {os.path.basename(filename)}")
+                filename = self.with_art_code(filename, art_code)
+            self._owners[filename] = art_code
+            return filename
+    
+    def _taken_on_disk(self, filename, is_own_file):
+        """没有公告目录时，判断路径上是否已有属于其他公告的文件"""
+        if self.catalog is not None or self.storage is None or is_own_file is None:
+            return False
+        return self.storage.exists(filename) and not is_own_file(filename)
@@ -0,0 +1,106 @@
+import os
+import json
+import time
+import heapq
+import threading
+from contextlib import contextmanager
+
+class Tracer:
+    """耗时追踪类，记录每个环节的耗时，线程安全
+    
+    启用后每个环节写入一条 Chrome trace 格式的完整事件（可在 chrome://tracing 或 Perfetto 中打开），
+    同时按环节汇总次数和总耗时，保留最慢的若干次调用用于运行结束时的报告；未启用时 span 不做任何事
+    """
+    
+    def __init__(self, trace_file=None, enabled=True, slowest=20):
+        self.trace_file = trace_file
+        self.enabled = enabled
+        self.slowest = slowest
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        # 环节名称 -> [次数, 总耗时, 最大耗时]，耗时单位为秒
+        self.totals = {}
+        # 最慢调用的小顶堆: (耗时, 序号, 环节名称, 参数)
+        self._slowest = []
+        self._count = 0
+        self._file = None
+        # 已写入追踪文件的事件数，第一个事件之前不写分隔的逗号
+        self._written = 0
+        if enabled and trace_file:
+            self._file = open(trace_file, 'w', encoding='utf-8')
+            # 事件逐行追加，close 时写入结尾的 ]，文件为合法的 JSON 数组
+            self._file.write('[\n')
+    
+    @contextmanager
+    def span(self, name, **args):
+        """记录 with 语句块的耗时，args 为附加信息（如 art_code、页码）"""
+        if not self.enabled:
+            yield
+            return
+        start = time.time()
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(name, start, time.perf_counter() - begin, args)
+    
+    def _record(self, name, start, duration, args):
+        """汇总一次调用的耗时并写入追踪文件"""
+        with self.lock:
+            self._summarize(name, duration, args)
+            if self._file is not None:
+                self._write_event({'name': name, 'ph': 'X', 'ts': int(start * 1e6), 'dur': int(duration * 1e6),
+                                   'pid': self.pid, 'tid': threading.get_ident(), 'args': args})
+    
+    def _summarize(self, name, duration, args):
+        """按环节汇总次数和耗时，保留最慢的调用，调用方需持有锁"""
+        total = self.totals.setdefault(name, [0, 0.0, 0.0])
+        total[0] += 1
+        total[1] += duration
+        total[2] = max(total[2], duration)
+        self._count += 1
+        item = (duration, self._count, name, args)
+        if len(self._slowest) < self.slowest:
+            heapq.heappush(self._slowest, item)
+        elif duration > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, item)
+    
+    def _write_event(self, event):
+        """向追踪文件写入一个事件，调用方需持有锁"""
+        separator = ',\n' if self._written else ''
+        self._file.write(separator + json.dumps(event, ensure_ascii=False, separators=(',', ':')))
+        self._written += 1
+    
+    def merge(self, trace_file):
+        """并入其他进程（如分片工作进程）写出的追踪文件，事件写入本追踪文件并计入汇总"""
+        try:
+            with open(trace_file, 'r', encoding='utf-8') as f:
+                events = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"读取追踪文件失败 {trace_file}: {e}")
+            return
+        with self.lock:
+            for event in events:
+                self._summarize(event.get('name', ''), event.get('dur', 0) / 1e6, event.get('args') or {})
+                if self._file is not None:
+                    self._write_event(event)
+    
+    def report(self, top=10):
+        """输出各环节的耗时汇总和最慢的 top 次调用"""
+        if not self.enabled or not self.totals:
+            return
+        print("耗时统计 (环节: 次数 / 总耗时 / 平均 / 最大):")
+        for name, (count, total, longest) in sorted(self.totals.items(), key=lambda kv: kv[1][1], reverse=True):
+            print(f"  {name:<12} {count:>6} 次  {total:>9.2f}s  {total / count:>7.3f}s  {longest:>7.3f}s")
+        print(f"最慢的 {min(top, len(self._slowest))} 次调用:")
+        for duration, _, name, args in sorted(self._slowest, reverse=True)[:top]:
+            detail = ' '.join(f"{key}={value}" for key, value in args.items())
+            print(f"  {duration:>8.3f}s  {name:<12} {detail}")
+    
+    def close(self):
+        """写入结尾的 ] 并关闭追踪文件"""
+        with self.lock:
+            if self._file is not None:
+                self._file.write('\n]\n')
+                self._file.close()
+                self._file = None
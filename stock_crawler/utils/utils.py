@@ -1,5 +1,6 @@
 import os
 import json
+import threading
 from datetime import datetime
 
 class Utils:
@@ -48,12 +49,8 @@ class Utils:
     @staticmethod
     def safe_filename(filename):
         """生成安全的文件名，去除特殊字符"""
-        import re
-        # 去除或替换不安全的字符
-        safe_name = re.sub(r'[<>:"/\\|?*]', '_', filename)
-        # 去除首尾空格和点
-        safe_name = safe_name.strip('. ')
-        return safe_name
+        from .naming import FileNaming
+        return FileNaming.safe_component(filename)
     
     @staticmethod
     def print_progress(current, total, prefix="进度"):
@@ -80,4 +77,18 @@ class Utils:
             return True
         except Exception as e:
             print(f"保存JSON文件失败 {filepath}: {e}")
-            return False 
\ No newline at end of file
+            return False
+    
+    @staticmethod
+    def atomic_write_json(filepath, data, indent=None):
+        """原子地写入JSON文件：先写临时文件并刷盘，再替换目标文件，进程崩溃也不会留下写了一半的文件"""
+        tmp_file = f"{filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=indent)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, filepath)
+        finally:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
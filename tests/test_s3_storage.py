@@ -0,0 +1,150 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from stock_crawler.downloaders import PdfDownloader, RetryPolicy
+from stock_crawler.storage import S3Storage
+
+class _FakeS3:
+    """内存中的 S3 客户端，只实现 S3Storage 用到的接口；fail_on_part 为分片序号时上传该分片抛出异常"""
+    
+    def __init__(self):
+        self.objects = {}
+        self.uploads = {}
+        self.calls = []
+        self.fail_on_part = None
+        self._next_id = 0
+    
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.calls.append('put_object')
+        self.objects[Key] = Body
+    
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        self.calls.append('create_multipart_upload')
+        self._next_id += 1
+        upload_id = str(self._next_id)
+        self.uploads[upload_id] = (Key, {})
+        return {'UploadId': upload_id}
+    
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.calls.append('upload_part')
+        if PartNumber == self.fail_on_part:
+            raise IOError('connection reset')
+        self.uploads[UploadId][1][PartNumber] = Body
+        return {'ETag': f'etag-{PartNumber}'}
+    
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        self.calls.append('complete_multipart_upload')
+        parts = self.uploads.pop(UploadId)[1]
+        self.objects[Key] = b''.join(parts[part['PartNumber']] for part in MultipartUpload['Parts'])
+    
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.calls.append('abort_multipart_upload')
+        self.uploads.pop(UploadId, None)
+    
+    def list_multipart_uploads(self, Bucket, Prefix):
+        return {'Uploads': [{'Key': key, 'UploadId': upload_id}
+                            for upload_id, (key, _) in self.uploads.items() if key.startswith(Prefix)]}
+    
+    def get_paginator(self, name):
+        client = self
+        
+        class _Paginator:
+            def paginate(self, Bucket, Prefix, Delimiter):
+                client.calls.append('list_objects_v2')
+                keys = sorted(key for key in client.objects
+                              if key.startswith(Prefix) and Delimiter not in key[len(Prefix):])
+                # 分两页返回，检查分页结果会合并
+                for page_keys in (keys[:1], keys[1:]):
+                    yield {'Contents': [{'Key': key, 'Size': len(client.objects[key])} for key in page_keys]}
+        
+        return _Paginator()
+
+class S3StorageTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, 'downloads')
+        self.client = _FakeS3()
+        self.storage = S3Storage(self.root, 'bucket', prefix='/pdfs/', client=self.client)
+        # 构造函数限制分片不小于5MB，测试中直接改小以产生多个分片
+        self.storage.part_size = 10
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def _path(self, name):
+        return os.path.join(self.root, '浦发银行', '回购', name)
+    
+    def test_large_file_is_uploaded_in_parts(self):
+        writer = self.storage.open_writer(self._path('a.pdf'))
+        for _ in range(4):
+            writer.write(b'0123456')
+        writer.commit()
+        
+        self.assertEqual(self.client.objects['pdfs/浦发银行/回购/a.pdf'], b'0123456' * 4)
+        self.assertEqual(self.client.calls.count('upload_part'), 2)
+        self.assertIn('complete_multipart_upload', self.client.calls)
+        self.assertNotIn('put_object', self.client.calls)
+        self.assertEqual(self.client.uploads, {})
+    
+    def test_small_file_uses_single_put(self):
+        writer = self.storage.open_writer(self._path('b.pdf'))
+        writer.write(b'%PDF')
+        writer.commit()
+        
+        self.assertEqual(self.client.objects['pdfs/浦发银行/回购/b.pdf'], b'%PDF')
+        self.assertEqual(self.client.calls, ['put_object'])
+    
+    def test_upload_error_aborts_multipart_upload(self):
+        self.client.fail_on_part = 2
+        writer = self.storage.open_writer(self._path('c.pdf'))
+        with self.assertRaises(IOError):
+            for _ in range(4):
+                writer.write(b'0123456')
+        writer.abort()
+        
+        self.assertIn('abort_multipart_upload', self.client.calls)
+        self.assertEqual(self.client.uploads, {})
+        self.assertEqual(self.client.objects, {})
+        self.assertIsNone(self.storage.getsize(self._path('c.pdf')))
+    
+    @unittest.skipUnless(shutil.which('curl'), '下载依赖 curl')
+    def test_failed_download_aborts_upload(self):
+        source = os.path.join(self.tmp.name, 'source.pdf')
+        with open(source, 'wb') as f:
+            f.write(b'%PDF' + b'x' * (3 * PdfDownloader.CHUNK_SIZE))
+        self.client.fail_on_part = 2
+        downloader = PdfDownloader(retry_policy=RetryPolicy(max_attempts=1), storage=self.storage)
+        
+        self.assertFalse(downloader.download_pdf('file://' + source, self._path('d.pdf'), 0))
+        self.assertIn('abort_multipart_upload', self.client.calls)
+        self.assertNotIn('complete_multipart_upload', self.client.calls)
+        self.assertEqual(self.client.uploads, {})
+        self.assertEqual(self.client.objects, {})
+    
+    def test_listing_is_fetched_once_per_directory(self):
+        for name, body in (('e.pdf', b'1234'), ('f.pdf', b'12')):
+            writer = self.storage.open_writer(self._path(name))
+            writer.write(body)
+            writer.commit()
+        self.storage.clear()
+        
+        self.assertEqual(self.storage.getsize(self._path('e.pdf')), 4)
+        self.assertEqual(self.storage.getsize(self._path('f.pdf')), 2)
+        self.assertFalse(self.storage.exists(self._path('g.pdf')))
+        self.assertEqual(self.client.calls.count('list_objects_v2'), 1)
+    
+    def test_remove_partial_aborts_leftover_upload(self):
+        path = self._path('h.pdf')
+        writer = self.storage.open_writer(path)
+        writer.write(b'0' * 25)
+        self.assertEqual(len(self.client.uploads), 1)
+        
+        # 模拟上次运行中断后留下的分片上传
+        self.storage.remove_partial(path)
+        self.assertEqual(self.client.uploads, {})
+
+if __name__ == '__main__':
+    unittest.main()
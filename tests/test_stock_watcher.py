@@ -0,0 +1,131 @@
+import json
+import os
+import tempfile
+import unittest
+
+from stock_crawler.downloaders import RequestPacer
+from stock_crawler.processors import StockWatcher
+
+def _jsonp(payload):
+    return 'jQuery1_2(' + json.dumps(payload) + ')'
+
+class _Response:
+    status_code = 200
+    headers = {}
+    
+    def __init__(self, text):
+        self.text = text
+    
+    def raise_for_status(self):
+        pass
+
+class _FakeSession:
+    """模拟公告列表和详情接口，failing 中的 art_code 详情返回 success=0"""
+    
+    def __init__(self):
+        self.art_codes = ['AN0']
+        self.failing = set()
+        self.detail_requests = []
+    
+    def get(self, url, **kwargs):
+        if 'security/ann' in url:
+            items = [{
+                'art_code': art_code,
+                'title': f'公告{art_code}',
+                'notice_date': '2023-01-01 00:00:00',
+                'codes': [{'stock_code': '600000', 'short_name': '浦发银行'}],
+                'columns': [{'column_name': '回购'}]
+            } for art_code in self.art_codes]
+            return _Response(_jsonp({'success': 1, 'data': {'list': items, 'total_hits': len(items)}}))
+        art_code = url.split('art_code=')[1].split('&')[0]
+        self.detail_requests.append(art_code)
+        if art_code in self.failing:
+            return _Response(_jsonp({'success': 0, 'message': 'busy'}))
+        return _Response(_jsonp({'success': 1, 'data': {
+            'attach_url': f'http://example.com/{art_code}.pdf',
+            'attach_size': '1',
+            'notice_title': f'公告{art_code}',
+            'notice_date': '2023-01-01 00:00:00',
+            'security': [{'stock': '600000', 'short_name': '浦发银行'}]
+        }}))
+    
+    def close(self):
+        pass
+
+class StockWatcherTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        with open('config.json', 'w', encoding='utf-8') as f:
+            json.dump({'stock_code': '600000', 'catalog_db': os.path.join(self.tmp.name, 'catalog.db')}, f)
+        self.session = _FakeSession()
+        self.watcher = StockWatcher(config_file='config.json', stock_codes=['600000'])
+        self.watcher.http_session = self.session
+        self.watcher.request_pacer = RequestPacer(0)
+        self.downloaded = []
+        factory = self.watcher._factory('600000')
+        factory.pdf_downloader.download_pdf = self._fake_download
+    
+    def tearDown(self):
+        self.watcher.close()
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+    
+    def _fake_download(self, url, filename, size, max_retries=None, reservation=None):
+        with open(filename, 'wb') as f:
+            f.write(b'%PDF')
+        self.downloaded.append(os.path.basename(url))
+        return True
+    
+    def test_failed_detail_is_retried_on_next_poll(self):
+        # 第一次轮询完整爬取并建立高水位
+        self.watcher.poll('600000')
+        self.assertEqual(self.watcher.high_water['600000'], {'AN0'})
+        self.assertEqual(self.downloaded, ['AN0.pdf'])
+        
+        # 新公告的详情获取失败，不计入高水位
+        self.session.art_codes = ['AN1', 'AN0']
+        self.session.failing = {'AN1'}
+        self.assertEqual(self.watcher.poll('600000'), 1)
+        self.assertNotIn('AN1', self.watcher.high_water['600000'])
+        self.assertEqual(self.downloaded, ['AN0.pdf'])
+        
+        # 下次轮询重新获取详情并下载
+        self.session.failing = set()
+        self.assertEqual(self.watcher.poll('600000'), 1)
+        self.assertIn('AN1', self.watcher.high_water['600000'])
+        self.assertEqual(self.downloaded, ['AN0.pdf', 'AN1.pdf'])
+        self.assertEqual(self.session.detail_requests, ['AN0', 'AN1', 'AN1'])
+
+    def test_failed_detail_in_first_poll_is_retried(self):
+        # 第一次轮询走完整爬取，其中一条公告的详情获取失败
+        self.session.art_codes = ['AN1', 'AN0']
+        self.session.failing = {'AN0'}
+        self.watcher.poll('600000')
+        self.assertEqual(self.watcher.high_water['600000'], {'AN1'})
+        self.assertEqual(self.downloaded, ['AN1.pdf'])
+        
+        self.session.failing = set()
+        self.assertEqual(self.watcher.poll('600000'), 1)
+        self.assertEqual(self.watcher.high_water['600000'], {'AN0', 'AN1'})
+        self.assertEqual(self.downloaded, ['AN1.pdf', 'AN0.pdf'])
+    
+    def test_factories_share_connections(self):
+        first = self.watcher._factory('600000')
+        second = self.watcher._factory('601225')
+        
+        self.assertIsNotNone(first.catalog)
+        self.assertIs(first.catalog, second.catalog)
+        self.assertIs(first.storage, second.storage)
+        self.assertIs(first.file_index, second.file_index)
+        self.assertIs(first.cache_manager._state, second.cache_manager._state)
+        
+        # 关闭单只股票的工厂不关闭共用的公告目录
+        catalog = second.catalog
+        second.close()
+        self.assertEqual(catalog.counts(), {})
+
+if __name__ == '__main__':
+    unittest.main()